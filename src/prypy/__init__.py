@@ -5,4 +5,74 @@
 # Imports
 
 
-from . import cli, main, models, reader, utils
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from types import ModuleType
+import importlib
+
+if TYPE_CHECKING:
+    from . import (
+        blocks,
+        bodies,
+        cache,
+        callgraph,
+        cli,
+        diff,
+        discovery,
+        importgraph,
+        index,
+        main,
+        metrics,
+        models,
+        profiling,
+        reader,
+        render,
+        resolve,
+        scan,
+        snapshot,
+        source,
+        utils,
+        watch,
+    )
+
+
+# Constants
+
+
+__all__ = [
+    "blocks",
+    "bodies",
+    "cache",
+    "callgraph",
+    "cli",
+    "diff",
+    "discovery",
+    "importgraph",
+    "index",
+    "main",
+    "metrics",
+    "models",
+    "profiling",
+    "reader",
+    "render",
+    "resolve",
+    "scan",
+    "snapshot",
+    "source",
+    "utils",
+    "watch",
+]
+
+
+# Functions
+
+
+def __getattr__(name: str) -> ModuleType:
+    # Import submodules on first access, keeping `import prypy` fast
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,12 @@
+"""Run the `prypy` command with `python -m prypy`.
+"""
+
+
+# Imports
+
+
+from prypy.main import main
+
+
+if __name__ == "__main__":
+    main()
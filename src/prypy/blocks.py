@@ -0,0 +1,508 @@
+"""Index the indentation and block structure of module source.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Iterator
+from array import array
+from bisect import bisect_right
+import re
+
+from prypy.source import Source
+
+
+# Constants
+
+
+TAB_SIZE = 8
+BLANK = -1
+CONTINUATION = -2
+TOKEN = re.compile(
+    r"(?=[#'\"\\()\[\]{}])"
+    r"(?:(?P<comment>#[^\r\n]*)"
+    r"|(?P<string>'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*(?:'''|\Z)"
+    r'|"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*(?:"""|\Z)'
+    r"|'[^'\\\r\n]*(?:\\[\s\S][^'\\\r\n]*)*(?:'|(?=[\r\n])|\Z)"
+    r'|"[^"\\\r\n]*(?:\\[\s\S][^"\\\r\n]*)*(?:"|(?=[\r\n])|\Z))'
+    r"|(?P<continuation>\\(?:\r\n|\r|\n))"
+    r"|(?P<open>[(\[{])"
+    r"|(?P<close>[)\]}]))"
+)
+ASSIGNMENT = re.compile(r"(?<![=!<>:+\-*/%&|^@])=(?!=)")
+WORD = re.compile(r"\s*(@|[A-Za-z_]\w*\*?)")
+LAMBDA = re.compile(r"\blambda\b")
+BRACKET = re.compile(r"[()\[\]{}]")
+VISIBLE = re.compile(r"[^\r\n]")
+
+
+# Classes
+
+
+class BlockIndex:
+    """Indent widths and block spans of every line of a module.
+
+    Lines are scanned once to find where logical lines start, skipping
+    strings, comments, bracketed expressions and backslash continuations,
+    while masking the source as `mask` does. Each line then holds its indent
+    width, ``BLANK`` if it is empty or only a comment, or ``CONTINUATION`` if
+    it continues a logical line. Each logical line also holds the last line
+    of the block it heads, so that the end of a class or function is a
+    lookup.
+
+    Parameters
+    ----------
+    source : Source
+        Source of the module.
+    tab_size : int
+        Number of columns between tab stops.
+
+    Methods
+    -------
+    text(i)
+        Text of the logical line starting on line `i`.
+    code(i)
+        Masked text of the logical line starting on line `i`.
+    logical_end(i)
+        Last line of the logical line starting on line `i`.
+    width(i)
+        Indent width of line `i`, or ``BLANK`` or ``CONTINUATION``.
+    end(i)
+        Last line of the statement starting on line `i`, including its block.
+    next_statement(i)
+        Line starting the statement following the one on line `i` in the same
+        block, if any.
+    statements(i)
+        Lines starting the statements in the block of line `i`, or the
+        module-level statements if `i` is ``None``.
+    """
+
+    __slots__ = ("source", "masked", "widths", "ends")
+
+    def __init__(self, source: Source, tab_size: int = TAB_SIZE):
+        self.source = source
+        text = source.text
+        starts, self.masked = lex(source)
+        self.widths = array("l", [CONTINUATION]) * len(source)
+        self.ends = array("l", [-1]) * len(source)
+
+        # Measure indents of logical lines, leaving out empty ones
+        for i in range(len(source)):
+            if not starts[i]:
+                continue
+            line = text[source.offsets[i] : source.offsets[i + 1]]
+            content = line.lstrip(" \t\f")
+            if (len(content) == 0) or (content[0] in "#\r\n"):
+                self.widths[i] = BLANK
+            else:
+                self.widths[i] = indent_width(
+                    line[: len(line) - len(content)], tab_size
+                )
+
+        # Close blocks once a line is indented no deeper than their header
+        stack = []
+        last = -1
+        for i, width in enumerate(self.widths):
+            if width == BLANK:
+                continue
+            if width != CONTINUATION:
+                while (len(stack) > 0) and (self.widths[stack[-1]] >= width):
+                    self.ends[stack.pop()] = last
+                stack.append(i)
+            last = i
+        for i in stack:
+            self.ends[i] = last
+
+    def __len__(self) -> int:
+        return len(self.widths)
+
+    @classmethod
+    def from_lines(
+        cls, lines: list[str] | Source, tab_size: int = TAB_SIZE
+    ) -> BlockIndex:
+        if not isinstance(lines, Source):
+            lines = Source("\n".join(lines))
+        return BlockIndex(lines, tab_size)
+
+    def text(self, i: int) -> str:
+        offsets = self.source.offsets
+        return self.source.text[offsets[i] : offsets[self.logical_end(i) + 1]]
+
+    def code(self, i: int) -> str:
+        offsets = self.source.offsets
+        return self.masked[offsets[i] : offsets[self.logical_end(i) + 1]]
+
+    def logical_end(self, i: int) -> int:
+        while (i + 1 < len(self)) and (self.widths[i + 1] == CONTINUATION):
+            i += 1
+        return i
+
+    def width(self, i: int) -> int:
+        return self.widths[i]
+
+    def end(self, i: int) -> int:
+        if self.widths[i] < 0:
+            raise ValueError(f"Line {i} does not start a statement.")
+        return self.ends[i]
+
+    def next_statement(self, i: int) -> int | None:
+        j = self.end(i) + 1
+        while (j < len(self)) and (self.widths[j] < 0):
+            j += 1
+        if (j < len(self)) and (self.widths[j] == self.widths[i]):
+            return j
+        return None
+
+    def statements(self, i: int | None = None) -> Iterator[int]:
+        if i is None:
+            j, end = 0, len(self) - 1
+        else:
+            j, end = i + 1, self.end(i)
+
+        # Jump from each statement to the next one past its block
+        while j <= end:
+            if self.widths[j] < 0:
+                j += 1
+                continue
+            yield j
+            j = self.ends[j] + 1
+
+
+# Functions
+
+
+def indent_width(indent: str, tab_size: int = TAB_SIZE) -> int:
+    """Return the width of leading whitespace, as Python's tokenizer counts it.
+
+    Parameters
+    ----------
+    indent : str
+        Spaces, tabs and form feeds preceding the content of a line.
+    tab_size : int
+        Number of columns between tab stops.
+
+    Returns
+    -------
+    int
+        Number of columns, with tabs advancing to the next tab stop and form
+        feeds resetting the count.
+    """
+    indent = indent.rpartition("\f")[2]
+    if "\t" not in indent:
+        return len(indent)
+    return len(indent.expandtabs(tab_size))
+
+
+def blank(match: re.Match) -> str:
+    """Blank out a comment, string or line continuation, keeping positions.
+
+    Parameters
+    ----------
+    match : re.Match
+        Match of `TOKEN`.
+
+    Returns
+    -------
+    str
+        Spaces for comments, a space and the line break for continuations, and
+        the quotes of strings around spaces for their content. Line breaks
+        within strings are kept.
+    """
+    token = match.group()
+    match match.lastgroup:
+        case "comment":
+            return " " * len(token)
+        case "continuation":
+            return " " + token[1:]
+
+    # Keep quotes of strings, as they are closed in whole source only
+    quote = 3 if token[:3] in ("'''", '"""') else 1
+    closing = quote if (len(token) >= 2 * quote) and (token[-1] == token[0]) else 0
+    content = token[quote : len(token) - closing]
+    if ("\n" in content) or ("\r" in content):
+        content = VISIBLE.sub(" ", content)
+    else:
+        content = " " * len(content)
+    return token[:quote] + content + token[len(token) - closing :]
+
+
+def mask(text: str, brackets: bool = False) -> str:
+    """Blank out comments, string contents and line continuations.
+
+    The masked text has the same length and line breaks as the source, so
+    that positions found in it hold for the source. Only code and the quotes
+    of strings are left, so that it can be searched with plain substring
+    checks.
+
+    Parameters
+    ----------
+    text : str
+        Source code.
+    brackets : bool
+        Whether to also blank out the contents of bracketed expressions, so
+        that only top-level code is left.
+
+    Returns
+    -------
+    str
+        Masked text.
+    """
+    pieces = []
+    position = 0
+    for match in TOKEN.finditer(text):
+        if match.lastgroup in ("open", "close"):
+            continue
+        pieces.append(text[position : match.start()])
+        pieces.append(blank(match))
+        position = match.end()
+    pieces.append(text[position:])
+    masked = "".join(pieces)
+    return hide_brackets(masked) if brackets else masked
+
+
+def hide_brackets(masked: str) -> str:
+    """Blank out the contents of top-level bracketed expressions.
+
+    Parameters
+    ----------
+    masked : str
+        Text masked with `mask`, whose strings and comments hold no brackets.
+
+    Returns
+    -------
+    str
+        Text of the same length, keeping the outermost brackets themselves.
+    """
+    if BRACKET.search(masked) is None:
+        return masked
+    pieces = []
+    position = 0
+    depth = 0
+    for match in BRACKET.finditer(masked):
+        if match.group() in "([{":
+            if depth == 0:
+                pieces.append(masked[position : match.end()])
+                position = match.end()
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                pieces.append(" " * (match.start() - position))
+                position = match.start()
+
+    # Blank out brackets left open at the end of the text
+    if depth > 0:
+        pieces.append(" " * (len(masked) - position))
+        position = len(masked)
+    pieces.append(masked[position:])
+    return "".join(pieces)
+
+
+def strip(text: str, masked: str | None = None) -> str:
+    """Strip whitespace and comments from both ends of source code.
+
+    Parameters
+    ----------
+    text : str
+        Source code.
+    masked : str | None
+        Text masked with `mask`, computed if ``None``.
+
+    Returns
+    -------
+    str
+        Text from its first to its last character of code.
+    """
+    if masked is None:
+        masked = mask(text)
+    start = len(masked) - len(masked.lstrip())
+    end = len(masked.rstrip())
+    return text[start:end] if start < end else ""
+
+
+def split(
+    text: str, separator: str | re.Pattern, masked: str | None = None
+) -> list[str]:
+    """Split source code on separators outside strings, comments and brackets.
+
+    Parameters
+    ----------
+    text : str
+        Source code.
+    separator : str | re.Pattern
+        Separator, or pattern matching separators.
+    masked : str | None
+        Text masked with `mask`, computed if ``None``. Passing it as `text`
+        too splits the masked text along with the source.
+
+    Returns
+    -------
+    list[str]
+        Parts of the text between top-level separators.
+    """
+    if masked is None:
+        masked = mask(text)
+    if isinstance(separator, str):
+        if separator not in masked:
+            return [text]
+        separator = re.compile(re.escape(separator))
+    parts = []
+    position = 0
+    for match in separator.finditer(hide_brackets(masked)):
+        parts.append(text[position : match.start()])
+        position = match.end()
+    parts.append(text[position:])
+    return parts
+
+
+def split_header(text: str, masked: str | None = None) -> tuple[str, str]:
+    """Split a compound statement at the colon ending its header.
+
+    Parameters
+    ----------
+    text : str
+        Logical line of a compound statement, such as a ``def`` or ``class``.
+    masked : str | None
+        Text masked with `mask`, computed if ``None``.
+
+    Returns
+    -------
+    tuple[str, str]
+        Header without its colon, and any body written on the same line,
+        stripped of comments.
+    """
+    if masked is None:
+        masked = mask(text)
+    colon = hide_brackets(masked).find(":")
+    if colon < 0:
+        return text, ""
+    return text[:colon], strip(text[colon + 1 :], masked[colon + 1 :])
+
+
+def split_assignment(
+    text: str, masked: str | None = None
+) -> tuple[list[str], str | None, str | None] | None:
+    """Split an assignment or annotated declaration into its parts.
+
+    Parameters
+    ----------
+    text : str
+        Simple statement.
+    masked : str | None
+        Text masked with `mask`, computed if ``None``.
+
+    Returns
+    -------
+    tuple[list[str], str | None, str | None] | None
+        Targets, annotation and value, stripped of whitespace and comments,
+        or ``None`` if the statement neither assigns nor annotates.
+    """
+    if masked is None:
+        masked = mask(text)
+    if ("=" not in masked) and (":" not in masked):
+        return None
+    hidden = hide_brackets(masked)
+
+    # Look for separators before any lambda, whose defaults also use them
+    match = LAMBDA.search(hidden)
+    limit = len(hidden) if match is None else match.start()
+    separators = list(ASSIGNMENT.finditer(hidden, 0, limit))
+    end = separators[0].start() if len(separators) > 0 else limit
+
+    # Split chained targets, then the annotation of a single target
+    targets = []
+    position = 0
+    for match in separators:
+        targets.append(
+            strip(text[position : match.start()], masked[position : match.start()])
+        )
+        position = match.end()
+    value = None
+    if len(separators) > 0:
+        value = strip(text[position:], masked[position:])
+    annotation = None
+    colon = hidden.find(":", 0, end)
+    if colon >= 0:
+        annotation = strip(text[colon + 1 : end], masked[colon + 1 : end])
+        targets[:1] = [strip(text[:colon], masked[:colon])]
+    if len(targets) == 0:
+        return None
+    return targets, annotation, value
+
+
+def first_word(text: str) -> str:
+    """Return the keyword or name a statement starts with.
+
+    Parameters
+    ----------
+    text : str
+        Statement.
+
+    Returns
+    -------
+    str
+        First name, ``"@"`` for decorators, or an empty string.
+    """
+    match = WORD.match(text)
+    return "" if match is None else match.group(1)
+
+
+def lex(source: Source) -> tuple[bytearray, str]:
+    """Flag the lines on which a logical line starts, and mask the source.
+
+    Both come from a single scan of the tokens of `TOKEN`, so that later
+    steps can search statements with plain substring checks instead of
+    tokenizing them again.
+
+    Parameters
+    ----------
+    source : Source
+        Source of the module.
+
+    Returns
+    -------
+    tuple[bytearray, str]
+        One flag per line, unset on lines inside strings, brackets or after a
+        backslash continuation, then the source masked as by `mask`.
+    """
+    text = source.text
+    offsets = source.offsets
+    starts = bytearray(b"\1") * len(source)
+    pieces = []
+    position = 0
+
+    def clear(start: int, end: int) -> None:
+        # Unset lines beginning between the two text positions
+        i = bisect_right(offsets, start)
+        j = min(bisect_right(offsets, end), len(starts))
+        if i < j:
+            starts[i:j] = bytes(j - i)
+
+    # Match whole comments and strings so that their content is skipped
+    depth = 0
+    opening = 0
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind == "open":
+            if depth == 0:
+                opening = match.start()
+            depth += 1
+        elif kind == "close":
+            if depth > 0:
+                depth -= 1
+                if depth == 0:
+                    clear(opening, match.end())
+        else:
+            if (kind != "comment") and (depth == 0):
+                clear(match.start(), match.end())
+            pieces.append(text[position : match.start()])
+            pieces.append(blank(match))
+            position = match.end()
+
+    # Unset lines of brackets left open at the end of the module
+    if depth > 0:
+        clear(opening, len(text))
+    pieces.append(text[position:])
+    return starts, "".join(pieces)
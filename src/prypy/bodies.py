@@ -0,0 +1,167 @@
+"""Module bodies held in memory within a byte budget.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any
+from collections import OrderedDict
+from pathlib import Path
+import sys
+
+from prypy import models, profiling, scan
+
+if TYPE_CHECKING:
+    from prypy.cache import ModuleCache
+    from prypy.discovery import IgnoreRules
+
+
+# Classes
+
+
+class BodyCache:
+    """Least recently used module bodies, held within a byte budget.
+
+    Modules attached to the cache keep their name, parent and path resident,
+    while their body is loaded on first access, reloaded from `cache` or
+    re-parsed from its file. Each access of a body attribute marks the body
+    as most recently used, and the least recently used bodies are dropped
+    once their estimated size exceeds the budget, so that the package tree
+    of a huge repository stays cheap to hold.
+
+    Packages and modules keep their identity, but the classes, functions and
+    variables of a reloaded body are new objects. Derived data should hold
+    qualified names, as `SymbolIndex` and `Resolver` do, since holding symbols
+    keeps stale copies of their bodies alive outside the budget.
+
+    Parameters
+    ----------
+    budget : int
+        Maximum estimated size in bytes of the bodies held, although the most
+        recently loaded body is always held.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    cache : ModuleCache | None
+        Cache consulted before parsing and updated with parsed modules, which
+        must stay open while the modules are used.
+
+    Methods
+    -------
+    skeleton(path, parent, ignore)
+        Discover a package tree whose modules are attached to the cache.
+    attach(module)
+        Drop the body of a module, to be loaded through the cache.
+    load(module)
+        Body of a module, loaded if it is not held.
+    """
+
+    def __init__(
+        self, budget: int, engine: str = "ast", cache: ModuleCache | None = None
+    ):
+        self.budget = budget
+        self.engine = engine
+        self.cache = cache
+        self.bodies = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+    def __contains__(self, module: models.Module) -> bool:
+        return module in self.bodies
+
+    def skeleton(
+        self,
+        path: Path,
+        parent: models.Package | models.Repository | None,
+        ignore: IgnoreRules | None = None,
+    ) -> models.Package:
+        # Discover package tree without parsing any module
+        package = None
+        for module_package, module_path in models.Package.walk(path, parent, ignore):
+            package = package or module_package
+            module = models.Module.lazy(
+                module_path.stem, module_package, self.load, module_path
+            )
+            module_package.modules.append(module)
+        return package
+
+    def attach(self, module: models.Module) -> None:
+        module.loader = None
+        for name in models.Module.BODY:
+            if hasattr(module, name):
+                delattr(module, name)
+        self.drop(module)
+        module.loader = self.load
+
+    def load(self, module: models.Module) -> dict[str, Any]:
+        # Serve held bodies, marking them as most recently used
+        entry = self.bodies.get(module)
+        if entry is not None:
+            self.bodies.move_to_end(module)
+            return entry[0]
+
+        # Reload the body from the cache, or parse it again
+        if self.cache is None:
+            parsed = scan.parse_module(module.path, self.engine)
+        else:
+            parsed = self.cache.get(module.path, self.engine)
+            if parsed is None:
+                parsed, stamp = scan.parse_stamped(module.path, self.engine)
+                self.cache.put(module.path, self.engine, parsed, stamp)
+                self.cache.commit()
+        profiling.count("bodies_loaded", path=module.path)
+        body = {name: getattr(parsed, name) for name in models.Module.BODY}
+        for item in body["constants"] + body["classes"] + body["functions"]:
+            item.parent = module
+
+        # Hold the body, dropping the least recently used ones beyond the budget
+        size = estimate_size(body)
+        self.bodies[module] = (body, size)
+        self.size += size
+        while (self.size > self.budget) and (len(self.bodies) > 1):
+            self.drop(next(iter(self.bodies)))
+            profiling.count("bodies_evicted")
+        return body
+
+    def drop(self, module: models.Module) -> None:
+        entry = self.bodies.pop(module, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+# Functions
+
+
+def estimate_size(body: dict[str, Any]) -> int:
+    """Estimate the memory held by a module body.
+
+    Parameters
+    ----------
+    body : dict[str, Any]
+        Attributes of `Module.BODY` and their values.
+
+    Returns
+    -------
+    int
+        Sum of the sizes of the containers, symbols and strings of the body,
+        excluding parent links, and counting shared strings once per use.
+    """
+    size = sys.getsizeof(body)
+    items = list(body.values())
+    while len(items) > 0:
+        item = items.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, (list, tuple)):
+            items.extend(item)
+        elif isinstance(item, dict):
+            items.extend(item.keys())
+            items.extend(item.values())
+        elif isinstance(item, (models.Variable, models.Function, models.Class)):
+            for owner in type(item).__mro__:
+                for slot in getattr(owner, "__slots__", ()):
+                    if slot != "parent":
+                        items.append(getattr(item, slot, None))
+    return size
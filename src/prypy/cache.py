@@ -0,0 +1,223 @@
+"""Persistent on-disk cache of parsed modules.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from pathlib import Path
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+
+from prypy import profiling
+
+if TYPE_CHECKING:
+    from prypy import models
+
+
+# Constants
+
+
+CACHE_DIRNAME = ".prypy_cache"
+CACHE_FILENAME = "modules.sqlite"
+SCHEMA_VERSION = 5
+
+
+# Classes
+
+
+class ModuleCache:
+    """SQLite store of parsed modules keyed by path, stat and content hash.
+
+    A cached module is reused without reading its file when the file's
+    modification time and size are unchanged, and after re-hashing its
+    content when only the modification time changed. Entries are evicted
+    least recently used first once the cache holds more than `max_entries`.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory holding the cache database, created if missing.
+    max_entries : int
+        Maximum number of modules kept after pruning.
+
+    Methods
+    -------
+    get(path, engine)
+        Return the cached module for `path`, or ``None`` if stale or missing.
+    put(path, engine, module, stamp)
+        Store a freshly parsed module under the stamp of the content it was
+        parsed from.
+    prune()
+        Evict entries of deleted files and the least recently used surplus.
+    close()
+        Prune, commit and close the database.
+    """
+
+    def __init__(self, directory: Path, max_entries: int = 100_000):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / CACHE_FILENAME
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(self.path)
+
+        # Drop tables written by another schema version
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS modules")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS modules (
+                path TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                accessed REAL NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (path, engine)
+            )
+            """
+        )
+        self.connection.commit()
+
+    def __enter__(self) -> ModuleCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @classmethod
+    def for_repository(cls, path: Path, max_entries: int = 100_000) -> ModuleCache:
+        return ModuleCache(path / CACHE_DIRNAME, max_entries)
+
+    def get(self, path: Path, engine: str) -> models.Module | None:
+        key = os.path.abspath(path)
+        row = self.connection.execute(
+            "SELECT mtime_ns, size, digest, data FROM modules "
+            "WHERE path = ? AND engine = ?",
+            (key, engine),
+        ).fetchone()
+        if row is None:
+            profiling.count("cache_misses", path=path)
+            return None
+        mtime_ns, size, digest, data = row
+
+        # Fall back to comparing content hashes if file stats changed
+        stat = os.stat(path)
+        if (stat.st_mtime_ns != mtime_ns) or (stat.st_size != size):
+            if file_digest(path) != digest:
+                profiling.count("cache_misses", path=path)
+                return None
+            self.connection.execute(
+                "UPDATE modules SET mtime_ns = ?, size = ? "
+                "WHERE path = ? AND engine = ?",
+                (stat.st_mtime_ns, stat.st_size, key, engine),
+            )
+
+        self.connection.execute(
+            "UPDATE modules SET accessed = ? WHERE path = ? AND engine = ?",
+            (time.time(), key, engine),
+        )
+        profiling.count("cache_hits", path=path)
+        return pickle.loads(data)
+
+    def put(
+        self,
+        path: Path,
+        engine: str,
+        module: models.Module,
+        stamp: tuple[int, int, str],
+    ) -> None:
+        # Store module detached from its package to avoid pickling the tree
+        parent, module.parent = module.parent, None
+        try:
+            data = pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            module.parent = parent
+
+        # Key the entry by the stamp taken when the module was read, so that a
+        # file changed since then is a miss rather than a stale hit
+        mtime_ns, size, digest = stamp
+        self.connection.execute(
+            "INSERT OR REPLACE INTO modules VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(path),
+                engine,
+                mtime_ns,
+                size,
+                digest,
+                time.time(),
+                data,
+            ),
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def prune(self) -> None:
+        # Evict entries of files which no longer exist
+        missing = [
+            (path,)
+            for (path,) in self.connection.execute("SELECT DISTINCT path FROM modules")
+            if not os.path.exists(path)
+        ]
+        self.connection.executemany("DELETE FROM modules WHERE path = ?", missing)
+
+        # Evict least recently used entries beyond the size limit
+        self.connection.execute(
+            "DELETE FROM modules WHERE rowid IN ("
+            "SELECT rowid FROM modules ORDER BY accessed DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,),
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.prune()
+        self.connection.close()
+
+
+# Functions
+
+
+def file_digest(path: Path) -> str:
+    """Return the BLAKE2 hex digest of a file's content.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file to be hashed.
+
+    Returns
+    -------
+    str
+        Hex digest of the file's bytes.
+    """
+    with open(path, mode="rb") as file:
+        return hashlib.file_digest(file, "blake2b").hexdigest()
+
+
+def read_stamped(path: Path) -> tuple[bytes, tuple[int, int, str]]:
+    """Read a file along with the stamp of the bytes read.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file to be read.
+
+    Returns
+    -------
+    tuple[bytes, tuple[int, int, str]]
+        Content of the file, then its modification time in nanoseconds and
+        size, taken before reading, and the BLAKE2 hex digest of the content.
+    """
+    with open(path, mode="rb") as file:
+        stat = os.fstat(file.fileno())
+        data = file.read()
+    return data, (stat.st_mtime_ns, stat.st_size, hashlib.blake2b(data).hexdigest())
@@ -0,0 +1,320 @@
+"""Repository-wide call graph built from `Function.calls`.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Iterable
+
+from prypy import models, utils
+
+
+# Constants
+
+
+MAX_ALIAS_DEPTH = 8
+
+
+# Classes
+
+
+class CallGraph:
+    """Call graph indexed by integer function IDs in compressed sparse rows.
+
+    Callees of function ``i`` are ``callee_ids[callee_offsets[i] :
+    callee_offsets[i + 1]]``, and callers are stored the same way, so each
+    neighbourhood query is a slice of a flat array.
+
+    The modules each call was resolved through are recorded, so that `update`
+    resolves again only the calls of re-parsed functions and of functions
+    whose calls went through re-parsed modules, then splices their rows into
+    the arrays. IDs of dropped functions are left empty and reused by added
+    functions, so that other functions keep their IDs.
+
+    Methods
+    -------
+    from_modules(modules)
+        Build a call graph, resolving calls across the passed modules.
+    from_repository(repository)
+        Build the call graph of a whole repository.
+    callers(name)
+        Functions calling the named function.
+    callees(name)
+        Functions called by the named function.
+    transitive_callees(name)
+        Functions reachable from the named function.
+    transitive_callers(name)
+        Functions from which the named function is reachable.
+    reaches(source, target)
+        Whether the target function is reachable from the source function.
+    update(removed, added)
+        Patch the graph for re-parsed modules, for use as a `watch.Session`
+        listener.
+    id_of(name)
+        ID of the named function, raising `ValueError` if unknown.
+    """
+
+    def __init__(self):
+        self.functions = []
+        self.owners = []
+        self.free = []
+        self.ids = {}
+        self.modules = {}
+        self.members = {}
+        self.names = {}
+        self.classes = {}
+        self.dependencies = {}
+        self.dependents = {}
+        self.callee_offsets, self.callee_ids = utils.compress(0, [])
+        self.caller_offsets, self.caller_ids = utils.compress(0, [])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_modules(cls, modules: Iterable[models.Module]) -> CallGraph:
+        graph = CallGraph()
+        graph.update([], list(modules))
+        return graph
+
+    @classmethod
+    def from_repository(cls, repository: models.Repository) -> CallGraph:
+        return CallGraph.from_modules(repository.source.iter_modules())
+
+    def callers(self, name: str) -> list[models.Function]:
+        i = self.id_of(name)
+        return [
+            self.functions[j]
+            for j in self.caller_ids[
+                self.caller_offsets[i] : self.caller_offsets[i + 1]
+            ]
+        ]
+
+    def callees(self, name: str) -> list[models.Function]:
+        i = self.id_of(name)
+        return [
+            self.functions[j]
+            for j in self.callee_ids[
+                self.callee_offsets[i] : self.callee_offsets[i + 1]
+            ]
+        ]
+
+    def transitive_callees(self, name: str) -> list[models.Function]:
+        return [
+            self.functions[j]
+            for j in sorted(
+                utils.traverse(self.id_of(name), self.callee_offsets, self.callee_ids)
+            )
+        ]
+
+    def transitive_callers(self, name: str) -> list[models.Function]:
+        return [
+            self.functions[j]
+            for j in sorted(
+                utils.traverse(self.id_of(name), self.caller_offsets, self.caller_ids)
+            )
+        ]
+
+    def reaches(self, source: str, target: str) -> bool:
+        return self.id_of(target) in utils.traverse(
+            self.id_of(source), self.callee_offsets, self.callee_ids
+        )
+
+    def update(self, removed: list[models.Module], added: list[models.Module]) -> None:
+        rows = {}
+        removed, added = utils.replaced(self.modules.get, removed, added)
+
+        # Drop the definitions of removed modules, freeing their function IDs
+        changed = set()
+        for module in removed:
+            module_name = utils.qualified_name(module)
+            changed.add(module_name)
+            del self.modules[module_name]
+            del self.names[module_name]
+            for class_obj in iter_classes(module):
+                class_name = utils.qualified_name(class_obj)
+                if self.classes.get(class_name) == module_name:
+                    del self.classes[class_name]
+            for i in self.members.pop(module_name):
+                name = utils.qualified_name(self.functions[i])
+                if self.ids.get(name) == i:
+                    del self.ids[name]
+                self.forget(i)
+                self.functions[i] = self.owners[i] = None
+                self.free.append(i)
+                rows[i] = []
+
+        # Index the definitions of added modules, reusing free IDs first
+        resolving = []
+        for module in added:
+            module_name = utils.qualified_name(module)
+            changed.add(module_name)
+            self.modules[module_name] = module
+            self.members[module_name] = []
+            self.names[module_name] = local_names(module)
+            for class_obj in iter_classes(module):
+                self.classes[utils.qualified_name(class_obj)] = module_name
+            for function in iter_functions(module):
+                if len(self.free) > 0:
+                    i = self.free.pop()
+                else:
+                    i = len(self.functions)
+                    self.functions.append(None)
+                    self.owners.append(None)
+                self.functions[i], self.owners[i] = function, module_name
+                self.ids[utils.qualified_name(function)] = i
+                self.members[module_name].append(i)
+                resolving.append(i)
+
+        # Resolve calls of added functions and of those depending on changes
+        for module_name in changed:
+            for i in self.dependents.pop(module_name, set()):
+                self.forget(i)
+                resolving.append(i)
+        for i in resolving:
+            rows[i] = self.resolve_calls(i)
+
+        # Splice changed callee rows, then the caller rows they gained or lost
+        caller_rows = utils.reverse_rows(
+            self.callee_offsets,
+            self.callee_ids,
+            self.caller_offsets,
+            self.caller_ids,
+            rows,
+        )
+        n = len(self.functions)
+        self.callee_offsets, self.callee_ids = utils.splice(
+            self.callee_offsets, self.callee_ids, rows, n
+        )
+        self.caller_offsets, self.caller_ids = utils.splice(
+            self.caller_offsets, self.caller_ids, caller_rows, n
+        )
+
+    def resolve_calls(self, caller: int) -> list[int]:
+        # Resolve callees through local definitions, instances and imports
+        function, module_name = self.functions[caller], self.owners[caller]
+        module = self.modules[module_name]
+        instance = None
+        if isinstance(function.parent, models.Class) and function.input:
+            instance = function.input[0].name
+
+        callees, depends = set(), set()
+        for callee in function.calls:
+            head, _, rest = callee.partition(".")
+            if (head == instance) and (len(rest) > 0):
+                name = f"{utils.qualified_name(function.parent)}.{rest}"
+            elif head in self.names[module_name]:
+                name = f"{module_name}.{callee}"
+            elif head in module.aliases:
+                name = utils.absolute_name(
+                    module.aliases[head], utils.package_name(module)
+                )
+                name += f".{rest}" if rest else ""
+            else:
+                continue
+            callee_id = self.resolve(name, depends)
+            if callee_id is not None:
+                callees.add(callee_id)
+
+        # Record the modules calls were resolved through
+        self.dependencies[caller] = depends
+        for module_name in depends:
+            self.dependents.setdefault(module_name, set()).add(caller)
+        return sorted(callees)
+
+    def resolve(self, name: str, depends: set[str], depth: int = 0) -> int | None:
+        if name in self.ids:
+            depends.add(self.owners[self.ids[name]])
+            return self.ids[name]
+        if name in self.classes:
+            depends.add(self.classes[name])
+            return self.ids.get(f"{name}.__init__")
+
+        # Follow names re-exported by the module defining their prefix, which
+        # depends on every module which may define the name
+        if depth < MAX_ALIAS_DEPTH:
+            prefix, _, rest = name.rpartition(".")
+            while len(prefix) > 0:
+                depends.add(prefix)
+                module = self.modules.get(prefix)
+                if module is not None:
+                    head, _, tail = rest.partition(".")
+                    if head in module.aliases:
+                        target = utils.absolute_name(
+                            module.aliases[head], utils.package_name(module)
+                        )
+                        return self.resolve(
+                            target + (f".{tail}" if tail else ""), depends, depth + 1
+                        )
+                    return None
+                prefix, _, head = prefix.rpartition(".")
+                rest = f"{head}.{rest}"
+        return None
+
+    def forget(self, i: int) -> None:
+        for module_name in self.dependencies.pop(i, ()):
+            self.dependents.get(module_name, set()).discard(i)
+
+    def id_of(self, name: str) -> int:
+        if name not in self.ids:
+            raise ValueError(f"{name} is not a known function.")
+        return self.ids[name]
+
+
+# Functions
+
+
+def iter_classes(module: models.Module) -> Iterable[models.Class]:
+    """Yield the classes defined in a module, including nested classes.
+
+    Parameters
+    ----------
+    module : models.Module
+        Module to be inspected.
+
+    Yields
+    ------
+    models.Class
+        Each module-level class followed by the classes nested in it.
+    """
+    for class_obj in module.classes:
+        yield from class_obj.iter_classes()
+
+
+def iter_functions(module: models.Module) -> Iterable[models.Function]:
+    """Yield the functions and methods defined in a module.
+
+    Parameters
+    ----------
+    module : models.Module
+        Module to be inspected.
+
+    Yields
+    ------
+    models.Function
+        Module-level functions, then methods of each class, each followed by
+        the functions nested in it.
+    """
+    for function in module.functions:
+        yield from function.iter_functions()
+    for class_obj in iter_classes(module):
+        for function in class_obj.functions:
+            yield from function.iter_functions()
+
+
+def local_names(module: models.Module) -> set[str]:
+    """Return the names of classes and functions defined in a module.
+
+    Parameters
+    ----------
+    module : models.Module
+        Module to be inspected.
+
+    Returns
+    -------
+    set[str]
+        Names of module-level classes and functions.
+    """
+    return {item.name for item in module.classes + module.functions}
@@ -0,0 +1,361 @@
+"""Command line interface of the `prypy` command.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterable, TextIO
+from pathlib import Path
+import argparse
+import os
+import sys
+
+if TYPE_CHECKING:
+    from prypy import models
+
+
+# Constants
+
+
+FORMATS = ("text", "jsonl")
+QUERIES = (
+    "prefix",
+    "exact",
+    "fuzzy",
+    "callers",
+    "callees",
+    "importers",
+    "dependencies",
+)
+
+
+# Functions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the `prypy` command and its subcommands.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        Parser whose subcommands set the `command` function to be run.
+    """
+    parser = argparse.ArgumentParser(prog="prypy", description="Trace Python programs.")
+    subparsers = parser.add_subparsers(required=True, metavar="command")
+
+    # Share scanning options between subcommands
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--engine", choices=("ast", "lines"), default="ast", help="parsing engine"
+    )
+    options.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of parsing workers, 0 for every core",
+    )
+    options.add_argument(
+        "--executor",
+        choices=("process", "thread"),
+        default="process",
+        help="pool type of the parsing workers",
+    )
+
+    # Only offer the cache to subcommands reading a single working tree
+    caching = argparse.ArgumentParser(add_help=False)
+    caching.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse modules cached in the repository",
+    )
+
+    scan = subparsers.add_parser(
+        "scan",
+        parents=[options, caching],
+        help="stream the modules of a repository as they are parsed",
+    )
+    scan.add_argument("path", type=Path, help="repository directory")
+    scan.add_argument(
+        "--symbols",
+        action="store_true",
+        help="also output the symbols of each module",
+    )
+    scan.add_argument("--format", choices=FORMATS, default="jsonl")
+    scan.set_defaults(command=run_scan)
+
+    tree = subparsers.add_parser(
+        "tree",
+        parents=[options, caching],
+        help="print the package tree of a repository",
+    )
+    tree.add_argument("path", type=Path, help="repository directory")
+    tree.add_argument("--depth", type=int, default=None, help="maximum depth")
+    tree.add_argument(
+        "--symbols",
+        action="store_true",
+        help="also print classes and functions",
+    )
+    tree.set_defaults(command=run_tree)
+
+    stats = subparsers.add_parser(
+        "stats", parents=[options], help="count what repositories hold"
+    )
+    stats.add_argument("paths", type=Path, nargs="+", help="repository directories")
+    stats.add_argument("--format", choices=FORMATS, default="text")
+    stats.set_defaults(command=run_stats)
+
+    diff = subparsers.add_parser(
+        "diff",
+        parents=[options],
+        help="list symbols changed between two git revisions",
+    )
+    diff.add_argument("path", type=Path, help="repository directory")
+    diff.add_argument("old", help="old revision")
+    diff.add_argument("new", nargs="?", default="HEAD", help="new revision")
+    diff.add_argument("--format", choices=FORMATS, default="text")
+    diff.set_defaults(command=run_diff)
+
+    query = subparsers.add_parser(
+        "query", parents=[options, caching], help="look symbols of a repository up"
+    )
+    query.add_argument("path", type=Path, help="repository directory")
+    query.add_argument("text", help="name, prefix or approximate name")
+    query.add_argument("--mode", choices=QUERIES, default="prefix")
+    query.add_argument("--limit", type=int, default=None)
+    query.add_argument("--format", choices=FORMATS, default="text")
+    query.set_defaults(command=run_query)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the `prypy` command.
+
+    Parameters
+    ----------
+    argv : list[str] | None
+        Command line arguments, those of the process if ``None``.
+
+    Returns
+    -------
+    int
+        Exit status, 1 if any repository or module could not be read.
+    """
+    args = build_parser().parse_args(argv)
+    if args.workers == 0:
+        args.workers = None
+    try:
+        return args.command(args, sys.stdout)
+
+    # Stop quietly when the output is closed early, e.g. by `head`
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except SyntaxError as error:
+        print(f"prypy: {error.filename}:{error.lineno}: {error.msg}", file=sys.stderr)
+        return 1
+    except (ValueError, NotImplementedError, OSError) as error:
+        print(f"prypy: {error}", file=sys.stderr)
+        return 1
+
+
+def open_cache(args: argparse.Namespace, path: Path) -> Any:
+    if not args.cache:
+        return None
+    from prypy import cache
+
+    return cache.ModuleCache.for_repository(path)
+
+
+def read(args: argparse.Namespace) -> models.Repository:
+    from prypy import models
+
+    module_cache = open_cache(args, args.path)
+    try:
+        return models.Repository.from_path(
+            args.path,
+            engine=args.engine,
+            workers=args.workers,
+            executor=args.executor,
+            cache=module_cache,
+        )
+    finally:
+        if module_cache is not None:
+            module_cache.close()
+
+
+def run_scan(args: argparse.Namespace, file: TextIO) -> int:
+    from prypy import discovery, models, scan
+
+    # Stream modules without linking them into a model, skipping those which
+    # cannot be parsed
+    path = models.Repository.find_source(args.path)
+    module_cache = open_cache(args, args.path)
+    errors = {}
+    try:
+        modules = scan.iter_modules(
+            path,
+            args.engine,
+            args.workers,
+            args.executor,
+            module_cache,
+            discovery.IgnoreRules.from_gitignore(args.path),
+            errors,
+        )
+        for module in modules:
+            symbols = module.iter_symbols() if args.symbols else [module]
+            write(file, symbols, args.format)
+    finally:
+        if module_cache is not None:
+            module_cache.close()
+    for module_path, error in errors.items():
+        print(f"prypy: {module_path}: {error}", file=sys.stderr)
+    return 1 if len(errors) > 0 else 0
+
+
+def run_tree(args: argparse.Namespace, file: TextIO) -> int:
+    from prypy import render
+
+    render.render(read(args), file, args.depth, args.symbols)
+    return 0
+
+
+def run_stats(args: argparse.Namespace, file: TextIO) -> int:
+    from prypy import reader
+
+    batch = reader.read_repositories(
+        args.paths, engine=args.engine, workers=args.workers, executor=args.executor
+    )
+    for path, error in batch.errors.items():
+        print(f"prypy: {path}: {error}", file=sys.stderr)
+    if args.format == "jsonl":
+        import json
+
+        file.write(json.dumps(batch.stats) + "\n")
+    else:
+        file.writelines(f"{name}: {value}\n" for name, value in batch.stats.items())
+    return 1 if len(batch.errors) > 0 else 0
+
+
+def run_diff(args: argparse.Namespace, file: TextIO) -> int:
+    from prypy import diff
+
+    delta = diff.diff(
+        args.path,
+        args.old,
+        args.new,
+        engine=args.engine,
+        workers=args.workers,
+        executor=args.executor,
+    )
+    for module_path, error in delta.errors.items():
+        print(f"prypy: {module_path}: {error}", file=sys.stderr)
+    status = 1 if len(delta.errors) > 0 else 0
+    changes = [
+        *(("added", symbol) for symbol in delta.added.values()),
+        *(("removed", symbol) for symbol in delta.removed.values()),
+        *(("changed", new) for _, new in delta.changed.values()),
+    ]
+    if args.format == "text":
+        from prypy import utils
+
+        prefixes = {"added": "+", "removed": "-", "changed": "~"}
+        file.writelines(
+            f"{prefixes[change]} {utils.qualified_name(symbol)}\n"
+            for change, symbol in changes
+        )
+        return status
+
+    import json
+
+    for change, symbol in changes:
+        file.write(json.dumps({"change": change, **record(symbol)}) + "\n")
+    return status
+
+
+def run_query(args: argparse.Namespace, file: TextIO) -> int:
+    from prypy import callgraph, importgraph, index
+
+    repository = read(args)
+    match args.mode:
+        # Look names up in the symbol index
+        case "prefix" | "exact" | "fuzzy":
+            symbols = index.SymbolIndex.from_repository(repository)
+            if args.mode == "prefix":
+                found = symbols.prefix(args.text, args.limit)
+            elif args.mode == "exact":
+                found = [symbols.get(args.text)] if args.text in symbols else []
+            else:
+                found = symbols.fuzzy(args.text, args.limit or 10)
+
+        # Follow calls between functions
+        case "callers" | "callees":
+            graph = callgraph.CallGraph.from_repository(repository)
+            found = getattr(graph, args.mode)(args.text)[: args.limit]
+
+        # Follow imports between modules
+        case "importers" | "dependencies":
+            graph = importgraph.ImportGraph.from_repository(repository)
+            found = getattr(graph, args.mode)(args.text)[: args.limit]
+
+    write(file, found, args.format)
+    return 0
+
+
+def write(file: TextIO, symbols: Iterable[Any], output: str) -> None:
+    """Write symbols one per line, as qualified names or JSON objects.
+
+    Parameters
+    ----------
+    file : TextIO
+        File the lines are written to.
+    symbols : Iterable[Any]
+        Packages, modules, classes, functions or variables.
+    output : str
+        Output format, ``"text"`` or ``"jsonl"``.
+    """
+    from prypy import utils
+
+    if output == "text":
+        file.writelines(f"{utils.qualified_name(symbol)}\n" for symbol in symbols)
+        return
+
+    import json
+
+    for symbol in symbols:
+        file.write(json.dumps(record(symbol)) + "\n")
+
+
+def record(symbol: Any) -> dict[str, Any]:
+    """Describe a symbol with JSON-serializable values.
+
+    Parameters
+    ----------
+    symbol : Any
+        Package, module, class, function or variable.
+
+    Returns
+    -------
+    dict[str, Any]
+        Kind and qualified name of the symbol, then the fields of its kind.
+    """
+    from prypy import models, utils
+
+    item = {"kind": type(symbol).__name__.lower(), "name": utils.qualified_name(symbol)}
+    if isinstance(symbol, (models.Package, models.Module)):
+        item["path"] = None if symbol.path is None else str(symbol.path)
+    elif isinstance(symbol, models.Class):
+        item["decorators"] = symbol.decorators
+    elif isinstance(symbol, models.Function):
+        item["inputs"] = [variable.name for variable in symbol.input]
+        item["output"] = [variable.type for variable in symbol.output]
+        item["lines"] = symbol.lines
+        item["asynchronous"] = symbol.asynchronous
+        item["decorators"] = symbol.decorators
+        item["calls"] = symbol.calls
+    elif isinstance(symbol, models.Variable):
+        item["type"] = symbol.type
+        item["value"] = symbol.value
+    return item
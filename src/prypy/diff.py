@@ -0,0 +1,379 @@
+"""Compare the symbols of a repository between two git revisions.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Any
+from itertools import repeat
+from pathlib import Path, PurePosixPath
+import os
+import subprocess
+
+from prypy import models, profiling, scan, utils
+
+
+# Classes
+
+
+class ObjectReader:
+    """Reader of objects straight from the object store of a git repository.
+
+    A single `git cat-file` process serves every request, so that reading a
+    blob costs a pipe round trip rather than a process or a checkout.
+
+    Parameters
+    ----------
+    path : Path
+        Directory within the git work tree, which `./` paths are relative to.
+    check : bool
+        Whether to only check that objects exist, without reading them.
+
+    Methods
+    -------
+    read(name)
+        Content of an object, or ``None`` if it does not exist.
+    exists(name)
+        Whether an object exists.
+    close()
+        Stop the git process.
+    """
+
+    def __init__(self, path: Path, check: bool = False):
+        self.process = subprocess.Popen(
+            [
+                "git",
+                "-C",
+                str(path),
+                "cat-file",
+                "--batch-check" if check else "--batch",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def __enter__(self) -> ObjectReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def request(self, name: str) -> list[bytes] | None:
+        self.process.stdin.write(name.encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if (len(header) != 3) or (header[-1] == b"missing"):
+            return None
+        return header
+
+    def read(self, name: str) -> bytes | None:
+        header = self.request(name)
+        if header is None:
+            return None
+        data = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)
+        return data
+
+    def exists(self, name: str) -> bool:
+        return self.request(name) is not None
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+
+
+class Delta:
+    """Symbols added, removed and changed between two revisions.
+
+    Symbols are keyed by qualified name and sorted by it. A symbol present at
+    both revisions is changed if any extracted field differs, such as the
+    value of a variable, or the signature, decorators or callees of a
+    function. Modules which cannot be parsed at either revision are reported
+    in `errors`, and their symbols are left out at both revisions.
+
+    Parameters
+    ----------
+    added : dict[str, Any]
+        Classes, functions and variables only found at the new revision.
+    removed : dict[str, Any]
+        Classes, functions and variables only found at the old revision.
+    changed : dict[str, tuple[Any, Any]]
+        Old and new version of the other symbols which differ.
+    errors : dict[Path, Exception] | None
+        Error which prevented parsing each unparsable module, from the new
+        revision if it failed at both.
+    """
+
+    def __init__(
+        self,
+        added: dict[str, Any],
+        removed: dict[str, Any],
+        changed: dict[str, tuple[Any, Any]],
+        errors: dict[Path, Exception] | None = None,
+    ):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.errors = {} if errors is None else errors
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+# Functions
+
+
+def git(path: Path, *args: str) -> bytes:
+    """Run a git command in a directory, raising `ValueError` if it fails.
+
+    Parameters
+    ----------
+    path : Path
+        Directory the command is run in.
+    *args : str
+        Arguments of the git command.
+
+    Returns
+    -------
+    bytes
+        Standard output of the command.
+    """
+    result = subprocess.run(["git", "-C", str(path), *args], capture_output=True)
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise ValueError(f"git {args[0]} failed in {path}: {message}")
+    return result.stdout
+
+
+def changed_files(
+    path: Path, old: str, new: str, source: PurePosixPath
+) -> dict[PurePosixPath, tuple[str, str]]:
+    """List the modules whose blobs differ between two revisions.
+
+    Modules of directories which gained or lost their `__init__` module are
+    listed too, as they joined or left the package tree.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the repository.
+    old : str
+        Old revision.
+    new : str
+        New revision.
+    source : PurePosixPath
+        Path to the source package relative to the repository.
+
+    Returns
+    -------
+    dict[PurePosixPath, tuple[str, str]]
+        Old and new blob hash of each module relative to the repository,
+        made of zeros where it does not exist.
+    """
+    # Compare trees, which skips identical subtrees by hash
+    output = git(
+        path,
+        "diff-tree",
+        "-r",
+        "-z",
+        "--no-renames",
+        "--relative",
+        old,
+        new,
+        "--",
+        str(source),
+    )
+    fields = output.split(b"\0")
+    files = {}
+    packages = []
+    for header, name in zip(fields[0::2], fields[1::2]):
+        _, _, old_blob, new_blob, status = header.decode().split()
+        file = PurePosixPath(os.fsdecode(name))
+        if file.suffix != ".py":
+            continue
+        files[file] = (old_blob, new_blob)
+        if (file.name == "__init__.py") and (status in ("A", "D")):
+            packages.append(file.parent)
+
+    # Add unchanged modules of packages which appeared or disappeared
+    for package in packages:
+        for i, revision in enumerate((old, new)):
+            output = git(path, "ls-tree", "-r", "-z", revision, "--", f"./{package}")
+            for entry in output.split(b"\0")[:-1]:
+                header, _, name = entry.partition(b"\t")
+                file = PurePosixPath(os.fsdecode(name))
+                if file.suffix == ".py":
+                    blobs = list(files.get(file, ("0", "0")))
+                    blobs[i] = header.split()[2].decode()
+                    files[file] = tuple(blobs)
+    return files
+
+
+def diff(
+    path: Path,
+    old: str,
+    new: str = "HEAD",
+    mode: str = "src",
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+) -> Delta:
+    """Compare the symbols of a repository between two git revisions.
+
+    Only modules whose blob differs are read, straight from the object store,
+    and parsed, so the work grows with the size of the change rather than
+    the size of the repository.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the repository, within a git work tree.
+    old : str
+        Old revision, such as the base of a pull request.
+    new : str
+        New revision.
+    mode : str
+        Package discovery mode passed to `Repository.find_source`, applied to
+        the work tree.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+
+    Returns
+    -------
+    Delta
+        Classes, functions and variables added, removed and changed.
+    """
+    if executor not in scan.EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    source = PurePosixPath(
+        models.Repository.find_source(path, mode).relative_to(path).as_posix()
+    )
+    with profiling.span("walk", path):
+        files = changed_files(path, old, new, source)
+
+    # Read blobs of modules within the package tree at each revision
+    pending = []
+    with ObjectReader(path) as reader, ObjectReader(path, check=True) as checker:
+        packages = {}
+
+        def package_for(revision: str, directory: PurePosixPath) -> models.Package:
+            # Link packages of a revision, checking they have an `__init__`
+            key = (revision, directory)
+            if key not in packages:
+                parent = None
+                if directory != source:
+                    parent = package_for(revision, directory.parent)
+                exists = checker.exists(f"{revision}:./{directory}/__init__.py")
+                packages[key] = None
+                if (parent is not None or directory == source) and exists:
+                    packages[key] = models.Package(
+                        directory.name, [], [], parent, path / directory
+                    )
+            return packages[key]
+
+        for file, blobs in sorted(files.items()):
+            for side, (revision, blob) in enumerate(zip((old, new), blobs)):
+                if blob.strip("0") == "":
+                    continue
+                package = package_for(revision, file.parent)
+                if package is not None:
+                    with profiling.span("read", path / file):
+                        data = reader.read(blob)
+                    pending.append((side, package, path / file, data))
+
+    # Parse modules, possibly in parallel, keeping errors of unparsable ones
+    arguments = ([data for *_, data in pending], [p for _, _, p, _ in pending])
+    if (workers <= 1) or (len(pending) <= 1):
+        modules = list(map(parse_safely, *arguments, repeat(engine)))
+    else:
+        with scan.EXECUTORS[executor](max_workers=workers) as pool:
+            modules = list(pool.map(parse_safely, *arguments, repeat(engine)))
+    errors = {
+        module_path: module
+        for (_, _, module_path, _), module in zip(pending, modules)
+        if isinstance(module, Exception)
+    }
+
+    # Collect symbols of each revision by qualified name
+    old_symbols, new_symbols = {}, {}
+    for (side, package, module_path, _), module in zip(pending, modules):
+        if module_path in errors:
+            continue
+        module.parent = package
+        for symbol in module.iter_symbols():
+            if symbol is not module:
+                symbols = new_symbols if side == 1 else old_symbols
+                symbols[utils.qualified_name(symbol)] = symbol
+
+    return Delta(
+        {name: new_symbols[name] for name in sorted(new_symbols.keys() - old_symbols)},
+        {name: old_symbols[name] for name in sorted(old_symbols.keys() - new_symbols)},
+        {
+            name: (old_symbols[name], new_symbols[name])
+            for name in sorted(old_symbols.keys() & new_symbols.keys())
+            if fingerprint(old_symbols[name]) != fingerprint(new_symbols[name])
+        },
+        errors,
+    )
+
+
+def parse_safely(
+    data: bytes, path: Path, engine: str = "ast"
+) -> models.Module | Exception:
+    """Parse a module blob, returning rather than raising parsing errors.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of the module blob.
+    path : Path
+        Path of the module in the work tree.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+
+    Returns
+    -------
+    models.Module | Exception
+        Parsed module without a parent, or the error raised by the parser.
+    """
+    try:
+        return scan.parse_data(data, path, engine)
+    except scan.PARSE_ERRORS as error:
+        return error
+
+
+def fingerprint(symbol: models.Class | models.Function | models.Variable) -> tuple:
+    """Return the extracted fields of a symbol, excluding its members.
+
+    Parameters
+    ----------
+    symbol : models.Class | models.Function | models.Variable
+        Symbol to be compared.
+
+    Returns
+    -------
+    tuple
+        Fields which differ if the symbol changed.
+    """
+    if isinstance(symbol, models.Variable):
+        return (symbol.type, symbol.value)
+    if isinstance(symbol, models.Function):
+        return (
+            tuple((v.name, v.type, v.value) for v in symbol.input),
+            tuple(v.type for v in symbol.output),
+            tuple(symbol.decorators),
+            symbol.asynchronous,
+            tuple(symbol.calls),
+        )
+    return (tuple(symbol.decorators),)
@@ -0,0 +1,204 @@
+"""Discover package contents while skipping ignored files and directories.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from pathlib import Path
+import os
+import re
+
+
+# Constants
+
+
+DEFAULT_IGNORE = [
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".tox/",
+    ".nox/",
+    ".venv/",
+    "node_modules/",
+    "__pycache__/",
+    "*.egg-info/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".prypy_cache/",
+    # Anchor names which may also be those of subpackages
+    "/venv/",
+    "/env/",
+    "/build/",
+    "/dist/",
+]
+
+
+# Classes
+
+
+class IgnoreRules:
+    """Subset of `.gitignore` pattern matching relative to a root directory.
+
+    Supports comments, `!` negation, trailing `/` for directories only,
+    leading or inner `/` anchoring patterns to the root, and the `*`, `**`,
+    `?` and `[...]` wildcards. As in git, the last matching pattern wins.
+
+    Parameters
+    ----------
+    root : Path
+        Directory which anchored patterns are relative to.
+    patterns : list[str]
+        Lines of a `.gitignore` file.
+
+    Methods
+    -------
+    from_gitignore(root, defaults)
+        Read rules from the `.gitignore` file of `root`, if any.
+    ignores(path, is_dir)
+        Return whether a path relative to the root is ignored.
+    excludes(path, is_dir)
+        Return whether a path is ignored or lies in an ignored directory.
+    prefix(directory)
+        Path of a directory relative to the root, as matched by `ignores`.
+    """
+
+    def __init__(self, root: Path, patterns: list[str]):
+        self.root = root
+        self.rules = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if (len(pattern) == 0) or pattern.startswith("#"):
+                continue
+
+            # Parse pattern modifiers
+            negate = pattern.startswith("!")
+            pattern = pattern.removeprefix("!")
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored = "/" in pattern
+            pattern = pattern.removeprefix("/")
+
+            regex = translate(pattern)
+            if not anchored:
+                regex = f"(?:.*/)?{regex}"
+            self.rules.append((re.compile(regex), negate, dir_only))
+
+    @classmethod
+    def from_gitignore(cls, root: Path, defaults: bool = True) -> IgnoreRules:
+        patterns = list(DEFAULT_IGNORE) if defaults else []
+        try:
+            with open(root / ".gitignore", mode="r") as file:
+                patterns.extend(file.read().splitlines())
+        except FileNotFoundError:
+            pass
+        return IgnoreRules(root, patterns)
+
+    def ignores(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        for regex, negate, dir_only in self.rules:
+            if (dir_only and not is_dir) or (ignored != negate):
+                continue
+            if regex.fullmatch(path) is not None:
+                ignored = not negate
+        return ignored
+
+    def excludes(self, path: Path, is_dir: bool) -> bool:
+        # Check each directory down from the root, as git never enters ignored
+        # directories to find the files within
+        parts = Path(os.path.relpath(path, self.root)).parts
+        if (len(parts) == 0) or (parts[0] in (".", "..")):
+            return False
+        for i in range(1, len(parts) + 1):
+            if self.ignores("/".join(parts[:i]), is_dir or (i < len(parts))):
+                return True
+        return False
+
+    def prefix(self, directory: Path | str) -> str:
+        prefix = os.path.relpath(directory, self.root)
+        return "" if prefix == "." else prefix.replace(os.sep, "/") + "/"
+
+
+# Functions
+
+
+def translate(pattern: str) -> str:
+    """Translate a `.gitignore` glob into a regular expression.
+
+    Parameters
+    ----------
+    pattern : str
+        Glob without modifiers, with `/` separating path components.
+
+    Returns
+    -------
+    str
+        Regular expression matching relative paths.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif (pattern[i] == "[") and ("]" in pattern[i + 2 :]):
+            # Negate classes starting with `!`, keeping other `!` literal
+            j = pattern.index("]", i + 2)
+            start = i + 1
+            regex += "["
+            if pattern[i + 1] == "!":
+                regex += "^"
+                start += 1
+            regex += pattern[start:j] + "]"
+            i = j + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def list_directory(
+    path: Path, rules: IgnoreRules | None = None
+) -> tuple[list[Path], list[Path]]:
+    """List a directory once, splitting subdirectories from files.
+
+    Entry types come from the directory listing itself, so no item is stat-ed
+    unless the file system does not report them.
+
+    Parameters
+    ----------
+    path : Path
+        Directory to be listed.
+    rules : IgnoreRules | None
+        Rules excluding items, which are then neither returned nor entered.
+
+    Returns
+    -------
+    tuple[list[Path], list[Path]]
+        Paths to subdirectories and to files, both sorted by name.
+    """
+    if rules is not None:
+        prefix = rules.prefix(path)
+
+    directories, files = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            is_dir = entry.is_dir()
+            if (rules is not None) and rules.ignores(prefix + entry.name, is_dir):
+                continue
+            (directories if is_dir else files).append(entry.name)
+
+    directories.sort()
+    files.sort()
+    return [path / name for name in directories], [path / name for name in files]
@@ -0,0 +1,287 @@
+"""Repository-wide module dependency graph built from module imports.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Iterable
+import operator
+
+from prypy import models, utils
+
+
+# Classes
+
+
+class ImportGraph:
+    """Module dependency graph indexed by integer module IDs.
+
+    Dependencies and importers of each module are stored as compressed sparse
+    rows, and strongly connected components are computed once per build or
+    update so that cycle, ordering and layering queries are linear at most.
+
+    The names each import was looked up under are recorded, so that `update`
+    resolves again only the imports of re-parsed modules and of modules whose
+    imports named re-parsed modules, then splices their rows into the arrays.
+    IDs of dropped modules are left empty and reused by added modules. The
+    components are then found again over the integer arrays, which is linear
+    in the size of the graph but involves no name resolution.
+
+    Methods
+    -------
+    from_modules(modules)
+        Build an import graph, resolving imports across the passed modules.
+    from_repository(repository)
+        Build the import graph of a whole repository.
+    dependencies(name)
+        Modules imported by the named module.
+    importers(name)
+        Modules importing the named module.
+    transitive_dependencies(name)
+        Modules the named module depends on, directly or not.
+    transitive_importers(name)
+        Modules depending on the named module, directly or not.
+    cycles()
+        Groups of modules importing each other.
+    topological_order()
+        Modules ordered with dependencies first.
+    layers()
+        Modules grouped by their depth in the dependency hierarchy.
+    update(removed, added)
+        Patch the graph for re-parsed modules, for use as a `watch.Session`
+        listener.
+    id_of(name)
+        ID of the named module, raising `ValueError` if unknown.
+    """
+
+    def __init__(self):
+        self.modules = []
+        self.free = []
+        self.ids = {}
+        self.lookups = {}
+        self.lookers = {}
+        self.dependency_offsets, self.dependency_ids = utils.compress(0, [])
+        self.importer_offsets, self.importer_ids = utils.compress(0, [])
+        self.components = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_modules(cls, modules: Iterable[models.Module]) -> ImportGraph:
+        """Build an import graph and fill `Module.imports` of each module.
+
+        Imports of modules are resolved to the modules themselves, and imports
+        of other objects to the modules defining them. Imports from outside
+        the passed modules are left out.
+
+        Parameters
+        ----------
+        modules : Iterable[models.Module]
+            Modules linked to their packages.
+
+        Returns
+        -------
+        ImportGraph
+            Graph of imports between the passed modules.
+        """
+        graph = ImportGraph()
+        graph.update([], list(modules))
+        return graph
+
+    @classmethod
+    def from_repository(cls, repository: models.Repository) -> ImportGraph:
+        return ImportGraph.from_modules(repository.source.iter_modules())
+
+    def dependencies(self, name: str) -> list[models.Module]:
+        i = self.id_of(name)
+        return [
+            self.modules[j]
+            for j in self.dependency_ids[
+                self.dependency_offsets[i] : self.dependency_offsets[i + 1]
+            ]
+        ]
+
+    def importers(self, name: str) -> list[models.Module]:
+        i = self.id_of(name)
+        return [
+            self.modules[j]
+            for j in self.importer_ids[
+                self.importer_offsets[i] : self.importer_offsets[i + 1]
+            ]
+        ]
+
+    def transitive_dependencies(self, name: str) -> list[models.Module]:
+        return [
+            self.modules[j]
+            for j in sorted(
+                utils.traverse(
+                    self.id_of(name), self.dependency_offsets, self.dependency_ids
+                )
+            )
+        ]
+
+    def transitive_importers(self, name: str) -> list[models.Module]:
+        return [
+            self.modules[j]
+            for j in sorted(
+                utils.traverse(
+                    self.id_of(name), self.importer_offsets, self.importer_ids
+                )
+            )
+        ]
+
+    def cycles(self) -> list[list[models.Module]]:
+        return [
+            [self.modules[i] for i in sorted(component)]
+            for component in self.components
+            if len(component) > 1
+        ]
+
+    def topological_order(self) -> list[models.Module]:
+        """Order modules so that each one comes after its dependencies.
+
+        Modules in an import cycle cannot be ordered and are placed next to
+        each other, after the dependencies of the whole cycle.
+
+        Returns
+        -------
+        list[models.Module]
+            Every module of the graph.
+        """
+        return [
+            self.modules[i]
+            for component in self.components
+            for i in sorted(component)
+            if self.modules[i] is not None
+        ]
+
+    def layers(self) -> list[list[models.Module]]:
+        """Group modules by the length of their longest chain of dependencies.
+
+        Layer 0 holds modules without dependencies, and each other module sits
+        one layer above its highest dependency. Modules in an import cycle
+        share a layer.
+
+        Returns
+        -------
+        list[list[models.Module]]
+            Modules of each layer, from the bottom up.
+        """
+        component_of = [0] * len(self.modules)
+        for c, component in enumerate(self.components):
+            for i in component:
+                component_of[i] = c
+
+        # Components come after their dependencies, so one pass suffices
+        depth = [0] * len(self.components)
+        for c, component in enumerate(self.components):
+            for i in component:
+                for j in self.dependency_ids[
+                    self.dependency_offsets[i] : self.dependency_offsets[i + 1]
+                ]:
+                    if component_of[j] != c:
+                        depth[c] = max(depth[c], depth[component_of[j]] + 1)
+
+        layers = [[] for _ in range(max(depth, default=-1) + 1)]
+        for c, component in enumerate(self.components):
+            layers[depth[c]].extend(
+                self.modules[i]
+                for i in sorted(component)
+                if self.modules[i] is not None
+            )
+        return layers
+
+    def update(self, removed: list[models.Module], added: list[models.Module]) -> None:
+        rows = {}
+        removed, added = utils.replaced(self.find, removed, added)
+
+        # Drop removed modules, freeing their IDs
+        changed = set()
+        for module in removed:
+            name = utils.qualified_name(module)
+            changed.add(name)
+            i = self.ids.pop(name)
+            self.forget(i)
+            self.modules[i] = None
+            self.free.append(i)
+            rows[i] = []
+
+        # Number added modules, reusing free IDs first
+        resolving = []
+        for module in added:
+            name = utils.qualified_name(module)
+            changed.add(name)
+            if len(self.free) > 0:
+                i = self.free.pop()
+            else:
+                i = len(self.modules)
+                self.modules.append(None)
+            self.modules[i] = module
+            self.ids[name] = i
+            resolving.append(i)
+
+        # Resolve imports of added modules and of those naming changed ones
+        for name in changed:
+            for i in self.lookers.pop(name, set()):
+                self.forget(i)
+                resolving.append(i)
+        for i in resolving:
+            rows[i] = self.resolve_imports(i)
+
+        # Splice changed dependency rows and the importer rows they affect,
+        # then find components again
+        importer_rows = utils.reverse_rows(
+            self.dependency_offsets,
+            self.dependency_ids,
+            self.importer_offsets,
+            self.importer_ids,
+            rows,
+        )
+        n = len(self.modules)
+        self.dependency_offsets, self.dependency_ids = utils.splice(
+            self.dependency_offsets, self.dependency_ids, rows, n
+        )
+        self.importer_offsets, self.importer_ids = utils.splice(
+            self.importer_offsets, self.importer_ids, importer_rows, n
+        )
+        self.components = utils.strongly_connected(
+            n, self.dependency_offsets, self.dependency_ids
+        )
+
+    def resolve_imports(self, importer: int) -> list[int]:
+        module = self.modules[importer]
+        package = utils.package_name(module)
+        imported, names = set(), set()
+        for import_name in module.import_names:
+            # Look imports up as modules, then as objects of their parent module
+            name = utils.absolute_name(import_name, package)
+            parent = name.rpartition(".")[0]
+            names.update((name, parent))
+            i = self.ids.get(name, self.ids.get(parent))
+            if (i is not None) and (i != importer):
+                imported.add(i)
+
+        # Store imported modules by name, and the names imports depend on
+        module.imports = sorted(
+            (self.modules[i] for i in imported), key=operator.attrgetter("name")
+        )
+        self.lookups[importer] = names
+        for name in names:
+            self.lookers.setdefault(name, set()).add(importer)
+        return sorted(imported)
+
+    def find(self, name: str) -> models.Module | None:
+        i = self.ids.get(name)
+        return None if i is None else self.modules[i]
+
+    def forget(self, i: int) -> None:
+        for name in self.lookups.pop(i, ()):
+            self.lookers.get(name, set()).discard(i)
+
+    def id_of(self, name: str) -> int:
+        if name not in self.ids:
+            raise ValueError(f"{name} is not a known module.")
+        return self.ids[name]
@@ -0,0 +1,269 @@
+"""Repository-wide symbol index with exact, prefix and fuzzy lookups.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Any, Iterable
+from collections import Counter
+import bisect
+
+from prypy import models, utils
+
+
+# Constants
+
+
+NGRAM = 3
+
+
+# Classes
+
+
+class SymbolIndex:
+    """Index of packages, modules and their symbols by qualified name.
+
+    Qualified names are kept in a sorted list for prefix search, and the
+    lowercase short name of each symbol is split into padded trigrams mapped
+    to the symbols containing them for fuzzy search. Classes, functions and
+    variables are held through the module defining them and found again on
+    each lookup, so that the index never holds module bodies, which a
+    `BodyCache` may drop and reload as new objects.
+
+    Parameters
+    ----------
+    symbols : Iterable[Any]
+        Packages, modules, classes, functions and variables to be indexed.
+
+    Methods
+    -------
+    from_repository(repository)
+        Index every package and module symbol of a repository.
+    get(name)
+        Symbol with the exact qualified name, or ``None``.
+    prefix(text, limit)
+        Symbols whose qualified name starts with `text`.
+    fuzzy(text, limit)
+        Symbols whose short name is most similar to `text`.
+    update(removed, added)
+        Replace the symbols of re-parsed modules, for use as a
+        `watch.Session` listener.
+    """
+
+    def __init__(self, symbols: Iterable[Any] = ()):
+        self.symbols = {}
+        self.names = []
+        self.ngrams = {}
+        for symbol in symbols:
+            self.symbols[utils.qualified_name(symbol)] = module_of(symbol)
+        self.names = sorted(self.symbols)
+        for name in self.names:
+            for ngram in ngrams(short_name(name)):
+                self.ngrams.setdefault(ngram, set()).add(name)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.symbols
+
+    @classmethod
+    def from_repository(cls, repository: models.Repository) -> SymbolIndex:
+        return SymbolIndex(
+            symbol
+            for module in repository.source.iter_modules()
+            for symbol in module_symbols(module)
+        )
+
+    def get(self, name: str) -> Any | None:
+        module = self.symbols.get(name)
+        if module is None:
+            return None
+
+        # Walk down from the module, through the members its symbols came from
+        symbol = module
+        module_name = utils.qualified_name(module)
+        if name != module_name:
+            for part in name[len(module_name) + 1 :].split("."):
+                symbol = member(symbol, part)
+                if symbol is None:
+                    return None
+        return symbol
+
+    def prefix(self, text: str, limit: int | None = None) -> list[Any]:
+        i = bisect.bisect_left(self.names, text)
+        j = len(self.names) if limit is None else min(len(self.names), i + limit)
+        matches = []
+        for name in self.names[i:j]:
+            if not name.startswith(text):
+                break
+            matches.append(self.get(name))
+        return matches
+
+    def fuzzy(self, text: str, limit: int = 10) -> list[Any]:
+        """Rank symbols by the trigrams their short name shares with a query.
+
+        Parameters
+        ----------
+        text : str
+            Approximate short name of the symbol.
+        limit : int
+            Maximum number of symbols returned.
+
+        Returns
+        -------
+        list[Any]
+            Best matching symbols, ties broken by shorter then sorted names.
+        """
+        query = ngrams(text.lower())
+        shared = Counter()
+        for ngram in query:
+            shared.update(self.ngrams.get(ngram, ()))
+
+        # Score by Dice coefficient of the two trigram sets
+        def score(name: str) -> tuple[float, int, str]:
+            n = len(ngrams(short_name(name)))
+            return (-2 * shared[name] / (n + len(query)), len(name), name)
+
+        return [self.get(name) for name in sorted(shared, key=score)[:limit]]
+
+    def add(self, symbol: Any) -> None:
+        name = utils.qualified_name(symbol)
+        if name not in self.symbols:
+            bisect.insort(self.names, name)
+            for ngram in ngrams(short_name(name)):
+                self.ngrams.setdefault(ngram, set()).add(name)
+        self.symbols[name] = module_of(symbol)
+
+    def remove(self, name: str) -> None:
+        if self.symbols.pop(name, None) is None:
+            return
+        del self.names[bisect.bisect_left(self.names, name)]
+        for ngram in ngrams(short_name(name)):
+            names = self.ngrams[ngram]
+            names.discard(name)
+            if len(names) == 0:
+                del self.ngrams[ngram]
+
+    def update(self, removed: list[models.Module], added: list[models.Module]) -> None:
+        for module in removed:
+            for symbol in module_symbols(module):
+                name = utils.qualified_name(symbol)
+                if self.symbols.get(name) is module_of(symbol):
+                    self.remove(name)
+        for module in added:
+            for symbol in module_symbols(module):
+                self.add(symbol)
+
+
+# Functions
+
+
+def module_symbols(module: models.Module) -> Iterable[Any]:
+    """Yield the symbols of a module, replacing `__init__` by its package.
+
+    Parameters
+    ----------
+    module : models.Module
+        Module linked to its package.
+
+    Yields
+    ------
+    Any
+        Module or package, then the symbols defined in the module.
+    """
+    symbols = module.iter_symbols()
+    if module.name == "__init__":
+        next(symbols)
+        yield module.parent
+    yield from symbols
+
+
+def module_of(symbol: Any) -> models.Module | models.Package:
+    """Return the module defining a symbol.
+
+    Parameters
+    ----------
+    symbol : Any
+        Package, module, class, function or variable, linked to its parents.
+
+    Returns
+    -------
+    models.Module | models.Package
+        First module among the symbol and its parents, or the package itself,
+        which shares the qualified name of its `__init__` module.
+    """
+    while not isinstance(symbol, (models.Module, models.Package)):
+        symbol = symbol.parent
+    return symbol
+
+
+def member(symbol: Any, name: str) -> Any | None:
+    """Find a member of a module, class or function indexed by `SymbolIndex`.
+
+    Parameters
+    ----------
+    symbol : Any
+        Module, class or function.
+    name : str
+        Name of the member.
+
+    Returns
+    -------
+    Any | None
+        Member yielded last by `Module.iter_symbols` among those with the name,
+        or ``None`` if there is none.
+    """
+    if isinstance(symbol, models.Module):
+        groups = (symbol.functions, symbol.classes, symbol.constants)
+    elif isinstance(symbol, models.Class):
+        groups = (
+            symbol.classes,
+            symbol.functions,
+            symbol.instance_attributes,
+            symbol.class_attributes,
+        )
+    elif isinstance(symbol, models.Function):
+        groups = (symbol.functions,)
+    else:
+        return None
+    for items in groups:
+        i = utils.find_sorted(items, name)
+        if i is not None:
+            return items[i]
+    return None
+
+
+def short_name(name: str) -> str:
+    """Return the lowercase last component of a qualified name.
+
+    Parameters
+    ----------
+    name : str
+        Dotted qualified name.
+
+    Returns
+    -------
+    str
+        Lowercase name of the symbol itself.
+    """
+    return name.rpartition(".")[2].lower()
+
+
+def ngrams(text: str) -> set[str]:
+    """Split a name into its trigrams, padded to weigh its start and end.
+
+    Parameters
+    ----------
+    text : str
+        Name to be split.
+
+    Returns
+    -------
+    set[str]
+        Distinct trigrams of the padded name.
+    """
+    padded = f"  {text} "
+    return {padded[i : i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
@@ -0,0 +1,18 @@
+"""Entry point of the `prypy` command.
+"""
+
+
+# Imports
+
+
+import sys
+
+from prypy import cli
+
+
+# Functions
+
+
+def main() -> None:
+    """Run the `prypy` command with the arguments of the process and exit."""
+    sys.exit(cli.main())
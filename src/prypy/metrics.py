@@ -0,0 +1,394 @@
+"""Per-symbol code metrics stored in columnar tables.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Any
+from array import array
+from itertools import accumulate
+from operator import sub
+from pathlib import Path
+import ast
+import os
+
+from prypy import blocks, discovery, models, profiling, scan, utils
+from prypy.source import Source
+
+
+# Constants
+
+
+KINDS = ("repository", "package", "module", "class", "function")
+COLUMNS = (
+    "code",
+    "complexity",
+    "nesting",
+    "parameters",
+    "documented",
+    "modules",
+    "classes",
+    "functions",
+)
+DEFINITIONS = frozenset((ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+BLOCKS = frozenset(
+    (
+        ast.If,
+        ast.For,
+        ast.AsyncFor,
+        ast.While,
+        ast.Try,
+        ast.TryStar,
+        ast.With,
+        ast.AsyncWith,
+        ast.Match,
+    )
+)
+DECISIONS = frozenset(
+    (
+        ast.If,
+        ast.IfExp,
+        ast.For,
+        ast.AsyncFor,
+        ast.While,
+        ast.ExceptHandler,
+        ast.Assert,
+        ast.match_case,
+    )
+)
+LEAVES = frozenset(
+    (ast.Name, ast.Constant, ast.Pass, ast.Break, ast.Continue, ast.alias)
+    + tuple(ast.expr_context.__subclasses__())
+    + tuple(ast.boolop.__subclasses__())
+    + tuple(ast.operator.__subclasses__())
+    + tuple(ast.unaryop.__subclasses__())
+    + tuple(ast.cmpop.__subclasses__())
+)
+
+
+# Classes
+
+
+class Metrics:
+    """Table of metrics with one row per symbol and one array per column.
+
+    Rows are repositories, packages, modules, classes and functions in
+    preorder, so that the descendants of each row directly follow it, and the
+    row index of the parent of each row is stored in `parents`. Values of a
+    row only cover its own code, excluding nested classes and functions, and
+    `rollup` adds the values of the descendants of each row.
+
+    Columns are ``code`` lines, excluding blank lines, comments and
+    docstrings, cyclomatic ``complexity``, which counts decision points plus
+    one for each function, deepest block ``nesting``, ``parameters`` of
+    functions, and ``documented``, ``modules``, ``classes`` and ``functions``
+    counts, so that docstring coverage and averages are ratios of totals.
+
+    Parameters
+    ----------
+    names : list[str]
+        Qualified name of each row.
+    kinds : array
+        Index in `KINDS` of the kind of each row.
+    parents : array
+        Row index of the parent of each row, or ``-1`` for roots.
+    columns : dict[str, array]
+        Values of each column in `COLUMNS`.
+
+    Methods
+    -------
+    add(name, kind, parent)
+        Append a row of zeros.
+    extend(table, parent)
+        Append the rows of another table under a row.
+    ends()
+        End of the slice of rows spanned by each row and its descendants.
+    rollup()
+        Table of the totals of each row and its descendants.
+    rows(kind)
+        Indices of the rows of a kind.
+    record(i)
+        Name, kind and values of a row.
+    """
+
+    def __init__(
+        self,
+        names: list[str] | None = None,
+        kinds: array | None = None,
+        parents: array | None = None,
+        columns: dict[str, array] | None = None,
+    ):
+        self.names = [] if names is None else names
+        self.kinds = array("b") if kinds is None else kinds
+        self.parents = array("q") if parents is None else parents
+        if columns is None:
+            columns = {name: array("q") for name in COLUMNS}
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, name: str) -> array:
+        return self.columns[name]
+
+    def add(self, name: str, kind: str, parent: int) -> int:
+        self.names.append(name)
+        self.kinds.append(KINDS.index(kind))
+        self.parents.append(parent)
+        for column in self.columns.values():
+            column.append(0)
+        return len(self.names) - 1
+
+    def extend(self, table: Metrics, parent: int) -> None:
+        offset = len(self)
+        self.names.extend(table.names)
+        self.kinds.extend(table.kinds)
+        self.parents.extend(parent if i < 0 else i + offset for i in table.parents)
+        for name, column in self.columns.items():
+            column.extend(table.columns[name])
+
+    def ends(self) -> array:
+        # Extend each parent to its last descendant, visiting children first
+        ends = array("q", range(1, len(self) + 1))
+        parents = self.parents
+        for i in range(len(self) - 1, -1, -1):
+            parent = parents[i]
+            if (parent >= 0) and (ends[i] > ends[parent]):
+                ends[parent] = ends[i]
+        return ends
+
+    def rollup(self) -> Metrics:
+        # Total each column over the contiguous slice of rows of each subtree,
+        # with prefix sums for counts and slice maxima for nesting
+        ends = self.ends()
+        columns = {}
+        for name, column in self.columns.items():
+            if name == "nesting":
+                slices = map(slice, range(len(column)), ends)
+                columns[name] = array("q", map(max, map(column.__getitem__, slices)))
+            else:
+                prefix = array("q", accumulate(column, initial=0))
+                columns[name] = array(
+                    "q", map(sub, map(prefix.__getitem__, ends), prefix)
+                )
+        return Metrics(self.names, self.kinds, self.parents, columns)
+
+    def rows(self, kind: str) -> list[int]:
+        kind = KINDS.index(kind)
+        return [i for i, row_kind in enumerate(self.kinds) if row_kind == kind]
+
+    def record(self, i: int) -> dict[str, Any]:
+        item = {"name": self.names[i], "kind": KINDS[self.kinds[i]]}
+        item.update((name, column[i]) for name, column in self.columns.items())
+        return item
+
+
+# Functions
+
+
+def measure(source: Source, name: str, tree: ast.Module | None = None) -> Metrics:
+    """Measure a module and its classes and functions in one syntax tree walk.
+
+    Parameters
+    ----------
+    source : Source
+        Source of the module.
+    name : str
+        Qualified name of the module.
+    tree : ast.Module | None
+        Syntax tree of `source`, parsed if ``None``.
+
+    Returns
+    -------
+    Metrics
+        Table whose first row is the module, with a parent of ``-1``.
+    """
+    if tree is None:
+        with profiling.span("parse"):
+            tree = ast.parse(source.text)
+    table = Metrics()
+    table.add(name, "module", -1)
+    table["modules"][0] = 1
+    code, complexity, nesting = table["code"], table["complexity"], table["nesting"]
+
+    # Own each line by the innermost definition spanning it, skipping docstrings
+    owners = array("q", [0]) * (len(source) + 2)
+
+    def document(node: ast.AST, row: int) -> None:
+        body = getattr(node, "body", [])
+        if (ast.get_docstring(node, clean=False) is not None) and (len(body) > 0):
+            table["documented"][row] = 1
+            for line in range(body[0].lineno, body[0].end_lineno + 1):
+                owners[line] = -1
+
+    document(tree, 0)
+    with profiling.span("measure"):
+        # Walk nodes in source order, so that definitions are added in preorder
+        nodes = [(child, tree, 0, 0) for child in reversed(tree.body)]
+        while len(nodes) > 0:
+            node, parent, row, depth = nodes.pop()
+            kind = type(node)
+            if kind in LEAVES:
+                continue
+
+            # Add a row for each definition, measured from its own depth
+            if kind in DEFINITIONS:
+                row = table.add(
+                    f"{table.names[row]}.{node.name}",
+                    "class" if kind is ast.ClassDef else "function",
+                    row,
+                )
+                depth = 0
+                start = min(
+                    [node.lineno]
+                    + [decorator.lineno for decorator in node.decorator_list]
+                )
+                owners[start : node.end_lineno + 1] = array("q", [row]) * (
+                    node.end_lineno + 1 - start
+                )
+                document(node, row)
+                if kind is ast.ClassDef:
+                    table["classes"][row] = 1
+                else:
+                    table["functions"][row] = 1
+                    complexity[row] = 1
+                    args = node.args
+                    table["parameters"][row] = (
+                        len(args.posonlyargs)
+                        + len(args.args)
+                        + len(args.kwonlyargs)
+                        + (args.vararg is not None)
+                        + (args.kwarg is not None)
+                    )
+
+            # Count decision points and blocks, keeping `elif` at its depth
+            else:
+                if (kind in BLOCKS) and not (
+                    (kind is ast.If)
+                    and (type(parent) is ast.If)
+                    and (node.col_offset == parent.col_offset)
+                ):
+                    depth += 1
+                    if depth > nesting[row]:
+                        nesting[row] = depth
+                if kind in DECISIONS:
+                    complexity[row] += 1
+                elif kind is ast.comprehension:
+                    complexity[row] += 1 + len(node.ifs)
+                elif kind is ast.BoolOp:
+                    complexity[row] += len(node.values) - 1
+            nodes.extend(
+                (child, node, row, depth)
+                for child in reversed(list(ast.iter_child_nodes(node)))
+            )
+
+    # Count lines left with code once comments and string contents are masked
+    for i, line in enumerate(Source(blocks.mask(source.text)), 1):
+        owner = owners[i]
+        if (owner >= 0) and (len(line.strip()) > 0):
+            code[owner] += 1
+    return table
+
+
+def measure_module(path: Path, name: str) -> tuple[models.Module, Metrics]:
+    """Read a module once, then model and measure it from one syntax tree.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the module.
+    name : str
+        Qualified name of the module.
+
+    Returns
+    -------
+    tuple[models.Module, Metrics]
+        Module without a parent, then its table, whose first row is the
+        module, with a parent of ``-1``.
+    """
+    with profiling.span("module", path):
+        with profiling.span("read"):
+            source = Source.from_path(path)
+        with profiling.span("parse"):
+            tree = ast.parse(source.text, str(path))
+        with profiling.span("extract"):
+            module = models.Module.from_node(tree, path.stem, None)
+        module.path = path
+        return module, measure(source, name, tree)
+
+
+def read_repositories(
+    paths: list[Path],
+    mode: str = "src",
+    workers: int | None = 1,
+    executor: str = "process",
+) -> tuple[list[models.Repository], Metrics]:
+    """Read and measure many repositories, parsing each module once.
+
+    Parameters
+    ----------
+    paths : list[Path]
+        Paths to the repositories.
+    mode : str
+        Package discovery mode passed to `Repository.find_source`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` measuring sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` or ``"thread"``.
+
+    Returns
+    -------
+    tuple[list[models.Repository], Metrics]
+        Repositories with all their modules parsed, then one table of their
+        packages, modules, classes and functions.
+    """
+    if executor not in scan.EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Discover package trees, deferring modules
+    repositories, pending = [], []
+    for path in paths:
+        repository = models.Repository(
+            path.name, path, ignore=discovery.IgnoreRules.from_gitignore(path)
+        )
+        walk = models.Package.walk(
+            models.Repository.find_source(path, mode), repository, repository.ignore
+        )
+        for package, module_path in walk:
+            if repository.source is None:
+                repository.source = package
+            name = utils.qualified_name(package)
+            if module_path.stem != "__init__":
+                name = f"{name}.{module_path.stem}"
+            pending.append((repository, package, module_path, name))
+        repositories.append(repository)
+
+    # Measure modules, possibly in parallel
+    paths = [module_path for _, _, module_path, _ in pending]
+    names = [name for _, _, _, name in pending]
+    if (workers <= 1) or (len(pending) <= 1):
+        results = map(measure_module, paths, names)
+    else:
+        chunksize = max(1, len(pending) // (workers * 4))
+        with scan.EXECUTORS[executor](max_workers=workers) as pool:
+            results = list(pool.map(measure_module, paths, names, chunksize=chunksize))
+
+    # Attach modules and append rows in walk order, which is preorder
+    table = Metrics()
+    rows = {}
+    for (repository, package, _, _), (module, module_table) in zip(pending, results):
+        if repository not in rows:
+            rows[repository] = table.add(repository.name, "repository", -1)
+        if package not in rows:
+            rows[package] = table.add(
+                utils.qualified_name(package), "package", rows[package.parent]
+            )
+        module.parent = package
+        package.modules.append(module)
+        table.extend(module_table, rows[package])
+    return repositories, table
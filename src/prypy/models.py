@@ -6,11 +6,39 @@
 
 
 from __future__ import annotations
-from typing import Any, Self
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Self
 from pathlib import Path
+import ast
+import keyword
 import operator
+import re
+import sys
 
-from prypy import utils
+from prypy import blocks, bodies, discovery, profiling, render, scan, snapshot, utils
+from prypy.blocks import BlockIndex
+from prypy.source import Source
+
+if TYPE_CHECKING:
+    from prypy.cache import ModuleCache
+    from prypy.discovery import IgnoreRules
+
+
+# Constants
+
+
+DEFINITION = re.compile(r"\s*(?:(async)\s+)?(def|class)\s+([A-Za-z_]\w*)")
+CALL = re.compile(r"(?<![\w.])([A-Za-z_]\w*(?:\s*\.\s*[A-Za-z_]\w*)*)\s*\(")
+IMPORT = re.compile(r"\s*import\s+(.*)", re.DOTALL)
+IMPORT_FROM = re.compile(r"\s*from\s+(\.*)\s*([\w.]*)\s+import\s+(.*)", re.DOTALL)
+ALIAS = re.compile(r"\s*([\w.*]+)(?:\s+as\s+(\w+))?\s*")
+COMPOUND = ("if", "elif", "else", "try", "except", "except*", "finally", "with")
+LOOPS = ("for", "while", "async")
+LEAVES = frozenset(
+    (ast.Name, ast.Constant, ast.Pass, ast.Break, ast.Continue)
+    + tuple(ast.expr_context.__subclasses__())
+    + tuple(ast.operator.__subclasses__())
+    + tuple(ast.cmpop.__subclasses__())
+)
 
 
 # Classes
@@ -20,6 +48,8 @@ from prypy import utils
 
 
 class Variable:
+    __slots__ = ("name", "type", "value", "parent")
+
     def __init__(
         self,
         name: str,
@@ -27,99 +57,534 @@ class Variable:
         value: Any | None,
         parent: Function | Class | Module,
     ):
-        self.name = name
-        self.type = type
+        self.name = sys.intern(name)
+        self.type = sys.intern(type) if isinstance(type, str) else type
         self.value = value
         self.parent = parent
 
     @classmethod
-    def from_line(cls, line: str, parent: Package) -> Self:
-        # TODO resolve unknown types
+    def from_line(
+        cls, line: str, parent: Function | Class | Module, masked: str | None = None
+    ) -> list[Self]:
+        if keyword.iskeyword(blocks.first_word(line)):
+            return []
+        assignment = blocks.split_assignment(line, masked)
+        if assignment is None:
+            return []
+        targets, variable_type, variable_value = assignment
+
+        # Store one variable per named target, unpacking tuples
+        variables = []
+        for target in targets:
+            if target.startswith("(") and target.endswith(")"):
+                target = target[1:-1]
+            for name in blocks.split(target, ","):
+                name = name.strip()
+                if name.isidentifier() and not keyword.iskeyword(name):
+                    variables.append(
+                        Variable(name, variable_type, variable_value, parent)
+                    )
+        return variables
+
+    @classmethod
+    def from_signature(
+        cls,
+        signature: list[str],
+        parent: Function,
+        masked: list[str] | None = None,
+    ) -> list[Self]:
+        if masked is None:
+            masked = [blocks.mask(parameter) for parameter in signature]
+        variables = []
+        for parameter, code in zip(signature, masked):
+            # Skip separators of positional-only and keyword-only parameters
+            parameter = blocks.strip(parameter, code)
+            code = blocks.strip(code, code)
+            stars = len(parameter) - len(parameter.lstrip("*"))
+            parameter, code = parameter[stars:], code[stars:]
+            if code.strip() in ("", "/"):
+                continue
 
-        if ":" in line:
-            constant_name = line.split(":")[0].strip()
-            constant_type = line.split(":")[1].split("=")[0].strip()
+            # Split default value, then annotation
+            hidden = blocks.hide_brackets(code)
+            equals = hidden.find("=")
+            value = None
+            if equals >= 0:
+                value = blocks.strip(parameter[equals + 1 :], code[equals + 1 :])
+                parameter, code, hidden = (
+                    parameter[:equals],
+                    code[:equals],
+                    hidden[:equals],
+                )
+            colon = hidden.find(":")
+            annotation = None
+            if colon >= 0:
+                annotation = blocks.strip(parameter[colon + 1 :], code[colon + 1 :])
+                parameter, code = parameter[:colon], code[:colon]
+            variables.append(
+                Variable(blocks.strip(parameter, code), annotation, value, parent)
+            )
+        return variables
+
+    @classmethod
+    def from_node(
+        cls, node: ast.Assign | ast.AnnAssign, parent: Function | Class | Module
+    ) -> list[Self]:
+        # Unpack annotated and plain assignments into targets and value
+        if isinstance(node, ast.AnnAssign):
+            targets = [node.target]
+            variable_type = ast.unparse(node.annotation)
         else:
-            constant_name = line.split("=")[0].strip()
-            constant_type = None
-        constant_value = line.split("=")[1].strip()
-        return Variable(constant_name, constant_type, constant_value, parent)
+            targets = node.targets
+            variable_type = None
+        variable_value = None if node.value is None else ast.unparse(node.value)
+
+        # Store one variable per named target, skipping attributes and subscripts
+        variables = []
+        for target in targets:
+            names = target.elts if isinstance(target, ast.Tuple) else [target]
+            for name in names:
+                if isinstance(name, ast.Name):
+                    variables.append(
+                        Variable(name.id, variable_type, variable_value, parent)
+                    )
+        return variables
 
     @classmethod
-    def from_signature(cls, signature: list[str], parent: Function) -> Self:
-        pass
+    def from_arg(cls, arg: ast.arg, default: ast.expr | None, parent: Function) -> Self:
+        arg_type = None if arg.annotation is None else ast.unparse(arg.annotation)
+        arg_value = None if default is None else ast.unparse(default)
+        return Variable(arg.arg, arg_type, arg_value, parent)
 
 
 class Constant(Variable):
+    __slots__ = ()
+
     def __init__(
         self, name: str, type: type, value: Any, parent: Function | Class | Module
     ):
         super().__init__(name, type, value, parent)
 
     @classmethod
-    def from_line(cls, line: str, parent: Function | Class | Module):
-        pass
+    def from_line(
+        cls, line: str, parent: Function | Class | Module, masked: str | None = None
+    ) -> list[Self]:
+        return [
+            Constant(variable.name, variable.type, variable.value, parent)
+            for variable in Variable.from_line(line, parent, masked)
+        ]
 
 
 class Function:
+    __slots__ = (
+        "name",
+        "input",
+        "output",
+        "calls",
+        "lines",
+        "parent",
+        "decorators",
+        "asynchronous",
+        "functions",
+    )
+
     def __init__(
         self,
         name: str,
         input: list[Variable],
         output: list[Variable],
-        calls: list[Self],
+        calls: list[str],
         lines: int,
         parent: Self | Class | Module,
+        decorators: list[str] | None = None,
+        asynchronous: bool = False,
+        functions: list[Self] | None = None,
     ) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.input = input
         self.output = output
         self.calls = calls
         self.lines = lines
         self.parent = parent
+        self.decorators = [] if decorators is None else decorators
+        self.asynchronous = asynchronous
+        self.functions = [] if functions is None else functions
+
+    def iter_functions(self) -> Iterator[Self]:
+        yield self
+        for function in self.functions:
+            yield from function.iter_functions()
+
+    @classmethod
+    def from_lines(
+        cls,
+        index: BlockIndex,
+        i: int,
+        parent: Self | Class | Module,
+        decorators: list[str] | None = None,
+        assignments: list[tuple[str, str]] | None = None,
+    ) -> Self:
+        # Parse signature from header
+        text, code = index.text(i), index.code(i)
+        header, body = blocks.split_header(text, code)
+        header_code, body_code = blocks.split_header(code, code)
+        hidden = blocks.hide_brackets(header_code)
+        definition = DEFINITION.match(hidden)
+        opening = hidden.index("(", definition.end())
+        closing = hidden.index(")", opening)
+        function = Function(
+            definition.group(3),
+            [],
+            [],
+            [],
+            index.end(i) - i + 1,
+            parent,
+            decorators,
+            definition.group(1) is not None,
+        )
+        parameters = header_code[opening + 1 : closing]
+        function.input = Variable.from_signature(
+            blocks.split(header[opening + 1 : closing], ",", parameters),
+            function,
+            blocks.split(parameters, ",", parameters),
+        )
+
+        # Store return annotation as output
+        returns = header[closing + 1 :].strip()
+        if returns.startswith("->"):
+            function.output.append(
+                Variable("return", returns[2:].strip(), None, function)
+            )
+
+        # Visit each logical line of the body once, skipping nested definitions
+        statements = [(body, body_code)]
+        nested_decorators = []
+        j, end = index.logical_end(i) + 1, index.end(i)
+        while j <= end:
+            if index.width(j) < 0:
+                j += 1
+                continue
+            text, code = index.text(j), index.code(j)
+            word = blocks.first_word(code)
+            definition = DEFINITION.match(code)
+            if word == "@":
+                nested_decorators.append(blocks.strip(text, code)[1:].strip())
+            elif definition is not None:
+                if definition.group(2) == "def":
+                    function.functions.append(
+                        Function.from_lines(index, j, function, nested_decorators)
+                    )
+                nested_decorators = []
+                j = index.end(j) + 1
+                continue
+            elif word in COMPOUND + LOOPS:
+                statements.extend(
+                    zip(
+                        blocks.split_header(text, code), blocks.split_header(code, code)
+                    )
+                )
+            else:
+                statements.append((text, code))
+            j = index.logical_end(j) + 1
+
+        # Store dotted names of callees in order of first call
+        called = set()
+        for _, code in statements:
+            for match in CALL.finditer(code):
+                callee = "".join(match.group(1).split())
+                if keyword.iskeyword(callee.split(".")[0]) or (callee in called):
+                    continue
+                called.add(callee)
+                function.calls.append(sys.intern(callee))
+        if assignments is not None:
+            assignments.extend(statements)
+
+        function.functions.sort(key=operator.attrgetter("name"))
+        return function
+
+    @classmethod
+    def from_node(
+        cls,
+        node: ast.FunctionDef | ast.AsyncFunctionDef,
+        parent: Self | Class | Module,
+        assignments: list[ast.Assign | ast.AnnAssign] | None = None,
+    ) -> Self:
+        function = Function(
+            node.name,
+            [],
+            [],
+            [],
+            node.end_lineno - node.lineno + 1,
+            parent,
+            [ast.unparse(decorator) for decorator in node.decorator_list],
+            isinstance(node, ast.AsyncFunctionDef),
+        )
+        args = node.args
+
+        # Pad positional defaults to align them with their arguments
+        positional = args.posonlyargs + args.args
+        defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+        for arg, default in zip(positional, defaults):
+            function.input.append(Variable.from_arg(arg, default, function))
+
+        # Add variadic and keyword-only arguments in signature order
+        if args.vararg is not None:
+            function.input.append(Variable.from_arg(args.vararg, None, function))
+        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+            function.input.append(Variable.from_arg(arg, default, function))
+        if args.kwarg is not None:
+            function.input.append(Variable.from_arg(args.kwarg, None, function))
+
+        # Store return annotation as output
+        if node.returns is not None:
+            function.output.append(
+                Variable("return", ast.unparse(node.returns), None, function)
+            )
+
+        # Walk body once, storing dotted names of callees in order of first call
+        # and leaving nested definitions to their own objects
+        called = set()
+        nodes = list(reversed(node.body))
+        while len(nodes) > 0:
+            child = nodes.pop()
+            kind = type(child)
+            if kind in LEAVES:
+                continue
+            elif kind is ast.Call:
+                callee = utils.dotted_name(child.func)
+                if (callee is not None) and (callee not in called):
+                    called.add(callee)
+                    function.calls.append(sys.intern(callee))
+            elif (kind is ast.FunctionDef) or (kind is ast.AsyncFunctionDef):
+                function.functions.append(Function.from_node(child, function))
+                continue
+            elif kind is ast.ClassDef:
+                continue
+            elif (assignments is not None) and (
+                (kind is ast.Assign) or (kind is ast.AnnAssign)
+            ):
+                assignments.append(child)
+            nodes.extend(reversed(list(ast.iter_child_nodes(child))))
+
+        function.functions.sort(key=operator.attrgetter("name"))
+        return function
 
 
 class Class:
+    __slots__ = (
+        "name",
+        "class_attributes",
+        "instance_attributes",
+        "functions",
+        "parent",
+        "classes",
+        "decorators",
+    )
+
     def __init__(
         self,
         name: str,
         class_attributes: list[Variable],
         instance_attributes: list[Variable],
         functions: list[Function],
-        parent: Module,
+        parent: Self | Module,
+        classes: list[Self] | None = None,
+        decorators: list[str] | None = None,
     ) -> None:
-        self.name = name
+        self.name = sys.intern(name)
         self.class_attributes = class_attributes
         self.instance_attributes = instance_attributes
         self.functions = functions
         self.parent = parent
+        self.classes = [] if classes is None else classes
+        self.decorators = [] if decorators is None else decorators
+
+    def iter_classes(self) -> Iterator[Self]:
+        yield self
+        for class_obj in self.classes:
+            yield from class_obj.iter_classes()
 
     @classmethod
-    def from_lines(cls, lines: list[str], parent: Module) -> Self:
-        print(lines)
-        # Get name and create object
-        if "(" in lines[0]:
-            class_name = lines[0].split("class")[1].split("(")[0].strip()
-        else:
-            class_name = lines[0].split("class")[1].split(":")[0].strip()
-        class_obj = Class(class_name, [], [], [], parent)
+    def from_lines(
+        cls,
+        index: BlockIndex,
+        i: int,
+        parent: Self | Module,
+        decorators: list[str] | None = None,
+    ) -> Self:
+        text, code = index.text(i), index.code(i)
+        header, body = blocks.split_header(text, code)
+        header_code, body_code = blocks.split_header(code, code)
+        definition = DEFINITION.match(header_code)
+        class_obj = Class(definition.group(3), [], [], [], parent, [], decorators)
+        instance_names = set()
+
+        # Visit statements of the block, jumping over nested blocks
+        decorators = []
+        statements = list(index.statements(i))
+        if len(body) > 0:
+            class_obj.class_attributes.extend(
+                Variable.from_line(body, class_obj, body_code)
+            )
+        for j in statements:
+            text, code = index.text(j), index.code(j)
+            word = blocks.first_word(code)
+            definition = DEFINITION.match(code)
+
+            # Collect decorators of the next definition
+            if word == "@":
+                decorators.append(blocks.strip(text, code)[1:].strip())
+                continue
+
+            # Add methods and collect attributes assigned to their instance
+            elif (definition is not None) and (definition.group(2) == "def"):
+                assignments = []
+                method = Function.from_lines(
+                    index, j, class_obj, decorators, assignments
+                )
+                class_obj.functions.append(method)
+                if len(method.input) > 0:
+                    prefix = f"{method.input[0].name}."
+                    for assignment, masked in assignments:
+                        if prefix not in masked:
+                            continue
+                        for statement, statement_code in zip(
+                            blocks.split(assignment, ";", masked),
+                            blocks.split(masked, ";", masked),
+                        ):
+                            parts = blocks.split_assignment(statement, statement_code)
+                            if parts is None:
+                                continue
+                            targets, attribute_type, attribute_value = parts
+                            for target in targets:
+                                name = target.removeprefix(prefix)
+                                if (
+                                    target.startswith(prefix)
+                                    and name.isidentifier()
+                                    and (name not in instance_names)
+                                ):
+                                    instance_names.add(name)
+                                    class_obj.instance_attributes.append(
+                                        Variable(
+                                            name,
+                                            attribute_type,
+                                            attribute_value,
+                                            class_obj,
+                                        )
+                                    )
+
+            # Add nested classes
+            elif definition is not None:
+                class_obj.classes.append(
+                    Class.from_lines(index, j, class_obj, decorators)
+                )
+
+            # Add class attributes
+            else:
+                for statement, statement_code in zip(
+                    blocks.split(text, ";", code), blocks.split(code, ";", code)
+                ):
+                    class_obj.class_attributes.extend(
+                        Variable.from_line(statement, class_obj, statement_code)
+                    )
+            decorators = []
+
+        # Sort items by name
+        class_obj.class_attributes.sort(key=operator.attrgetter("name"))
+        class_obj.instance_attributes.sort(key=operator.attrgetter("name"))
+        class_obj.functions.sort(key=operator.attrgetter("name"))
+        class_obj.classes.sort(key=operator.attrgetter("name"))
 
-        # Skip signature
-        j = 0
-        while (not lines[j].strip()[-1] == ":") and (j < len(lines)):
-            j += 1
+        return class_obj
 
-        print(lines[: j + 1])
+    @classmethod
+    def from_node(cls, node: ast.ClassDef, parent: Self | Module) -> Self:
+        class_obj = Class(
+            node.name,
+            [],
+            [],
+            [],
+            parent,
+            [],
+            [ast.unparse(decorator) for decorator in node.decorator_list],
+        )
+        instance_names = set()
+
+        for statement in node.body:
+            # Add class attributes
+            if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                class_obj.class_attributes.extend(
+                    Variable.from_node(statement, class_obj)
+                )
+
+            # Add nested classes
+            elif isinstance(statement, ast.ClassDef):
+                class_obj.classes.append(Class.from_node(statement, class_obj))
+
+            # Add methods and collect attributes assigned to their instance
+            elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                assignments = []
+                method = Function.from_node(statement, class_obj, assignments)
+                class_obj.functions.append(method)
+                if len(method.input) == 0:
+                    continue
+                instance = method.input[0].name
+                for child in assignments:
+                    if isinstance(child, ast.AnnAssign):
+                        targets = [child.target]
+                        attribute_type = ast.unparse(child.annotation)
+                    elif isinstance(child, ast.Assign):
+                        targets = child.targets
+                        attribute_type = None
+                    for target in targets:
+                        if (
+                            isinstance(target, ast.Attribute)
+                            and isinstance(target.value, ast.Name)
+                            and (target.value.id == instance)
+                            and (target.attr not in instance_names)
+                        ):
+                            instance_names.add(target.attr)
+                            attribute_value = (
+                                None
+                                if child.value is None
+                                else ast.unparse(child.value)
+                            )
+                            class_obj.instance_attributes.append(
+                                Variable(
+                                    target.attr,
+                                    attribute_type,
+                                    attribute_value,
+                                    class_obj,
+                                )
+                            )
+
+        # Sort items by name
+        class_obj.class_attributes.sort(key=operator.attrgetter("name"))
+        class_obj.instance_attributes.sort(key=operator.attrgetter("name"))
+        class_obj.functions.sort(key=operator.attrgetter("name"))
+        class_obj.classes.sort(key=operator.attrgetter("name"))
 
-        # Iterate over code block
-        while j < len(lines):
-            pass
+        return class_obj
 
 
 ## Package
 
 
 class Module:
+    __slots__ = (
+        "name",
+        "imports",
+        "constants",
+        "classes",
+        "functions",
+        "parent",
+        "path",
+        "aliases",
+        "import_names",
+        "loader",
+    )
+    BODY = ("imports", "constants", "classes", "functions", "aliases", "import_names")
+
     def __init__(
         self,
         name: str,
@@ -128,119 +593,243 @@ class Module:
         classes: list[Class],
         functions: list[Function],
         parent: Package,
+        path: Path | None = None,
+        aliases: dict[str, str] | None = None,
+        import_names: list[str] | None = None,
     ):
-        self.name = name
+        self.name = sys.intern(name)
         self.imports = imports
         self.constants = constants
         self.classes = classes
         self.functions = functions
         self.parent = parent
+        self.path = path
+        self.aliases = {} if aliases is None else aliases
+        self.import_names = [] if import_names is None else import_names
+        self.loader = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Load the body of lazily loaded modules on first access, or serve it on
+        # each access from a loader holding it
+        if (name in Module.BODY) and (self.loader is not None):
+            loader, self.loader = self.loader, None
+            body = loader(self)
+            if body is None:
+                return getattr(self, name)
+            self.loader = loader
+            return body[name]
+
+        # Locate lazily loaded modules within their package directory
+        if name == "path":
+            package_path = getattr(self.parent, "path", None)
+            self.path = (
+                None if package_path is None else package_path / f"{self.name}.py"
+            )
+            return self.path
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
 
     @classmethod
-    def from_path(cls, path: Path, parent: Package) -> Self:
-        # TODO remove
-        print("\n", path)
+    def lazy(
+        cls,
+        name: str,
+        parent: Package,
+        loader: Callable[[Self], dict[str, Any] | None],
+        path: Path | None = None,
+    ) -> Self:
+        """Create a module whose body is filled by `loader` on first access.
+
+        Parameters
+        ----------
+        name : str
+            Name of the module.
+        parent : Package
+            Package containing the module.
+        loader : Callable[[Module], dict[str, Any] | None]
+            Callback setting every attribute of `Module.BODY` on the module,
+            or returning them on each access without setting them.
+        path : Path | None
+            Path to the module, found in its package directory if not passed.
+
+        Returns
+        -------
+        Module
+            Module without a body.
+        """
+        module = Module.__new__(Module)
+        module.name = sys.intern(name)
+        module.parent = parent
+        module.loader = loader
+        if path is not None:
+            module.path = path
+        return module
 
-        # Create object
-        module = Module(path.stem, [], [], [], [], parent)
+    def iter_symbols(self) -> Iterator[Self | Class | Function | Variable]:
+        yield self
+        yield from self.constants
+        for class_obj in self.classes:
+            for nested in class_obj.iter_classes():
+                yield nested
+                yield from nested.class_attributes
+                yield from nested.instance_attributes
+                for function in nested.functions:
+                    yield from function.iter_functions()
+        for function in self.functions:
+            yield from function.iter_functions()
 
-        # Store code as list[str] with trimmed newline character
-        lines = [
-            line[:-1] if len(line) > 0 else line
-            for line in open(path, mode="r").readlines()
-        ]
+    @classmethod
+    def from_path(cls, path: Path, parent: Package, engine: str = "ast") -> Self:
+        with profiling.span("module", path):
+            with profiling.span("read"):
+                source = Source.from_path(path)
+            return Module.from_file(source, path, parent, engine)
 
-        # Iterate over each line of code
-        i = 0
-        while i < len(lines):
-            line = lines[i]
+    @classmethod
+    def from_data(
+        cls, data: bytes, path: Path, parent: Package, engine: str = "ast"
+    ) -> Self:
+        with profiling.span("module", path):
+            with profiling.span("decode"):
+                source = Source.from_bytes(data)
+            return Module.from_file(source, path, parent, engine)
 
-            # TODO remove
-            print(i, line)
+    @classmethod
+    def from_file(
+        cls, source: Source, path: Path, parent: Package, engine: str = "ast"
+    ) -> Self:
+        match engine:
+            # Parse module in a single pass over its syntax tree
+            case "ast":
+                module = Module.from_source(source.text, path.stem, parent, str(path))
+
+            # Parse module line by line
+            case "lines":
+                with profiling.span("extract"):
+                    module = Module.from_lines(source, path.stem, parent)
+
+            # Raise error if unknown parsing engine
+            case _:
+                raise NotImplementedError(f"{engine} is not a known parsing engine.")
 
-            # Skip empty lines and comments
-            if (len(line.strip()) == 0) or (line.strip()[0] == "#"):
-                i += 1
-                continue
-            # Skip multi-line strings
-            elif '"""' in line:
-                # If line is variable declaration, store if module-level constant
-                if (
-                    ("=" in line.split('"""')[0])
-                    and (line.split('"""')[0].split("=")[0].strip().isupper())
-                    and (utils.tab_level(line) == 0)
-                ):
-                    constant_name = line.split('"""')[0].split("=")[0].strip()
-                    constant_str = line.split('"""')[1].strip()
-
-                    # If only opening quotation mark is found, find closing mark
-                    if len(line.split('"""')) == 2:
-                        i += 1
-                        line = lines[i]
-                        while ('"""' not in line) and (i < len(lines)):
-                            constant_str += "\n" + line.strip()
-                            i += 1
-                            line = lines[i]
-                        if len(line.split('"""')[0].strip()) > 0:
-                            constant_str += "\n" + line.strip()
-
-                    # Create and store constant
-                    module.constants.append(
-                        Variable(constant_name, str, constant_str, module)
-                    )
+        profiling.count("lines", len(source))
+        profiling.count("classes", len(module.classes))
+        profiling.count("functions", len(module.functions))
+        module.path = path
+        return module
 
-                # Otherwise skip string
-                else:
-                    # If only opening quotation mark is found, find closing mark
-                    if len(line.split('"""')) == 2:
-                        i += 1
-                        line = lines[i]
-                        while ('"""' not in line) and (i < len(lines)):
-                            i += 1
-                            line = lines[i]
-                    i += 1
-                    continue
+    @classmethod
+    def from_source(
+        cls,
+        source: str | bytes,
+        name: str,
+        parent: Package,
+        filename: str = "<unknown>",
+    ) -> Self:
+        with profiling.span("parse"):
+            tree = ast.parse(source, filename)
+        with profiling.span("extract"):
+            return Module.from_node(tree, name, parent)
 
-            # Encounter code blocks and statements at tab level 0
-            # TODO implement imports
-            # Add imports
-            if "import " in line:
-                if "from " in line:
-                    pass
-                else:
-                    pass
+    @classmethod
+    def from_node(cls, node: ast.Module, name: str, parent: Package) -> Self:
+        # Create object
+        module = Module(name, [], [], [], [], parent)
+
+        # Visit module-level statements, descending into compound blocks
+        statements = list(reversed(node.body))
+        while len(statements) > 0:
+            statement = statements.pop()
 
             # Add constants
-            elif ("=" in line) and ("(" not in line):
-                module.constants.append(Variable.from_line(line, module))
+            if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                module.constants.extend(Variable.from_node(statement, module))
+
+            # Add names bound by imports
+            elif isinstance(statement, ast.Import):
+                for alias in statement.names:
+                    module.add_import(alias.name, alias.asname)
+            elif isinstance(statement, ast.ImportFrom):
+                source = "." * statement.level + (statement.module or "")
+                for alias in statement.names:
+                    module.add_import_from(source, alias.name, alias.asname)
 
             # Add classes
-            elif "class " in lines[i]:
-                # Find line number of end of definition
-                i_start = i
-
-                # Skip signature
-                while not lines[i].strip()[-1] == ":":
-                    i += 1
-
-                # Skip to line when tab level un-indents
-                while (
-                    (utils.tab_level(lines[i + 1]) == 1)
-                    or (utils.tab_level(lines[i + 2]) == 1)
-                ) and (i < len(lines) - 1):
-                    i += 1
-                i_end = i
-
-                # Create class
-                module.classes.append(
-                    Class.from_lines(lines[i_start : i_end + 1], module)
-                )
+            elif isinstance(statement, ast.ClassDef):
+                module.classes.append(Class.from_node(statement, module))
+
+            # Add functions
+            elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                module.functions.append(Function.from_node(statement, module))
+
+            # Add statements nested in conditional, guarded and context blocks
+            elif isinstance(statement, (ast.If, ast.Try, ast.TryStar, ast.With)):
+                nested = list(statement.body)
+                for handler in getattr(statement, "handlers", []):
+                    nested += handler.body
+                nested += getattr(statement, "orelse", [])
+                nested += getattr(statement, "finalbody", [])
+                statements.extend(reversed(nested))
+
+        # Sort items by name
+        module.imports.sort(key=operator.attrgetter("name"))
+        module.constants.sort(key=operator.attrgetter("name"))
+        module.classes.sort(key=operator.attrgetter("name"))
+        module.functions.sort(key=operator.attrgetter("name"))
+
+        return module
+
+    @classmethod
+    def from_lines(cls, lines: list[str] | Source, name: str, parent: Package) -> Self:
+        # Create object and index blocks of lines
+        module = Module(name, [], [], [], [], parent)
+        index = BlockIndex.from_lines(lines)
+
+        # Visit module-level statements, descending into compound blocks
+        statements = list(reversed(list(index.statements())))
+        decorators = []
+        loop_else = set()
+        while len(statements) > 0:
+            i = statements.pop()
+            if i in loop_else:
+                continue
+            text, code = index.text(i), index.code(i)
+            word = blocks.first_word(code)
+            definition = DEFINITION.match(code)
+
+            # Collect decorators of the next definition
+            if word == "@":
+                decorators.append(blocks.strip(text, code)[1:].strip())
+                continue
+
+            # Add classes
+            elif (definition is not None) and (definition.group(2) == "class"):
+                module.classes.append(Class.from_lines(index, i, module, decorators))
 
             # Add functions
-            elif "def " in line:
-                pass
+            elif definition is not None:
+                module.functions.append(
+                    Function.from_lines(index, i, module, decorators)
+                )
 
-            i += 1
+            # Skip loops along with their else blocks
+            elif word in LOOPS:
+                j = index.next_statement(i)
+                if (j is not None) and (blocks.first_word(index.code(j)) == "else"):
+                    loop_else.add(j)
+
+            # Add statements nested in conditional, guarded and context blocks
+            elif word in COMPOUND:
+                nested = list(index.statements(i))
+                _, body = blocks.split_header(text, code)
+                if len(body) > 0:
+                    module.add_statement(body)
+                statements.extend(reversed(nested))
+
+            # Add constants and names bound by imports
+            else:
+                module.add_statement(text, code)
+            decorators = []
 
         # Sort items by name
         module.imports.sort(key=operator.attrgetter("name"))
@@ -250,79 +839,213 @@ class Module:
 
         return module
 
+    def add_statement(self, text: str, masked: str | None = None) -> None:
+        if masked is None:
+            masked = blocks.mask(text)
+        for statement, code in zip(
+            blocks.split(text, ";", masked), blocks.split(masked, ";", masked)
+        ):
+            # Split imported names, ignoring comments and brackets around them
+            match = IMPORT.match(code)
+            if match is not None:
+                for alias in blocks.split(match.group(1), ","):
+                    alias = ALIAS.fullmatch(alias)
+                    if alias is not None:
+                        self.add_import(alias.group(1), alias.group(2))
+                continue
+            match = IMPORT_FROM.match(code)
+            if match is not None:
+                source = match.group(1) + match.group(2)
+                names = match.group(3).strip().removeprefix("(").removesuffix(")")
+                for alias in blocks.split(names, ","):
+                    alias = ALIAS.fullmatch(alias)
+                    if alias is not None:
+                        self.add_import_from(source, alias.group(1), alias.group(2))
+                continue
+
+            self.constants.extend(Variable.from_line(statement, self, code))
+
+    def add_import(self, name: str, asname: str | None = None) -> None:
+        self.import_names.append(sys.intern(name))
+        if asname is None:
+            name = name.split(".")[0]
+            self.aliases[name] = sys.intern(name)
+        else:
+            self.aliases[asname] = sys.intern(name)
+
+    def add_import_from(self, source: str, name: str, asname: str | None = None):
+        # Keep leading dots of relative imports
+        if name == "*":
+            self.import_names.append(sys.intern(source))
+            return
+        target = source + (name if source.endswith(".") else f".{name}")
+        self.aliases[asname or name] = sys.intern(target)
+        self.import_names.append(sys.intern(target))
+
 
 class Package:
+    __slots__ = ("name", "modules", "subpackages", "parent", "path", "loader")
+
     def __init__(
         self,
         name: str,
         modules: list[Module],
         subpackages: list[Self],
         parent: Repository | Self,
+        path: Path | None = None,
     ):
-        self.name = name
+        self.name = sys.intern(name)
         self.modules = modules
         self.subpackages = subpackages
         self.parent = parent
+        self.path = path
+        self.loader = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Create the modules of lazily loaded packages on first access
+        if (name == "modules") and (self.loader is not None):
+            loader, self.loader = self.loader, None
+            loader(self)
+            return self.modules
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
 
     def __str__(self) -> str:
-        pkg_str = f"{self.name}\n"
-        corner = "├"
+        return render.render(self)
 
-        # Only return name if package contains no modules or subpackages
-        if len(self.modules) == 0 and len(self.subpackages) == 0:
-            return pkg_str
+    @classmethod
+    def lazy(
+        cls,
+        name: str,
+        parent: Repository | Self,
+        loader: Callable[[Self], None],
+        path: Path | None = None,
+    ) -> Self:
+        """Create a package whose modules are set by `loader` on first access.
+
+        Parameters
+        ----------
+        name : str
+            Name of the package.
+        parent : Repository | Package
+            Parent of the package.
+        loader : Callable[[Package], None]
+            Callback setting the `modules` of the package.
+        path : Path | None
+            Path to the package directory.
+
+        Returns
+        -------
+        Package
+            Package without subpackages or modules.
+        """
+        package = Package.__new__(Package)
+        package.name = sys.intern(name)
+        package.subpackages = []
+        package.parent = parent
+        package.path = path
+        package.loader = loader
+        return package
 
-        # Iterate over subpackages
+    def iter_modules(self) -> Iterator[Module]:
+        yield from self.modules
         for subpackage in self.subpackages:
-            if (subpackage.name == self.subpackages[-1].name) and (
-                len(self.modules) == 0
-            ):
-                corner = "└"
-            pkg_str += f"{corner}─── {subpackage.name}\n"
-            pkg_str += "\n".join(
-                ["│    " + str_line for str_line in str(subpackage).split("\n")[1:-1]]
+            yield from subpackage.iter_modules()
+
+    def iter_packages(self) -> Iterator[Self]:
+        yield self
+        for subpackage in self.subpackages:
+            yield from subpackage.iter_packages()
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Path,
+        parent: Package | Repository,
+        engine: str = "ast",
+        workers: int | None = 1,
+        executor: str = "process",
+        cache: ModuleCache | None = None,
+        ignore: IgnoreRules | None = None,
+        concurrency: int | None = None,
+    ) -> Self:
+        # Overlap listings and reads on an event loop if asked to
+        if concurrency is not None:
+            return scan.scan_package(
+                path, parent, engine, workers, executor, cache, ignore, concurrency
             )
-            pkg_str += "\n"
 
-        # Iterate over modules
-        for module in self.modules:
-            if module.name == self.modules[-1].name:
-                corner = "└"
-            pkg_str += f"{corner}─── {module.name}\n"
+        # Discover package tree, deferring module parsing
+        pending = list(Package.walk(path, parent, ignore))
+        package = pending[0][0]
+
+        # Parse modules, possibly in parallel, and attach them to their packages
+        module_packages = [module_package for module_package, _ in pending]
+        modules = scan.parse_modules(
+            [module_path for _, module_path in pending],
+            engine,
+            workers,
+            executor,
+            cache,
+        )
+        for module_package, module in zip(module_packages, modules):
+            module.parent = module_package
+            module_package.modules.append(module)
 
-        # Return str representing package
-        return pkg_str
+        # Return primary package
+        return package
 
     @classmethod
-    def from_path(cls, path: Path, parent: Package | Repository) -> Self:
-        package = Package(path.name, [], [], parent)
-        item_paths = utils.get_item_paths(path)
+    def walk(
+        cls,
+        path: Path,
+        parent: Package | Repository | None,
+        ignore: IgnoreRules | None = None,
+    ) -> Iterator[tuple[Package, Path]]:
+        """Discover a package tree, yielding module paths as they are found.
+
+        Modules of a package are yielded before those of its subpackages, both
+        in name order. Subpackages are linked to their parent package while
+        modules are left for the caller to attach.
+
+        Parameters
+        ----------
+        path : Path
+            Path to the package directory.
+        parent : Package | Repository | None
+            Parent of the discovered package.
+        ignore : IgnoreRules | None
+            Rules excluding files and directories, which are never entered.
+
+        Yields
+        ------
+        tuple[Package, Path]
+            Package and path of each of its modules.
+        """
+        with profiling.span("walk", path):
+            subdirectories, files = discovery.list_directory(path, ignore)
 
         # Raise error if not package
-        if "__init__.py" not in utils.get_item_names(path):
+        if (path / "__init__.py") not in files:
             raise ValueError(f"Expected __init__ module in package {path.name}.")
-
-        # Iterate over each item in directory
-        for item in item_paths:
-            # If item is directory, it may be a subpackage
-            if item.is_dir():
-                # Add item if subpackage and skip otherwise
-                try:
-                    package.subpackages.append(Package.from_path(item, package))
-                except ValueError:
-                    pass
-
-            # Add python files and skip others
-            else:
-                if item.suffix == ".py":
-                    package.modules.append(Module.from_path(item, package))
-
-        # Sort items by name
-        package.subpackages.sort(key=operator.attrgetter("name"))
-        package.modules.sort(key=operator.attrgetter("name"))
-
-        # Return primary package
-        return package
+        package = Package(path.name, [], [], parent, path)
+
+        # Yield python files and skip others
+        for item in files:
+            if item.suffix == ".py":
+                yield package, item
+
+        # Walk directories which are subpackages, linking them on first module
+        for item in subdirectories:
+            walk = Package.walk(item, package, ignore)
+            try:
+                subpackage, module_path = next(walk)
+            except ValueError:
+                continue
+            package.subpackages.append(subpackage)
+            yield subpackage, module_path
+            yield from walk
 
 
 class Repository:
@@ -336,27 +1059,92 @@ class Repository:
         Path to the repository.
     source : Package
         Source python package containing all the modules of the project.
+    ignore : IgnoreRules | None
+        Rules the source package was discovered with, applied again when the
+        model is updated.
 
     Methods
     -------
-    from_path(path)
-        Generate a repository object from its path.
+    from_path(path, mode, engine, workers, executor, cache, ignore, concurrency,
+              budget)
+        Generate a repository object from its path, discovering the source
+        package with `mode` and parsing modules with `engine` (``"ast"`` or
+        the legacy ``"lines"``) on a pool of `workers` of type `executor`
+        (``"process"`` or ``"thread"``), reusing modules held in `cache` and
+        skipping items matched by `ignore`, the repository `.gitignore` and
+        common tool directories by default. If `concurrency` is set, up to
+        that many directory listings and file reads are overlapped on an
+        event loop, which suits network file systems. If `budget` is set,
+        only the package tree is built, and module bodies are loaded on
+        access into a `bodies.BodyCache` holding at most `budget` bytes.
+    find_source(path, mode)
+        Locate the source package of a repository with discovery `mode`.
+    save(path)
+        Write the repository model to a binary snapshot.
+    load(path)
+        Open a snapshot, loading module contents on first access.
     """
 
-    def __init__(self, name: str, path: Path, mode: str = "src"):
+    def __init__(
+        self,
+        name: str,
+        path: Path,
+        source: Package | None = None,
+        ignore: IgnoreRules | None = None,
+    ):
         self.name = name
         self.path = path
+        self.source = source
+        self.ignore = ignore
+
+    def __str__(self) -> str:
+        return render.render(self)
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Path,
+        mode: str = "src",
+        engine: str = "ast",
+        workers: int | None = 1,
+        executor: str = "process",
+        cache: ModuleCache | None = None,
+        ignore: IgnoreRules | None = None,
+        concurrency: int | None = None,
+        budget: int | None = None,
+    ) -> Self:
+        if ignore is None:
+            ignore = discovery.IgnoreRules.from_gitignore(path)
+        repository = Repository(path.name, path, ignore=ignore)
+        if budget is not None:
+            repository.source = bodies.BodyCache(budget, engine, cache).skeleton(
+                Repository.find_source(path, mode), repository, ignore
+            )
+            return repository
+        repository.source = Package.from_path(
+            Repository.find_source(path, mode),
+            repository,
+            engine,
+            workers,
+            executor,
+            cache,
+            ignore,
+            concurrency,
+        )
+        return repository
+
+    @classmethod
+    def find_source(cls, path: Path, mode: str = "src") -> Path:
+        items = utils.get_item_names(path)
 
         match mode:
             # Assume repository structure of `[repo-name]/src/[repo_name]`
             case "src":
-                if mode in utils.get_item_names(path):
+                if mode in items:
                     package_name = "_".join(path.name.split("-"))
 
                     if package_name in utils.get_item_names((path / mode)):
-                        self.source = Package(
-                            package_name, (path / mode / package_name)
-                        )
+                        return path / mode / package_name
 
                     # Raise error if `repo_name` package not found
                     else:
@@ -373,69 +1161,91 @@ class Repository:
             # Raise error if unknown discovery mode
             case _:
                 raise NotImplementedError(
-                    f"{format} is not a known package discovery format."
+                    f"{mode} is not a known package discovery format."
                 )
 
-        items = utils.get_item_names(path)
-
-        # Assume repository structure of `[repo-name]/src/[repo_name]`
-        src_name = "src"
-        if src_name in [item.name for item in items]:
-            src_items = utils.get_item_names((path / src_name))
-            package_name = "_".join(path.name.split("-"))
-
-            # Raise error if `repo_name` package not found
-            if package_name in src_items:
-                self.source = Package((path / src_name / package_name), repository)
-            else:
-                raise ValueError(
-                    f"Expected source package {package_name} not found in repository {path.name}."
-                )
-
-        # Raise error if source package not found
-        else:
-            raise NotImplementedError(
-                f"No source package discovered in repository {path.name}."
-            )
-
-    def __str__(self) -> str:
-        repo_str = f"\n══════════ {self.name} ══════════\n"
-        repo_str += f"{str(self.source)}"
-        return repo_str
+    def save(self, path: Path) -> None:
+        snapshot.save(self, path)
 
     @classmethod
-    def from_path(cls, path: Path) -> Self:
-        repository = Repository(path.name, None, path)
-        items = utils.get_item_paths(path)
-
-        # Assume repository structure of `[repo-name]/src/[repo_name]`
-        src_name = "src"
-        if src_name in [item.name for item in items]:
-            src_items = utils.get_item_names((path / src_name))
-            package_name = "_".join(path.name.split("-"))
-
-            # Raise error if `repo_name` package not found
-            if package_name in src_items:
-                repository.source = Package.from_path(
-                    (path / src_name / package_name), repository
-                )
-            else:
-                raise ValueError(
-                    f"Expected source package {package_name} not found in repository {path.name}."
-                )
-
-        # Raise error if source package not found
-        else:
-            raise NotImplementedError(
-                f"No source package discovered in repository {path.name}."
-            )
-
-        return repository
-
-
-# TODO remove test function
+    def load(cls, path: Path) -> Self:
+        return snapshot.load(path)
+
+    def package_for(self, path: Path) -> Package | None:
+        # Walk subpackages along the path relative to the source package
+        try:
+            parts = path.relative_to(self.source.path).parts
+        except ValueError:
+            return None
+        package = self.source
+        for part in parts:
+            i = utils.find_sorted(package.subpackages, part)
+            if i is None:
+                return None
+            package = package.subpackages[i]
+        return package
 
-if __name__ == "__main__":
-    path = Path("/home/hansen/projects/gjw/morse/morse-pipeline").resolve()
-    repo = Repository.from_path(path)
-    print(repo)
+    def update(
+        self, path: Path, engine: str = "ast"
+    ) -> tuple[list[Module], list[Module]]:
+        """Patch the model after a file or directory changed on disk.
+
+        Parameters
+        ----------
+        path : Path
+            Changed module or package directory within the source package.
+        engine : str
+            Parsing engine passed to `Module.from_path`.
+
+        Returns
+        -------
+        tuple[list[Module], list[Module]]
+            Modules removed from and added to the model.
+        """
+        # Skip paths excluded by the rules the model was discovered with
+        if (self.ignore is not None) and self.ignore.excludes(
+            path, path.suffix != ".py"
+        ):
+            return [], []
+
+        # Reload changed, created or deleted package directories
+        if path.suffix != ".py":
+            old_package = self.package_for(path)
+            removed = [] if old_package is None else list(old_package.iter_modules())
+
+            # Rebuild the whole model if the source package changed
+            if path == self.source.path:
+                self.source = Package.from_path(path, self, engine, ignore=self.ignore)
+                return removed, list(self.source.iter_modules())
+
+            # Drop subpackage and add it back if it is still a package
+            parent = self.package_for(path.parent)
+            if parent is None:
+                return removed, []
+            utils.remove_sorted(parent.subpackages, path.name)
+            try:
+                package = Package.from_path(path, parent, engine, ignore=self.ignore)
+            except (ValueError, FileNotFoundError):
+                return removed, []
+            utils.replace_sorted(parent.subpackages, package)
+            return removed, list(package.iter_modules())
+
+        package = self.package_for(path.parent)
+
+        # Load new packages whose `__init__` module appeared
+        if package is None:
+            if path.name == "__init__.py":
+                return self.update(path.parent, engine)
+            return [], []
+
+        # Remove deleted modules, and their package if it lost its `__init__`
+        if not path.exists():
+            if path.name == "__init__.py":
+                return self.update(path.parent, engine)
+            module = utils.remove_sorted(package.modules, path.stem)
+            return ([] if module is None else [module]), []
+
+        # Re-parse created or modified modules
+        module = Module.from_path(path, package, engine)
+        old_module = utils.replace_sorted(package.modules, module)
+        return ([] if old_module is None else [old_module]), [module]
@@ -0,0 +1,291 @@
+"""Instrument scans with timing spans and counters.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Callable, ContextManager, Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+
+# Constants
+
+
+NULL_SPAN = nullcontext()
+
+
+# Globals
+
+
+current: Profiler | None = None
+
+
+# Classes
+
+
+class Span:
+    """Timed phase of a scan.
+
+    Parameters
+    ----------
+    name : str
+        Name of the phase, such as ``"walk"``, ``"read"``, ``"parse"`` or
+        ``"extract"``.
+    path : str | None
+        File or directory the phase worked on.
+    start : int
+        Start time in nanoseconds of the monotonic clock.
+    duration : int
+        Duration in nanoseconds.
+    process : int
+        ID of the process the phase ran in.
+    thread : int
+        ID of the thread the phase ran in.
+    """
+
+    __slots__ = ("name", "path", "start", "duration", "process", "thread")
+
+    def __init__(
+        self,
+        name: str,
+        path: str | None,
+        start: int,
+        duration: int,
+        process: int,
+        thread: int,
+    ):
+        self.name = name
+        self.path = path
+        self.start = start
+        self.duration = duration
+        self.process = process
+        self.thread = thread
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Profiler:
+    """Collector of the spans and counters recorded by instrumented code.
+
+    A profiler records while it is active, i.e. inside its ``with`` block.
+    Spans and counters without a path inherit the one of the innermost span
+    enclosing them in the same thread, so phases are attributed to files.
+    Counters are updated under a lock, as threads of a pool share the
+    active profiler.
+
+    Parameters
+    ----------
+    listeners : list[Callable[[Span], None]]
+        Callbacks receiving each span as soon as it ends.
+
+    Methods
+    -------
+    span(name, path)
+        Context manager timing a phase.
+    count(name, value, path)
+        Add a value to a counter.
+    merge(spans, counters)
+        Add spans and counters recorded by another profiler, e.g. in a worker
+        process.
+    phases()
+        Number of spans and total seconds of each phase.
+    totals()
+        Total of each counter over all paths.
+    slowest(name, limit)
+        Files spending the most time in a phase.
+    save_json(path)
+        Write spans, counters and phase totals as JSON.
+    save_chrome_trace(path)
+        Write spans and counter totals in the Chrome trace event format.
+    """
+
+    def __init__(self, listeners: list[Callable[[Span], None]] | None = None):
+        self.listeners = [] if listeners is None else listeners
+        self.spans = []
+        self.counters = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.previous = None
+
+    def __enter__(self) -> Profiler:
+        global current
+        self.previous, current = current, self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global current
+        current, self.previous = self.previous, None
+
+    def paths(self) -> list[str | None]:
+        if not hasattr(self.local, "paths"):
+            self.local.paths = []
+        return self.local.paths
+
+    @contextmanager
+    def span(self, name: str, path: Path | str | None = None) -> Iterator[None]:
+        paths = self.paths()
+        if path is None:
+            path = paths[-1] if len(paths) > 0 else None
+        else:
+            path = str(path)
+        paths.append(path)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            paths.pop()
+            self.record(
+                Span(name, path, start, duration, os.getpid(), threading.get_ident())
+            )
+
+    def record(self, span: Span) -> None:
+        self.spans.append(span)
+        for listener in self.listeners:
+            listener(span)
+
+    def count(self, name: str, value: int = 1, path: Path | str | None = None):
+        if path is None:
+            paths = self.paths()
+            path = paths[-1] if len(paths) > 0 else None
+        else:
+            path = str(path)
+        key = (name, path)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(
+        self, spans: list[Span], counters: dict[tuple[str, str | None], int]
+    ) -> None:
+        for span in spans:
+            self.record(span)
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def phases(self) -> dict[str, dict[str, float]]:
+        phases = {}
+        for span in self.spans:
+            phase = phases.setdefault(span.name, {"count": 0, "seconds": 0.0})
+            phase["count"] += 1
+            phase["seconds"] += span.duration / 1e9
+        return phases
+
+    def totals(self) -> dict[str, int]:
+        totals = {}
+        for (name, _), value in self.counters.items():
+            totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def slowest(self, name: str, limit: int = 10) -> list[tuple[str, float]]:
+        seconds = {}
+        for span in self.spans:
+            if (span.name == name) and (span.path is not None):
+                seconds[span.path] = seconds.get(span.path, 0.0) + span.duration / 1e9
+        return sorted(seconds.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def save_json(self, path: Path) -> None:
+        with open(path, mode="w") as file:
+            json.dump(
+                {
+                    "phases": self.phases(),
+                    "counters": [
+                        {"name": name, "path": counter_path, "value": value}
+                        for (name, counter_path), value in self.counters.items()
+                    ],
+                    "spans": [span.to_dict() for span in self.spans],
+                },
+                file,
+            )
+
+    def save_chrome_trace(self, path: Path) -> None:
+        # Use complete events, with times in microseconds
+        events = [
+            {
+                "name": span.name,
+                "cat": "prypy",
+                "ph": "X",
+                "ts": span.start / 1000,
+                "dur": span.duration / 1000,
+                "pid": span.process,
+                "tid": span.thread,
+                "args": {"path": span.path},
+            }
+            for span in self.spans
+        ]
+
+        # Show counter totals at the end of the trace
+        end = max((span.start + span.duration for span in self.spans), default=0)
+        for name, value in self.totals().items():
+            events.append(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": end / 1000,
+                    "pid": os.getpid(),
+                    "args": {name: value},
+                }
+            )
+
+        with open(path, mode="w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+# Functions
+
+
+def active() -> Profiler | None:
+    """Return the active profiler, if any.
+
+    Returns
+    -------
+    Profiler | None
+        Innermost profiler whose ``with`` block is being executed.
+    """
+    return current
+
+
+def span(name: str, path: Path | str | None = None) -> ContextManager[None]:
+    """Time a phase with the active profiler, doing nothing if none is active.
+
+    Parameters
+    ----------
+    name : str
+        Name of the phase.
+    path : Path | str | None
+        File or directory the phase works on, inherited from the enclosing span
+        if ``None``.
+
+    Returns
+    -------
+    ContextManager[None]
+        Context manager wrapping the phase.
+    """
+    if current is None:
+        return NULL_SPAN
+    return current.span(name, path)
+
+
+def count(name: str, value: int = 1, path: Path | str | None = None) -> None:
+    """Add a value to a counter of the active profiler, if any.
+
+    Parameters
+    ----------
+    name : str
+        Name of the counter.
+    value : int
+        Value to be added.
+    path : Path | str | None
+        File or directory counted, inherited from the enclosing span if
+        ``None``.
+    """
+    if current is not None:
+        current.count(name, value, path)
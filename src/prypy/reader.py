@@ -5,53 +5,313 @@
 # Imports
 
 
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Union
+import os
+import pickle
+import sys
 
-from . import models, utils
+from prypy import discovery, models, profiling, scan
 
+if TYPE_CHECKING:
+    from prypy.cache import ModuleCache
 
-# Constants
 
-# TODO remove me for cli
-MORSE_PATH = Path(".").resolve()
+# Classes
+
+
+class Batch:
+    """Models and statistics of repositories analyzed together.
+
+    Parameters
+    ----------
+    repositories : list[models.Repository]
+        Repositories read successfully, in the order they were given.
+    errors : dict[Path, Exception]
+        Error which prevented reading each failed repository.
+    stats : dict[str, int]
+        Aggregate counts over the whole batch: ``repositories``, ``failed``,
+        ``packages``, ``modules``, ``cached`` modules found in the cache,
+        successfully ``parsed`` modules, ``duplicates`` copied from an
+        identical file instead of being parsed, ``classes`` and
+        ``functions``.
+    """
+
+    def __init__(
+        self,
+        repositories: list[models.Repository],
+        errors: dict[Path, Exception],
+        stats: dict[str, int],
+    ):
+        self.repositories = repositories
+        self.errors = errors
+        self.stats = stats
 
 
 # Functions
 
 
-def read_modules(package_path: Path) -> list[models.Module]:
-    pass
+def parse_safely(
+    data: bytes, path: Path, engine: str = "ast"
+) -> models.Module | Exception:
+    """Parse a module already read, returning rather than raising parsing errors.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of the module file.
+    path : Path
+        Path the module was read from.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+
+    Returns
+    -------
+    models.Module | Exception
+        Parsed module without a parent, or the error raised by the parser.
+    """
+    try:
+        return scan.parse_data(data, path, engine)
+    except scan.PARSE_ERRORS as error:
+        return error
+
+
+def copy_module(module: models.Module, path: Path) -> models.Module:
+    """Copy a module parsed from a file with identical content.
+
+    Parameters
+    ----------
+    module : models.Module
+        Module without a parent.
+    path : Path
+        Path of the file the copy stands for.
+
+    Returns
+    -------
+    models.Module
+        Independent copy named and located after `path`.
+    """
+    copy = pickle.loads(pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL))
+    copy.name = sys.intern(path.stem)
+    copy.path = path
+    return copy
 
 
 def read_package(package_path: Path) -> models.Package:
-    # Create and return package object by calling module and subpackage creation
-    package = models.Package(package_path.name, read_modules(package_path), subpackages)
-    return package
-
-
-def gen_package_dict(package_path: Path) -> dict[str, Union[models.Package, dict]]:
-    package_dict = {}
-    items = utils.get_item_names(package_path)
-
-
-def read_repository(repo_path: Path) -> models.Repository:
-    # TODO implement find first package function instead of this
-    # Terminate if ``src/package_name`` directory is not in repository
-    items = utils.get_item_names(repo_path)
-    if ("src" not in items) or (items["src"]):
-        raise ImportError(f"No `src` directory found in repository {repo_path.name}.")
-    src_items = utils.get_item_names(repo_path / "src")
-    package_name = "_".join(repo_path.name.split("-"))
-    if (package_name not in src_items) or (src_items[package_name]):
-        raise ImportError(f"No `{package_name}` package found in {repo_path / 'src'}.")
-
-    # Read source package (and consequently, subpackages)
-    source = read_package
-    # TODO finish
-
-    # Create and return repository object by calling package creation
-    repository = models.Repository(
-        package_name, read_package(repo_path / "src" / "package_name"), repo_path
+    """Read a package and its subpackages, without a parent repository.
+
+    Parameters
+    ----------
+    package_path : Path
+        Path to the package directory.
+
+    Returns
+    -------
+    models.Package
+        Package with all its modules parsed.
+    """
+    return models.Package.from_path(package_path, None)
+
+
+def read_repository(repo_path: Path, mode: str = "src") -> models.Repository:
+    """Read a repository, raising the error which prevented it if any.
+
+    Parameters
+    ----------
+    repo_path : Path
+        Path to the repository.
+    mode : str
+        Package discovery mode passed to `Repository.find_source`.
+
+    Returns
+    -------
+    models.Repository
+        Repository with all its modules parsed.
+    """
+    batch = read_repositories([repo_path], mode, workers=1)
+    if repo_path in batch.errors:
+        raise batch.errors[repo_path]
+    return batch.repositories[0]
+
+
+def read_repositories(
+    paths: list[Path],
+    mode: str = "src",
+    engine: str = "ast",
+    workers: int | None = None,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+) -> Batch:
+    """Read many repositories, parsing their modules on one shared pool.
+
+    Package trees of every repository are discovered first. Files missing
+    from `cache` are then read and hashed once, and only the first file of
+    each distinct content is parsed from the bytes read, so that vendored or
+    copied modules are parsed once over the whole batch. A repository which
+    cannot be discovered, or one of whose modules cannot be parsed, is
+    reported in the errors of the batch rather than stopping it.
+
+    Parameters
+    ----------
+    paths : list[Path]
+        Paths to the repositories.
+    mode : str
+        Package discovery mode passed to `Repository.find_source`.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before hashing and updated with parsed modules.
+
+    Returns
+    -------
+    Batch
+        Repositories, errors and aggregate statistics.
+    """
+    if executor not in scan.EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    stats = dict.fromkeys(
+        (
+            "repositories",
+            "failed",
+            "packages",
+            "modules",
+            "cached",
+            "parsed",
+            "duplicates",
+            "classes",
+            "functions",
+        ),
+        0,
+    )
+
+    # Discover package trees of all repositories, deferring module parsing
+    repositories = {}
+    pending = []
+    errors = {}
+    for path in paths:
+        try:
+            repository = models.Repository(
+                path.name, path, ignore=discovery.IgnoreRules.from_gitignore(path)
+            )
+            walk = models.Package.walk(
+                models.Repository.find_source(path, mode), repository, repository.ignore
+            )
+            modules = list(walk)
+        except (ValueError, NotImplementedError, OSError) as error:
+            errors[path] = error
+            continue
+        repository.source = modules[0][0]
+        repositories[path] = repository
+        pending.extend((path, package, module_path) for package, module_path in modules)
+    modules = [None] * len(pending)
+
+    # Reuse cached modules
+    missing = []
+    for i, (_, _, module_path) in enumerate(pending):
+        modules[i] = None if cache is None else cache.get(module_path, engine)
+        if modules[i] is None:
+            missing.append(i)
+        else:
+            stats["cached"] += 1
+
+    # Read the other files once, grouping them by content and keeping the
+    # bytes of the first file of each group to be parsed
+    stamps = {}
+    groups = {}
+    first_data = []
+    with ThreadPoolExecutor(max_workers=min(32, workers + 4)) as readers:
+        results = readers.map(scan.read_stamped, [pending[i][2] for i in missing])
+        for i, (data, stamp) in zip(missing, results):
+            stamps[i] = stamp
+            if stamp[2] not in groups:
+                groups[stamp[2]] = []
+                first_data.append(data)
+            groups[stamp[2]].append(i)
+
+    # Parse one file of each group on the shared pool
+    first_paths = [pending[indices[0]][2] for indices in groups.values()]
+    profiler = profiling.active()
+    if workers <= 1:
+        parsed = list(map(parse_safely, first_data, first_paths, repeat(engine)))
+    else:
+        chunksize = max(1, len(first_paths) // (workers * 4))
+        with scan.EXECUTORS[executor](max_workers=workers) as pool:
+            if (profiler is None) or (executor != "process"):
+                parsed = list(
+                    pool.map(
+                        parse_safely,
+                        first_data,
+                        first_paths,
+                        repeat(engine),
+                        chunksize=chunksize,
+                    )
+                )
+            else:
+                parsed = []
+                for module, spans, counters in pool.map(
+                    scan.profile,
+                    repeat(parse_safely),
+                    first_data,
+                    first_paths,
+                    repeat(engine),
+                    chunksize=chunksize,
+                ):
+                    profiler.merge(spans, counters)
+                    parsed.append(module)
+
+    # Copy parsed modules to the other files of their group, counting only
+    # successful parses
+    del first_data
+    for indices, module in zip(groups.values(), parsed):
+        if not isinstance(module, Exception):
+            stats["parsed"] += 1
+        for n, i in enumerate(indices):
+            path, _, module_path = pending[i]
+            if isinstance(module, Exception):
+                errors.setdefault(path, module)
+                continue
+            if n > 0:
+                stats["duplicates"] += 1
+            modules[i] = module if n == 0 else copy_module(module, module_path)
+            if cache is not None:
+                cache.put(module_path, engine, modules[i], stamps[i])
+    if cache is not None:
+        cache.commit()
+
+    # Attach modules to their packages, dropping repositories with errors
+    for (path, package, _), module in zip(pending, modules):
+        if path in errors:
+            continue
+        module.parent = package
+        package.modules.append(module)
+    for path in errors:
+        repositories.pop(path, None)
+
+    # Count what the batch holds
+    stats["repositories"] = len(repositories)
+    stats["failed"] = len(errors)
+    for repository in repositories.values():
+        for package in repository.source.iter_packages():
+            stats["packages"] += 1
+            for module in package.modules:
+                stats["modules"] += 1
+                for symbol in module.iter_symbols():
+                    if isinstance(symbol, models.Class):
+                        stats["classes"] += 1
+                    elif isinstance(symbol, models.Function):
+                        stats["functions"] += 1
+
+    return Batch(
+        [repositories[path] for path in paths if path in repositories], errors, stats
     )
-    return repository
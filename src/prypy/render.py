@@ -0,0 +1,143 @@
+"""Render repository models as text trees.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Iterator, TextIO
+
+from prypy import models
+
+
+# Constants
+
+
+BRANCH = "├─── "
+LAST_BRANCH = "└─── "
+PIPE = "│    "
+SPACE = "     "
+
+
+# Functions
+
+
+def children(
+    node: models.Package | models.Module | models.Class | models.Function,
+    symbols: bool,
+) -> list[models.Package | models.Module | models.Class | models.Function]:
+    """Return the child nodes displayed under a node.
+
+    Parameters
+    ----------
+    node : models.Package | models.Module | models.Class | models.Function
+        Node of the tree.
+    symbols : bool
+        Whether modules show their classes and functions.
+
+    Returns
+    -------
+    list
+        Subpackages then modules of packages, and if `symbols` is set, nested
+        classes then functions of modules, classes and functions.
+    """
+    if isinstance(node, models.Package):
+        return node.subpackages + node.modules
+    if not symbols:
+        return []
+    if isinstance(node, models.Function):
+        return node.functions
+    return node.classes + node.functions
+
+
+def label(node: models.Package | models.Module | models.Class | models.Function) -> str:
+    """Return the text displayed for a node.
+
+    Parameters
+    ----------
+    node : models.Package | models.Module | models.Class | models.Function
+        Node of the tree.
+
+    Returns
+    -------
+    str
+        Name of the node, followed by parentheses for functions.
+    """
+    if isinstance(node, models.Function):
+        return f"{node.name}()"
+    return node.name
+
+
+def iter_tree(
+    node: models.Repository | models.Package,
+    depth: int | None = None,
+    symbols: bool = False,
+) -> Iterator[str]:
+    """Yield the lines of a tree, each rendered once in display order.
+
+    Parameters
+    ----------
+    node : models.Repository | models.Package
+        Repository or package at the root of the tree.
+    depth : int | None
+        Number of levels shown below the root, unlimited if ``None``.
+    symbols : bool
+        Whether modules show their classes and functions.
+
+    Yields
+    ------
+    str
+        Lines of the tree, ending with a newline.
+    """
+    if isinstance(node, models.Repository):
+        yield f"\n══════════ {node.name} ══════════\n"
+        node = node.source
+    yield f"{node.name}\n"
+
+    # Visit nodes depth-first, each with the indent drawn by its ancestors
+    stack = [(node, "", "", 0)]
+    while len(stack) > 0:
+        item, indent, branch, level = stack.pop()
+        if level > 0:
+            yield f"{indent}{branch}{label(item)}\n"
+            indent += SPACE if branch == LAST_BRANCH else PIPE
+        if (depth is not None) and (level >= depth):
+            continue
+
+        # Push children in reverse so that they are popped in order
+        items = children(item, symbols)
+        for i in range(len(items) - 1, -1, -1):
+            branch = LAST_BRANCH if i == len(items) - 1 else BRANCH
+            stack.append((items[i], indent, branch, level + 1))
+
+
+def render(
+    node: models.Repository | models.Package,
+    file: TextIO | None = None,
+    depth: int | None = None,
+    symbols: bool = False,
+) -> str | None:
+    """Render a tree as text, or write it straight to a file.
+
+    Parameters
+    ----------
+    node : models.Repository | models.Package
+        Repository or package at the root of the tree.
+    file : TextIO | None
+        File the lines are written to as they are rendered, if passed.
+    depth : int | None
+        Number of levels shown below the root, unlimited if ``None``.
+    symbols : bool
+        Whether modules show their classes and functions.
+
+    Returns
+    -------
+    str | None
+        Rendered tree, or ``None`` if written to `file`.
+    """
+    lines = iter_tree(node, depth, symbols)
+    if file is not None:
+        file.writelines(lines)
+        return None
+    return "".join(lines)
@@ -0,0 +1,291 @@
+"""Type inference for variables, memoized by qualified name.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Any
+import ast
+import builtins
+
+from prypy import models, utils
+from prypy.index import SymbolIndex, module_of
+
+
+# Constants
+
+
+MAX_ALIAS_DEPTH = 8
+BUILTIN_TYPES = frozenset(
+    name for name, value in vars(builtins).items() if isinstance(value, type)
+)
+EXPRESSION_TYPES = {
+    ast.JoinedStr: "str",
+    ast.List: "list",
+    ast.ListComp: "list",
+    ast.Tuple: "tuple",
+    ast.Set: "set",
+    ast.SetComp: "set",
+    ast.Dict: "dict",
+    ast.DictComp: "dict",
+    ast.GeneratorExp: "Generator",
+    ast.Lambda: "Callable",
+    ast.Compare: "bool",
+}
+
+
+# Classes
+
+
+class Resolver:
+    """Resolver of the types of variables, parameters and attributes.
+
+    Annotations are kept as written, except for the string return
+    annotations of called functions, whose forward references are looked up
+    in the scope of the function. Other types are inferred from values, by
+    literal evaluation, from the kind of expression, or by looking names up
+    through local scopes and imports across modules. Names re-exported under
+    an alias resolve as the names they stand for. Each result is cached by
+    qualified name along with the modules it was read from, so that updating
+    a module drops the results which depend on it and no others.
+
+    Parameters
+    ----------
+    index : SymbolIndex
+        Index of the symbols names are looked up in.
+
+    Methods
+    -------
+    from_repository(repository)
+        Resolve names within a whole repository.
+    resolve(name)
+        Type of the symbol with a qualified name, or ``None`` if unknown.
+    find(name)
+        Symbol or parameter with a qualified name.
+    lookup(name, scope)
+        Qualified name bound to a dotted name within a scope.
+    update(removed, added)
+        Drop results read from re-parsed modules, for use as a
+        `watch.Session` listener.
+    """
+
+    def __init__(self, index: SymbolIndex):
+        self.index = index
+        self.types = {}
+        self.dependencies = {}
+        self.dependents = {}
+        self.names = {}
+        self.frames = []
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @classmethod
+    def from_repository(cls, repository: models.Repository) -> Resolver:
+        return Resolver(SymbolIndex.from_repository(repository))
+
+    def resolve(self, name: str) -> str | None:
+        # Reuse cached results, passing their dependencies on to the caller
+        if name not in self.types:
+            symbol = self.find(name)
+
+            # Follow names re-exported under an alias, without caching them
+            if symbol is None:
+                target = self.canonical(name)
+                if (target is None) or (target == name):
+                    return None
+                return self.resolve(target)
+
+            # Mark the name as unknown while it is inferred, to stop cycles
+            self.types[name] = None
+            self.frames.append({utils.qualified_name(module_of(symbol))})
+            try:
+                self.types[name] = self.infer(symbol)
+            finally:
+                modules = self.frames.pop()
+                self.dependencies[name] = modules
+                for module_name in modules:
+                    self.dependents.setdefault(module_name, set()).add(name)
+        if len(self.frames) > 0:
+            self.frames[-1].update(self.dependencies.get(name, ()))
+        return self.types[name]
+
+    def find(self, name: str) -> Any | None:
+        symbol = self.index.get(name)
+        if symbol is not None:
+            return symbol
+
+        # Find parameters within the inputs of their function
+        function_name, _, parameter = name.rpartition(".")
+        function = self.index.get(function_name)
+        if isinstance(function, models.Function):
+            for variable in function.input:
+                if variable.name == parameter:
+                    return variable
+        return None
+
+    def infer(self, symbol: Any) -> str | None:
+        if isinstance(symbol, models.Class):
+            return f"type[{utils.qualified_name(symbol)}]"
+        if isinstance(symbol, models.Function):
+            return "Callable"
+        if not isinstance(symbol, models.Variable):
+            return "ModuleType"
+        if symbol.type is not None:
+            return symbol.type
+        scope = symbol.parent
+
+        # Bind the first parameter of methods to their class
+        if isinstance(scope, models.Function) and isinstance(
+            scope.parent, models.Class
+        ):
+            if (
+                (len(scope.input) > 0)
+                and (scope.input[0] is symbol)
+                and ("staticmethod" not in scope.decorators)
+            ):
+                class_name = utils.qualified_name(scope.parent)
+                if "classmethod" in scope.decorators:
+                    return f"type[{class_name}]"
+                return class_name
+
+        # Evaluate instance attributes in the scope of the class constructor
+        if isinstance(scope, models.Class) and any(
+            attribute is symbol for attribute in scope.instance_attributes
+        ):
+            i = utils.find_sorted(scope.functions, "__init__")
+            if i is not None:
+                scope = scope.functions[i]
+        if symbol.value is None:
+            return None
+        return self.evaluate(symbol.value, scope)
+
+    def evaluate(self, value: str, scope: Any) -> str | None:
+        try:
+            node = ast.parse(value.strip(), mode="eval").body
+        except SyntaxError:
+            return None
+
+        # Evaluate literals, then infer the type of other expressions
+        try:
+            return type(ast.literal_eval(node)).__name__
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            pass
+        kind = type(node)
+        if kind in EXPRESSION_TYPES:
+            return EXPRESSION_TYPES[kind]
+        if (kind is ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return "bool"
+
+        # Follow references to other symbols
+        if kind in (ast.Name, ast.Attribute):
+            name = utils.dotted_name(node)
+            if name is None:
+                return None
+            target = self.lookup(name, scope)
+            if target is not None:
+                return self.resolve(target)
+            return f"type[{name}]" if name in BUILTIN_TYPES else None
+
+        # Type calls by the class instantiated or the function return annotation
+        if kind is ast.Call:
+            name = utils.dotted_name(node.func)
+            if name is None:
+                return None
+            target = self.lookup(name, scope)
+            if target is None:
+                return name if name in BUILTIN_TYPES else None
+            symbol = self.find(target)
+            if isinstance(symbol, models.Class):
+                return target
+            if isinstance(symbol, models.Function) and (len(symbol.output) > 0):
+                return self.forward(symbol.output[0].type, symbol.parent)
+        return None
+
+    def forward(self, annotation: str | None, scope: Any) -> str | None:
+        # Look names of string annotations up, keeping other annotations
+        try:
+            text = ast.literal_eval(annotation or "")
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return annotation
+        if not isinstance(text, str):
+            return annotation
+        text = text.strip()
+        try:
+            name = utils.dotted_name(ast.parse(text, mode="eval").body)
+        except SyntaxError:
+            return text
+        target = None if name is None else self.lookup(name, scope)
+        return text if target is None else target
+
+    def lookup(self, name: str, scope: Any, depth: int = 0) -> str | None:
+        head, _, rest = name.partition(".")
+        rest = f".{rest}" if rest else ""
+
+        # Search the class body, then parameters and nested functions of
+        # enclosing functions, as enclosing class bodies are not visible
+        if isinstance(scope, models.Class):
+            items = scope.class_attributes + scope.classes + scope.functions
+            if any(item.name == head for item in items):
+                return f"{utils.qualified_name(scope)}.{name}"
+        while isinstance(scope, (models.Function, models.Class)):
+            if isinstance(scope, models.Function):
+                for item in scope.input + scope.functions:
+                    if item.name == head:
+                        return f"{utils.qualified_name(scope)}.{name}"
+            scope = scope.parent
+
+        # Search module-level names, then imported names
+        module_name = utils.qualified_name(scope)
+        if head in self.local_names(scope, module_name):
+            return f"{module_name}.{name}"
+        if head in scope.aliases:
+            target = utils.absolute_name(scope.aliases[head], utils.package_name(scope))
+            return self.canonical(target + rest, depth)
+        return None
+
+    def canonical(self, name: str, depth: int = 0) -> str | None:
+        # Depend on every module which may define the name
+        prefix = name
+        while "." in prefix:
+            prefix = prefix.rpartition(".")[0]
+            if len(self.frames) > 0:
+                self.frames[-1].add(prefix)
+        if self.find(name) is not None:
+            return name
+
+        # Follow names re-exported by the module defining their prefix
+        if depth < MAX_ALIAS_DEPTH:
+            prefix, _, rest = name.rpartition(".")
+            while len(prefix) > 0:
+                module = self.index.get(prefix)
+                if isinstance(module, models.Package):
+                    module = next(
+                        (m for m in module.modules if m.name == "__init__"), None
+                    )
+                if isinstance(module, models.Module):
+                    return self.lookup(rest, module, depth + 1)
+                prefix, _, head = prefix.rpartition(".")
+                rest = f"{head}.{rest}"
+        return None
+
+    def local_names(self, module: models.Module, module_name: str) -> set[str]:
+        if module_name not in self.names:
+            self.names[module_name] = {
+                item.name
+                for item in module.constants + module.classes + module.functions
+            }
+        return self.names[module_name]
+
+    def update(self, removed: list[models.Module], added: list[models.Module]) -> None:
+        self.index.update(removed, added)
+        for module in removed + added:
+            module_name = utils.qualified_name(module)
+            self.names.pop(module_name, None)
+            for name in self.dependents.pop(module_name, ()):
+                self.types.pop(name, None)
+                for dependency in self.dependencies.pop(name, ()):
+                    if dependency != module_name:
+                        self.dependents[dependency].discard(name)
@@ -0,0 +1,626 @@
+"""Schedule module parsing across worker pools.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from itertools import repeat
+from pathlib import Path
+import asyncio
+import os
+
+from prypy import cache as module_cache, discovery, models, profiling
+
+if TYPE_CHECKING:
+    from prypy.cache import ModuleCache
+    from prypy.discovery import IgnoreRules
+
+
+# Constants
+
+
+EXECUTORS: dict[str, type[Executor]] = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+CONCURRENCY = 32
+PARSE_ERRORS = (SyntaxError, ValueError, UnicodeDecodeError)
+
+
+# Functions
+
+
+def parse_module(path: Path, engine: str = "ast") -> models.Module:
+    """Parse a single module without a parent package.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the module to be parsed.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+
+    Returns
+    -------
+    models.Module
+        Parsed module, to be attached to its package by the caller.
+    """
+    return models.Module.from_path(path, None, engine)
+
+
+def parse_data(data: bytes, path: Path, engine: str = "ast") -> models.Module:
+    """Parse a single module from bytes already read, without a parent package.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of the module file.
+    path : Path
+        Path the module was read from.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+
+    Returns
+    -------
+    models.Module
+        Parsed module, to be attached to its package by the caller.
+    """
+    return models.Module.from_data(data, path, None, engine)
+
+
+def parse_stamped(
+    path: Path, engine: str = "ast"
+) -> tuple[models.Module, tuple[int, int, str]]:
+    """Parse a single module read once, along with the stamp of what was read.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the module to be parsed.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+
+    Returns
+    -------
+    tuple[models.Module, tuple[int, int, str]]
+        Parsed module without a parent, then the stamp to store it under with
+        `ModuleCache.put`.
+    """
+    data, stamp = read_stamped(path)
+    return parse_data(data, path, engine), stamp
+
+
+def read_stamped(path: Path) -> tuple[bytes, tuple[int, int, str]]:
+    """Read the content of a module file along with its cache stamp.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the module.
+
+    Returns
+    -------
+    tuple[bytes, tuple[int, int, str]]
+        Undecoded content, then the stamp of that content for
+        `ModuleCache.put`.
+    """
+    with profiling.span("read", path):
+        return module_cache.read_stamped(path)
+
+
+def read_data(path: Path) -> bytes:
+    """Read the content of a module file.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the module.
+
+    Returns
+    -------
+    bytes
+        Undecoded content, cheaper than decoded text to send to worker
+        processes.
+    """
+    with profiling.span("read", path):
+        with open(path, mode="rb") as file:
+            return file.read()
+
+
+def list_package(
+    path: Path, ignore: IgnoreRules | None = None
+) -> tuple[list[Path], list[Path]]:
+    """List a package directory, timing the listing as a walk phase.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the package directory.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories.
+
+    Returns
+    -------
+    tuple[list[Path], list[Path]]
+        Paths to subdirectories and to files, both sorted by name.
+    """
+    with profiling.span("walk", path):
+        return discovery.list_directory(path, ignore)
+
+
+def profile(
+    function: Callable[..., models.Module], *args: Any
+) -> tuple[models.Module, list[profiling.Span], dict]:
+    """Parse a single module, returning what a profiler recorded meanwhile.
+
+    Used in worker processes, whose spans and counters would otherwise be lost.
+
+    Parameters
+    ----------
+    function : Callable[..., models.Module]
+        Parsing function, such as `parse_module` or `parse_data`.
+    *args : Any
+        Arguments of the parsing function.
+
+    Returns
+    -------
+    tuple[models.Module, list[profiling.Span], dict]
+        Parsed module, then spans and counters to be merged into the profiler
+        of the calling process.
+    """
+    with profiling.Profiler() as profiler:
+        module = function(*args)
+    return module, profiler.spans, profiler.counters
+
+
+def parse_modules(
+    paths: list[Path],
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+) -> list[models.Module]:
+    """Parse modules, optionally spreading the work over a pool.
+
+    Parameters
+    ----------
+    paths : list[Path]
+        Paths to the modules to be parsed.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before parsing and updated with freshly parsed
+        modules.
+
+    Returns
+    -------
+    list[models.Module]
+        Parsed modules without parents, in the same order as `paths`.
+    """
+    if executor not in EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if cache is None:
+        return run_parser(parse_module, paths, engine, workers, executor)
+
+    # Only parse modules missing from the cache, storing them under the stamp
+    # of the bytes they were parsed from
+    modules = [cache.get(path, engine) for path in paths]
+    missing = [i for i, module in enumerate(modules) if module is None]
+    parsed = run_parser(
+        parse_stamped, [paths[i] for i in missing], engine, workers, executor
+    )
+    for i, (module, stamp) in zip(missing, parsed):
+        cache.put(paths[i], engine, module, stamp)
+        modules[i] = module
+    cache.commit()
+    return modules
+
+
+def run_parser(
+    function: Callable[[Path, str], Any],
+    paths: list[Path],
+    engine: str,
+    workers: int,
+    executor: str,
+) -> list[Any]:
+    """Run a parsing function over paths, optionally on a pool.
+
+    Parameters
+    ----------
+    function : Callable[[Path, str], Any]
+        Parsing function, such as `parse_module` or `parse_stamped`.
+    paths : list[Path]
+        Paths to the modules to be parsed.
+    engine : str
+        Parsing engine passed to `function`.
+    workers : int
+        Number of pool workers, ``1`` parsing sequentially in the calling
+        process.
+    executor : str
+        Pool type, ``"process"`` or ``"thread"``.
+
+    Returns
+    -------
+    list[Any]
+        Results of `function`, in the same order as `paths`.
+    """
+    # Parse sequentially if pooling would only add overhead
+    if (workers <= 1) or (len(paths) <= 1):
+        return [function(path, engine) for path in paths]
+
+    # Hand each worker several modules at a time to amortize dispatch
+    workers = min(workers, len(paths))
+    chunksize = max(1, len(paths) // (workers * 4))
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        profiler = profiling.active()
+        if (profiler is None) or (executor != "process"):
+            return list(pool.map(function, paths, repeat(engine), chunksize=chunksize))
+
+        # Collect what worker processes recorded into the active profiler
+        results = []
+        for result, spans, counters in pool.map(
+            profile, repeat(function), paths, repeat(engine), chunksize=chunksize
+        ):
+            profiler.merge(spans, counters)
+            results.append(result)
+        return results
+
+
+def iter_modules(
+    path: Path,
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+    ignore: IgnoreRules | None = None,
+    errors: dict[Path, Exception] | None = None,
+) -> Iterator[models.Module]:
+    """Yield the modules of a package tree as soon as each one is parsed.
+
+    Modules keep a reference to their package, but packages are not filled
+    with modules, so memory does not grow with the number of modules consumed.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the package directory.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before parsing and updated with freshly parsed
+        modules.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never entered.
+    errors : dict[Path, Exception] | None
+        Dictionary filled with the parsing error of each module which cannot
+        be parsed, skipping it, or ``None`` to raise the first such error.
+
+    Yields
+    ------
+    models.Module
+        Parsed modules, in the order of `Package.walk`.
+    """
+    if executor not in EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    walk = models.Package.walk(path, None, ignore)
+
+    # Parse sequentially in the calling process
+    if workers <= 1:
+        for package, module_path in walk:
+            try:
+                if cache is None:
+                    module = parse_module(module_path, engine)
+                else:
+                    module = cache.get(module_path, engine)
+                    if module is None:
+                        module, stamp = parse_stamped(module_path, engine)
+                        cache.put(module_path, engine, module, stamp)
+            except PARSE_ERRORS as error:
+                if errors is None:
+                    raise
+                errors[module_path] = error
+                continue
+            module.parent = package
+            yield module
+        if cache is not None:
+            cache.commit()
+        return
+
+    # Keep a bounded number of modules in flight, yielding them in order
+    profiler = profiling.active()
+    profiled = (profiler is not None) and (executor == "process")
+    with EXECUTORS[executor](max_workers=workers) as pool:
+        in_flight = deque()
+        walk_done = False
+        while (not walk_done) or (len(in_flight) > 0):
+            while (not walk_done) and (len(in_flight) < workers * 2):
+                try:
+                    package, module_path = next(walk)
+                except StopIteration:
+                    walk_done = True
+                    break
+                module = None if cache is None else cache.get(module_path, engine)
+                if module is None:
+                    parse = parse_module if cache is None else parse_stamped
+                    if profiled:
+                        module = pool.submit(profile, parse, module_path, engine)
+                    else:
+                        module = pool.submit(parse, module_path, engine)
+                in_flight.append((package, module_path, module))
+            if len(in_flight) == 0:
+                break
+
+            package, module_path, module = in_flight.popleft()
+            if isinstance(module, Future):
+                try:
+                    module = module.result()
+                except PARSE_ERRORS as error:
+                    if errors is None:
+                        raise
+                    errors[module_path] = error
+                    continue
+                if profiled:
+                    module, spans, counters = module
+                    profiler.merge(spans, counters)
+                if cache is not None:
+                    module, stamp = module
+                    cache.put(module_path, engine, module, stamp)
+            module.parent = package
+            yield module
+    if cache is not None:
+        cache.commit()
+
+
+async def scan_package_async(
+    path: Path,
+    parent: models.Package | models.Repository | None,
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+    ignore: IgnoreRules | None = None,
+    concurrency: int = CONCURRENCY,
+) -> models.Package:
+    """Build a package tree, overlapping directory listings and file reads.
+
+    Directories are listed and modules read on a pool of `concurrency`
+    threads, so that the latency of network file systems is paid once per
+    level of the tree rather than once per item. Each subpackage is listed
+    as soon as its parent is, and the modules of each listed package are
+    queued to `concurrency` loaders, which read them and parse them on a pool
+    of `workers`. The queue holds at most `concurrency` modules, so that at
+    most twice that many modules are pending at once, whatever the size of
+    the tree.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the package directory.
+    parent : models.Package | models.Repository | None
+        Parent of the package.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing in the thread running the event loop.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before reading and updated with freshly parsed
+        modules, from the thread running the event loop.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never entered.
+    concurrency : int
+        Maximum number of directory listings and file reads in flight.
+
+    Returns
+    -------
+    models.Package
+        Package tree equal to the one of `Package.from_path`.
+    """
+    if executor not in EXECUTORS:
+        raise NotImplementedError(f"{executor} is not a known executor.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    profiler = profiling.active()
+    profiled = (profiler is not None) and (executor == "process")
+
+    async def load(package: models.Package, module_path: Path) -> models.Module:
+        module = None if cache is None else cache.get(module_path, engine)
+        if module is None:
+            if cache is None:
+                data = await loop.run_in_executor(readers, read_data, module_path)
+            else:
+                data, stamp = await loop.run_in_executor(
+                    readers, read_stamped, module_path
+                )
+            if pool is None:
+                module = parse_data(data, module_path, engine)
+            elif profiled:
+                module, spans, counters = await loop.run_in_executor(
+                    pool, profile, parse_data, data, module_path, engine
+                )
+                profiler.merge(spans, counters)
+            else:
+                module = await loop.run_in_executor(
+                    pool, parse_data, data, module_path, engine
+                )
+            if cache is not None:
+                cache.put(module_path, engine, module, stamp)
+        module.parent = package
+        return module
+
+    async def consume() -> None:
+        # Load queued modules into their slot, skipping them after an error
+        while True:
+            package, i, module_path = await queue.get()
+            try:
+                if len(errors) == 0:
+                    package.modules[i] = await load(package, module_path)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                queue.task_done()
+
+    async def walk(
+        path: Path, parent: models.Package | models.Repository | None
+    ) -> models.Package | None:
+        subdirectories, files = await loop.run_in_executor(
+            readers, list_package, path, ignore
+        )
+        if (path / "__init__.py") not in files:
+            return None
+        package = models.Package(path.name, [], [], parent, path)
+
+        # Start listing subdirectories, then queue modules, waiting for room
+        subpackages = [
+            asyncio.ensure_future(walk(item, package)) for item in subdirectories
+        ]
+        module_paths = [item for item in files if item.suffix == ".py"]
+        package.modules = [None] * len(module_paths)
+        for i, item in enumerate(module_paths):
+            await queue.put((package, i, item))
+
+        # Keep subdirectories which are packages, in name order
+        for subpackage in await asyncio.gather(*subpackages):
+            if subpackage is not None:
+                package.subpackages.append(subpackage)
+        return package
+
+    readers = ThreadPoolExecutor(max_workers=concurrency)
+    pool = None if workers <= 1 else EXECUTORS[executor](max_workers=workers)
+    queue = asyncio.Queue(maxsize=concurrency)
+    errors = []
+    consumers = [asyncio.ensure_future(consume()) for _ in range(concurrency)]
+    try:
+        package = await walk(path, parent)
+        await queue.join()
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        readers.shutdown(cancel_futures=True)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    if len(errors) > 0:
+        raise errors[0]
+    if cache is not None:
+        cache.commit()
+
+    # Raise error if not package
+    if package is None:
+        raise ValueError(f"Expected __init__ module in package {path.name}.")
+    return package
+
+
+def scan_package(
+    path: Path,
+    parent: models.Package | models.Repository | None,
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+    ignore: IgnoreRules | None = None,
+    concurrency: int = CONCURRENCY,
+) -> models.Package:
+    """Build a package tree with `scan_package_async` on a new event loop.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the package directory.
+    parent : models.Package | models.Repository | None
+        Parent of the package.
+    engine : str
+        Parsing engine passed to `Module.from_data`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing in the thread running the event loop.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before reading and updated with freshly parsed
+        modules.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never entered.
+    concurrency : int
+        Maximum number of directory listings and file reads in flight.
+
+    Returns
+    -------
+    models.Package
+        Package tree equal to the one of `Package.from_path`.
+    """
+    return asyncio.run(
+        scan_package_async(
+            path, parent, engine, workers, executor, cache, ignore, concurrency
+        )
+    )
+
+
+def iter_symbols(
+    path: Path,
+    engine: str = "ast",
+    workers: int | None = 1,
+    executor: str = "process",
+    cache: ModuleCache | None = None,
+    ignore: IgnoreRules | None = None,
+) -> Iterator[models.Module | models.Class | models.Function | models.Variable]:
+    """Yield every module of a package tree followed by its symbols.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the package directory.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    workers : int | None
+        Number of pool workers, with ``None`` using every available core and
+        ``1`` parsing sequentially in the calling process.
+    executor : str
+        Pool type, ``"process"`` for CPU-bound scans or ``"thread"`` for
+        I/O-bound scans.
+    cache : ModuleCache | None
+        Cache consulted before parsing and updated with freshly parsed
+        modules.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never entered.
+
+    Yields
+    ------
+    models.Module | models.Class | models.Function | models.Variable
+        Each module, then its constants, classes with their attributes and
+        methods, and functions.
+    """
+    for module in iter_modules(path, engine, workers, executor, cache, ignore):
+        yield from module.iter_symbols()
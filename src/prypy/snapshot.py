@@ -0,0 +1,440 @@
+"""Binary snapshots of repository models with lazily loaded modules.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Callable
+from array import array
+from pathlib import Path
+import bisect
+import marshal
+import mmap
+import struct
+import sys
+
+from prypy import models
+
+
+# Constants
+
+
+MAGIC = b"PRYPYSNP"
+VERSION = 3
+PYTHON = (sys.version_info.major << 8) | sys.version_info.minor
+HEADER = struct.Struct("<8sIIiiIIIQQQQ")
+PACKAGE = struct.Struct("<iiiII")
+MODULE = struct.Struct("<iiQQ")
+
+
+# Classes
+
+
+class StringTable:
+    """Table of interned strings referenced by integer IDs.
+
+    Methods
+    -------
+    id(string)
+        Return the ID of a string, adding it if new, or -1 for ``None``.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def id(self, string: str | None) -> int:
+        if string is None:
+            return -1
+        i = self.ids.get(string)
+        if i is None:
+            i = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return i
+
+
+class Snapshot:
+    """Memory-mapped snapshot file decoding strings and modules on demand.
+
+    Module bodies are stored with `marshal`, whose format may change between
+    Python versions, so snapshots are only read by the version which saved
+    them. The file stays mapped until `close` is called, after which modules
+    not loaded yet can no longer be loaded.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the snapshot file.
+
+    Methods
+    -------
+    string(i)
+        Return the string with ID `i`, or ``None`` for -1.
+    repository()
+        Build the package tree, creating the modules of each package on first
+        access and loading their bodies on first access.
+    module(i)
+        Return the module with ID `i`, creating those of its package.
+    close()
+        Unmap the snapshot file.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, mode="rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        (
+            magic,
+            version,
+            python,
+            self.name_id,
+            self.path_id,
+            self.n_strings,
+            self.n_packages,
+            self.n_modules,
+            string_offsets,
+            string_data,
+            packages,
+            modules,
+        ) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a prypy snapshot.")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {version} in {path}.")
+        if python != PYTHON:
+            self.close()
+            raise ValueError(
+                f"{path} was saved by Python {python >> 8}.{python & 0xFF}, "
+                f"not {sys.version_info.major}.{sys.version_info.minor}."
+            )
+
+        # Map offset tables without copying them
+        self.string_offsets = self.view[
+            string_offsets : string_offsets + 8 * (self.n_strings + 1)
+        ].cast("Q")
+        self.string_data = string_data
+        self.packages_offset = packages
+        self.modules_offset = modules
+        self.strings = {}
+        self.packages = []
+        self.firsts = []
+
+    def __enter__(self) -> Snapshot:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def string(self, i: int) -> str | None:
+        if i < 0:
+            return None
+        string = self.strings.get(i)
+        if string is None:
+            start = self.string_data + self.string_offsets[i]
+            end = self.string_data + self.string_offsets[i + 1]
+            string = self.strings[i] = str(self.view[start:end], "utf-8")
+        return string
+
+    def path(self, i: int) -> Path | None:
+        string = self.string(i)
+        return None if string is None else Path(string)
+
+    def repository(self) -> models.Repository:
+        repository = models.Repository(
+            self.string(self.name_id), self.path(self.path_id)
+        )
+
+        # Rebuild package tree, each package being stored after its parent
+        self.packages, self.firsts = [], []
+        for i in range(self.n_packages):
+            name_id, parent, path_id, first, count = PACKAGE.unpack_from(
+                self.map, self.packages_offset + i * PACKAGE.size
+            )
+            package = models.Package.lazy(
+                self.string(name_id),
+                repository if parent < 0 else self.packages[parent],
+                self.package_loader(first, count),
+                self.path(path_id),
+            )
+            if parent < 0:
+                repository.source = package
+            else:
+                self.packages[parent].subpackages.append(package)
+            self.packages.append(package)
+            self.firsts.append(first)
+        return repository
+
+    def module(self, i: int) -> models.Module:
+        # Find the package of the module, modules being stored package by package
+        p = bisect.bisect_right(self.firsts, i) - 1
+        return self.packages[p].modules[i - self.firsts[p]]
+
+    def package_loader(
+        self, first: int, count: int
+    ) -> Callable[[models.Package], None]:
+        def load(package: models.Package) -> None:
+            # Create modules whose bodies are decoded and paths found on access
+            package.modules = []
+            for i in range(first, first + count):
+                name_id, _, offset, length = MODULE.unpack_from(
+                    self.map, self.modules_offset + i * MODULE.size
+                )
+                package.modules.append(
+                    models.Module.lazy(
+                        self.string(name_id), package, self.loader(offset, length)
+                    )
+                )
+
+        return load
+
+    def loader(self, offset: int, length: int) -> Callable[[models.Module], None]:
+        def load(module: models.Module) -> None:
+            body = marshal.loads(self.view[offset : offset + length])
+            decode_module(self, module, body)
+
+        return load
+
+    def close(self) -> None:
+        # Release views before the map they point into
+        if hasattr(self, "string_offsets"):
+            self.string_offsets.release()
+        self.view.release()
+        self.map.close()
+
+
+# Functions
+
+
+def encode_variable(strings: StringTable, variable: models.Variable) -> tuple:
+    return (
+        strings.id(variable.name),
+        strings.id(variable.type),
+        strings.id(variable.value),
+    )
+
+
+def encode_function(strings: StringTable, function: models.Function) -> tuple:
+    return (
+        strings.id(function.name),
+        tuple(encode_variable(strings, variable) for variable in function.input),
+        tuple(encode_variable(strings, variable) for variable in function.output),
+        tuple(strings.id(callee) for callee in function.calls),
+        function.lines,
+        tuple(strings.id(decorator) for decorator in function.decorators),
+        function.asynchronous,
+        tuple(encode_function(strings, f) for f in function.functions),
+    )
+
+
+def encode_class(strings: StringTable, class_obj: models.Class) -> tuple:
+    return (
+        strings.id(class_obj.name),
+        tuple(encode_variable(strings, v) for v in class_obj.class_attributes),
+        tuple(encode_variable(strings, v) for v in class_obj.instance_attributes),
+        tuple(encode_function(strings, f) for f in class_obj.functions),
+        tuple(encode_class(strings, c) for c in class_obj.classes),
+        tuple(strings.id(decorator) for decorator in class_obj.decorators),
+    )
+
+
+def encode_module(
+    strings: StringTable, module: models.Module, module_ids: dict[int, int]
+) -> tuple:
+    return (
+        tuple(module_ids[id(imported)] for imported in module.imports),
+        tuple(encode_variable(strings, v) for v in module.constants),
+        tuple(encode_class(strings, c) for c in module.classes),
+        tuple(encode_function(strings, f) for f in module.functions),
+        tuple(
+            (strings.id(name), strings.id(target))
+            for name, target in module.aliases.items()
+        ),
+        tuple(strings.id(name) for name in module.import_names),
+    )
+
+
+def decode_variable(
+    snapshot: Snapshot,
+    body: tuple,
+    parent: models.Function | models.Class | models.Module,
+) -> models.Variable:
+    name, variable_type, value = body
+    return models.Variable(
+        snapshot.string(name),
+        snapshot.string(variable_type),
+        snapshot.string(value),
+        parent,
+    )
+
+
+def decode_function(
+    snapshot: Snapshot,
+    body: tuple,
+    parent: models.Function | models.Class | models.Module,
+) -> models.Function:
+    name, inputs, outputs, calls, lines, decorators, asynchronous, functions = body
+    function = models.Function(
+        snapshot.string(name),
+        [],
+        [],
+        [snapshot.string(callee) for callee in calls],
+        lines,
+        parent,
+        [snapshot.string(decorator) for decorator in decorators],
+        asynchronous,
+    )
+    function.input = [decode_variable(snapshot, v, function) for v in inputs]
+    function.output = [decode_variable(snapshot, v, function) for v in outputs]
+    function.functions = [decode_function(snapshot, f, function) for f in functions]
+    return function
+
+
+def decode_class(
+    snapshot: Snapshot, body: tuple, parent: models.Class | models.Module
+) -> models.Class:
+    name, class_attributes, instance_attributes, functions, classes, decorators = body
+    class_obj = models.Class(
+        snapshot.string(name),
+        [],
+        [],
+        [],
+        parent,
+        [],
+        [snapshot.string(decorator) for decorator in decorators],
+    )
+    class_obj.class_attributes = [
+        decode_variable(snapshot, v, class_obj) for v in class_attributes
+    ]
+    class_obj.instance_attributes = [
+        decode_variable(snapshot, v, class_obj) for v in instance_attributes
+    ]
+    class_obj.functions = [decode_function(snapshot, f, class_obj) for f in functions]
+    class_obj.classes = [decode_class(snapshot, c, class_obj) for c in classes]
+    return class_obj
+
+
+def decode_module(snapshot: Snapshot, module: models.Module, body: tuple) -> None:
+    imports, constants, classes, functions, aliases, import_names = body
+    module.imports = [snapshot.module(i) for i in imports]
+    module.constants = [decode_variable(snapshot, v, module) for v in constants]
+    module.classes = [decode_class(snapshot, c, module) for c in classes]
+    module.functions = [decode_function(snapshot, f, module) for f in functions]
+    module.aliases = {
+        snapshot.string(name): snapshot.string(target) for name, target in aliases
+    }
+    module.import_names = [snapshot.string(name) for name in import_names]
+
+
+def save(repository: models.Repository, path: Path) -> None:
+    """Write a repository model to a snapshot file.
+
+    Parameters
+    ----------
+    repository : models.Repository
+        Repository to be saved.
+    path : Path
+        Path to the snapshot file, overwritten if it exists.
+    """
+    strings = StringTable()
+    packages = list(repository.source.iter_packages())
+    package_ids = {id(package): i for i, package in enumerate(packages)}
+    modules = [module for package in packages for module in package.modules]
+    module_ids = {id(module): i for i, module in enumerate(modules)}
+
+    # Encode package table and module bodies, filling the string table
+    firsts = [0]
+    for package in packages:
+        firsts.append(firsts[-1] + len(package.modules))
+    package_table = b"".join(
+        PACKAGE.pack(
+            strings.id(package.name),
+            package_ids.get(id(package.parent), -1),
+            strings.id(path_string(package.path)),
+            first,
+            len(package.modules),
+        )
+        for package, first in zip(packages, firsts)
+    )
+    bodies = [marshal.dumps(encode_module(strings, m, module_ids)) for m in modules]
+    module_records = [
+        (strings.id(module.name), package_ids[id(module.parent)]) for module in modules
+    ]
+    name_id = strings.id(repository.name)
+    path_id = strings.id(path_string(repository.path))
+
+    # Encode string table as offsets into concatenated strings
+    encoded = [string.encode("utf-8", "surrogatepass") for string in strings.strings]
+    string_offsets = array("Q", [0]) * (len(encoded) + 1)
+    for i, string in enumerate(encoded):
+        string_offsets[i + 1] = string_offsets[i] + len(string)
+    string_data = b"".join(encoded)
+
+    # Lay out sections after the header, keeping each one 8-byte aligned
+    sizes = [
+        len(string_offsets) * 8,
+        len(package_table),
+        len(modules) * MODULE.size,
+        len(string_data),
+    ]
+    offsets = [HEADER.size + (-HEADER.size % 8)]
+    for size in sizes:
+        offsets.append(offsets[-1] + size + (-size % 8))
+
+    # Encode module table with absolute offsets of module bodies
+    module_table = bytearray()
+    body_offset = offsets[-1]
+    for record, body in zip(module_records, bodies):
+        module_table += MODULE.pack(*record, body_offset, len(body))
+        body_offset += len(body)
+
+    with open(path, mode="wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                PYTHON,
+                name_id,
+                path_id,
+                len(strings.strings),
+                len(packages),
+                len(modules),
+                offsets[0],
+                offsets[3],
+                offsets[1],
+                offsets[2],
+            )
+        )
+        sections = [string_offsets.tobytes(), package_table, module_table, string_data]
+        for offset, section in zip(offsets, sections):
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(section)
+        file.write(b"\0" * (offsets[-1] - file.tell()))
+        for body in bodies:
+            file.write(body)
+
+
+def path_string(path: Path | None) -> str | None:
+    return None if path is None else str(path)
+
+
+def load(path: Path) -> models.Repository:
+    """Open a snapshot, loading module bodies only when they are accessed.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the snapshot file.
+
+    Returns
+    -------
+    models.Repository
+        Repository whose packages and modules keep the snapshot mapped until
+        loaded, for as long as they are referenced. Use `Snapshot` as a context
+        manager to unmap the file at a known point instead.
+    """
+    return Snapshot(path).repository()
@@ -0,0 +1,114 @@
+"""Read module source code once and index its lines.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import Iterator
+from array import array
+from pathlib import Path
+import io
+import mmap
+import os
+import re
+import tokenize
+
+
+# Constants
+
+
+MMAP_THRESHOLD = 1 << 20
+NEWLINE = re.compile(r"\r\n|\r|\n")
+
+
+# Classes
+
+
+class Source:
+    """Decoded module source with an index of line offsets.
+
+    Lines are sliced out of the source text on access rather than stored, and
+    can be read by index like a list of lines without their newlines.
+
+    Parameters
+    ----------
+    text : str
+        Decoded source code.
+
+    Methods
+    -------
+    from_path(path)
+        Read and decode a module, honouring its PEP 263 encoding cookie.
+    from_bytes(data)
+        Decode module bytes that were already read.
+    """
+
+    __slots__ = ("text", "offsets")
+
+    def __init__(self, text: str):
+        self.text = text
+
+        # Store the start offset of each line, plus the end of the text
+        self.offsets = array("q", [0])
+        self.offsets.extend(match.end() for match in NEWLINE.finditer(text))
+        if self.offsets[-1] != len(text):
+            self.offsets.append(len(text))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int | slice) -> str | list[str]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("line index out of range")
+        return self.text[self.offsets[i] : self.offsets[i + 1]].rstrip("\r\n")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def from_path(cls, path: Path) -> Source:
+        with open(path, mode="rb") as file:
+            size = os.fstat(file.fileno()).st_size
+
+            # Decode small files from a single read
+            if (size < MMAP_THRESHOLD) or (size == 0):
+                return Source.from_bytes(file.read())
+
+            # Decode large files straight from a memory map, without a copy
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                first = mapped.find(b"\n")
+                second = -1 if first < 0 else mapped.find(b"\n", first + 1)
+                encoding = detect_encoding(mapped[: second + 1 or None])
+                with memoryview(mapped) as view:
+                    return Source(str(view, encoding))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Source:
+        return Source(str(data, detect_encoding(data)))
+
+
+# Functions
+
+
+def detect_encoding(data: bytes) -> str:
+    """Detect the encoding of Python source from its BOM or PEP 263 cookie.
+
+    Parameters
+    ----------
+    data : bytes
+        Beginning of the source, containing at least its first two lines.
+
+    Returns
+    -------
+    str
+        Codec name, ``"utf-8-sig"`` if the source starts with a BOM.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return encoding
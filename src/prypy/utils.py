@@ -6,6 +6,17 @@
 
 
 from pathlib import Path
+from typing import Any, Callable
+from array import array
+from collections import deque
+from itertools import repeat
+import ast
+import bisect
+import operator
+import os
+import re
+
+from prypy import blocks
 
 
 # Functions
@@ -25,7 +36,8 @@ def get_item_names(path: Path) -> dict[str, bool]:
         Items indexed by name, containing bool evaluating whether or not they
         are files.
     """
-    return {item.name: item.is_file() for item in path.iterdir()}
+    with os.scandir(path) as entries:
+        return {entry.name: entry.is_file() for entry in entries}
 
 
 def get_item_paths(path: Path) -> list[Path]:
@@ -41,28 +53,444 @@ def get_item_paths(path: Path) -> list[Path]:
     list[Path]
         List of paths to items within directory.
     """
-    return list(path.iterdir())
+    with os.scandir(path) as entries:
+        return [path / entry.name for entry in entries]
+
+
+def find_sorted(items: list[Any], name: str) -> int | None:
+    """Find the index of an item in a list sorted by name.
+
+    Parameters
+    ----------
+    items : list[Any]
+        Items with a `name` attribute, sorted by name.
+    name : str
+        Name of the item to be found.
+
+    Returns
+    -------
+    int | None
+        Index of the item, or ``None`` if no item has that name.
+    """
+    i = bisect.bisect_left(items, name, key=operator.attrgetter("name"))
+    if (i < len(items)) and (items[i].name == name):
+        return i
+    return None
+
+
+def replace_sorted(items: list[Any], item: Any) -> Any | None:
+    """Insert or replace an item in a list sorted by name.
+
+    Parameters
+    ----------
+    items : list[Any]
+        Items with a `name` attribute, sorted by name.
+    item : Any
+        Item to be inserted in place of any item sharing its name.
+
+    Returns
+    -------
+    Any | None
+        Replaced item, or ``None`` if the item was inserted.
+    """
+    i = find_sorted(items, item.name)
+    if i is None:
+        bisect.insort(items, item, key=operator.attrgetter("name"))
+        return None
+    old_item, items[i] = items[i], item
+    return old_item
+
+
+def remove_sorted(items: list[Any], name: str) -> Any | None:
+    """Remove an item from a list sorted by name.
+
+    Parameters
+    ----------
+    items : list[Any]
+        Items with a `name` attribute, sorted by name.
+    name : str
+        Name of the item to be removed.
+
+    Returns
+    -------
+    Any | None
+        Removed item, or ``None`` if no item has that name.
+    """
+    i = find_sorted(items, name)
+    if i is None:
+        return None
+    return items.pop(i)
+
+
+def qualified_name(item: Any) -> str:
+    """Return the dotted name of a model item within its source package.
+
+    Parameters
+    ----------
+    item : Any
+        Package, module, class, function or variable, linked to its parents.
+
+    Returns
+    -------
+    str
+        Names of the item and its parents joined by dots, with `__init__`
+        modules named after their package.
+    """
+    names = []
+    while hasattr(item, "parent"):
+        if (item.name != "__init__") or not hasattr(item, "import_names"):
+            names.append(item.name)
+        item = item.parent
+    return ".".join(reversed(names))
 
 
-def tab_level(line: str) -> int:
-    """Return the tab level of the current line.
+def dotted_name(node: ast.expr) -> str | None:
+    """Return the dotted name of a chain of attributes on a name.
 
     Parameters
     ----------
-    line : str
-        Module line to be inspected.
+    node : ast.expr
+        Expression such as the callee of a call.
 
     Returns
     -------
-    int
-        Number of indents to beginning of line content.
+    str | None
+        Dotted name such as ``"os.path.join"``, or ``None`` if the expression
+        is not a plain chain of names.
     """
-    return max(len(line.split("\t")), len(line.split("    "))) - 1
+    names = []
+    while isinstance(node, ast.Attribute):
+        names.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    names.append(node.id)
+    return ".".join(reversed(names))
+
+
+def absolute_name(name: str, package: str) -> str:
+    """Resolve a possibly relative import target against a package.
+
+    Parameters
+    ----------
+    name : str
+        Dotted import target, relative if it starts with dots.
+    package : str
+        Dotted name of the package containing the importing module.
+
+    Returns
+    -------
+    str
+        Absolute dotted name of the target.
+    """
+    relative = name.lstrip(".")
+    level = len(name) - len(relative)
+    if level == 0:
+        return name
+    parts = package.split(".")[: len(package.split(".")) - level + 1]
+    return ".".join(parts + ([relative] if relative else []))
+
+
+def package_name(module: Any) -> str:
+    """Return the dotted name of the package relative imports start from.
+
+    Parameters
+    ----------
+    module : Any
+        Importing module.
+
+    Returns
+    -------
+    str
+        Dotted name of the module's package, or of the package it initializes.
+    """
+    if module.name == "__init__":
+        return qualified_name(module)
+    return qualified_name(module.parent)
+
+
+def replaced(
+    find: Callable[[str], Any], removed: list[Any], added: list[Any]
+) -> tuple[list[Any], list[Any]]:
+    """Return the modules an update drops from and adds to an index.
+
+    Parameters
+    ----------
+    find : Callable[[str], Any]
+        Indexed module with a qualified name, or ``None`` if there is none.
+    removed : list[Any]
+        Modules removed from the model.
+    added : list[Any]
+        Modules added to the model.
+
+    Returns
+    -------
+    tuple[list[Any], list[Any]]
+        Indexed modules to be dropped, including those which share the name
+        of an added module, then modules to be added, leaving out modules
+        both added and removed within the update.
+    """
+    removed_set, added_set = set(removed), set(added)
+    added = [module for module in added if module not in removed_set]
+
+    # Keep indexed modules only, once each and in order
+    dropped, seen = [], set(added_set)
+    for module in removed + [find(qualified_name(module)) for module in added]:
+        if (
+            (module is not None)
+            and (module not in seen)
+            and (find(qualified_name(module)) is module)
+        ):
+            seen.add(module)
+            dropped.append(module)
+    return dropped, added
+
+
+def compress(n: int, edges: list[tuple[int, int]]) -> tuple[array, array]:
+    """Store adjacency lists as compressed sparse rows.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes.
+    edges : list[tuple[int, int]]
+        Source and target IDs of each edge.
+
+    Returns
+    -------
+    tuple[array, array]
+        Offsets of each node's neighbours, and the concatenated neighbours.
+    """
+    edges = sorted(set(edges))
+    offsets = array("l", [0]) * (n + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    neighbours = array("l", [0]) * len(edges)
+    position = offsets[:-1]
+    for source, target in edges:
+        neighbours[position[source]] = target
+        position[source] += 1
+    return offsets, neighbours
+
+
+def splice(
+    offsets: array, neighbours: array, rows: dict[int, list[int]], n: int
+) -> tuple[array, array]:
+    """Replace some adjacency lists of compressed sparse rows.
+
+    Rows between replaced ones are copied as slices, so that the cost of the
+    Python loop grows with the number of replaced rows only.
+
+    Parameters
+    ----------
+    offsets : array
+        Compressed sparse row offsets.
+    neighbours : array
+        Compressed sparse row neighbours.
+    rows : dict[int, list[int]]
+        Sorted neighbours of each replaced node.
+    n : int
+        Number of nodes afterwards, at least the number before, with added
+        nodes left without neighbours unless replaced.
+
+    Returns
+    -------
+    tuple[array, array]
+        Offsets of each node's neighbours, and the concatenated neighbours.
+    """
+    old_n = len(offsets) - 1
+    new_offsets, new_neighbours = array("l", [0]), array("l")
+    copied = 0
+    for i in sorted(rows) + [n]:
+        # Copy unchanged rows, shifting their offsets, then pad added rows
+        end = min(i, old_n)
+        if end > copied:
+            shift = len(new_neighbours) - offsets[copied]
+            new_neighbours.extend(neighbours[offsets[copied] : offsets[end]])
+            new_offsets.extend(
+                map(operator.add, offsets[copied + 1 : end + 1], repeat(shift))
+            )
+        pad = i - max(copied, old_n)
+        if pad > 0:
+            new_offsets.extend(repeat(len(new_neighbours), pad))
+
+        # Append the replaced row
+        if i < n:
+            new_neighbours.extend(rows[i])
+            new_offsets.append(len(new_neighbours))
+        copied = i + 1
+    return new_offsets, new_neighbours
+
+
+def reverse_rows(
+    offsets: array,
+    neighbours: array,
+    reverse_offsets: array,
+    reverse_neighbours: array,
+    rows: dict[int, list[int]],
+) -> dict[int, list[int]]:
+    """Return the reverse adjacency lists changed by replacing some rows.
+
+    Parameters
+    ----------
+    offsets : array
+        Compressed sparse row offsets, before replacing `rows`.
+    neighbours : array
+        Compressed sparse row neighbours, before replacing `rows`.
+    reverse_offsets : array
+        Offsets of the reverse graph.
+    reverse_neighbours : array
+        Neighbours of the reverse graph.
+    rows : dict[int, list[int]]
+        Sorted neighbours of each replaced node.
+
+    Returns
+    -------
+    dict[int, list[int]]
+        Sorted reverse neighbours of each node gained or lost as a neighbour,
+        to be spliced into the reverse graph.
+    """
+    sources = {}
+    for i, row in rows.items():
+        for j in row:
+            sources.setdefault(j, []).append(i)
+        if i < len(offsets) - 1:
+            for j in neighbours[offsets[i] : offsets[i + 1]]:
+                sources.setdefault(j, [])
+
+    # Keep reverse neighbours of unchanged rows, adding those of replaced rows
+    reverse = {}
+    for j, row in sources.items():
+        kept = ()
+        if j < len(reverse_offsets) - 1:
+            kept = reverse_neighbours[reverse_offsets[j] : reverse_offsets[j + 1]]
+        reverse[j] = sorted({i for i in kept if i not in rows}.union(row))
+    return reverse
+
+
+def traverse(start: int, offsets: array, neighbours: array) -> set[int]:
+    """Return the nodes reachable from a node, excluding itself unless cyclic.
+
+    Parameters
+    ----------
+    start : int
+        ID of the first node.
+    offsets : array
+        Compressed sparse row offsets.
+    neighbours : array
+        Compressed sparse row neighbours.
+
+    Returns
+    -------
+    set[int]
+        IDs of the reachable nodes.
+    """
+    seen = set()
+    queue = deque([start])
+    while len(queue) > 0:
+        node = queue.popleft()
+        for neighbour in neighbours[offsets[node] : offsets[node + 1]]:
+            if neighbour not in seen:
+                seen.add(neighbour)
+                queue.append(neighbour)
+    return seen
+
+
+def strongly_connected(n: int, offsets: array, neighbours: array) -> list[list[int]]:
+    """Find strongly connected components with an iterative Tarjan search.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes.
+    offsets : array
+        Compressed sparse row offsets.
+    neighbours : array
+        Compressed sparse row neighbours.
+
+    Returns
+    -------
+    list[list[int]]
+        Components, each listed after every component it has edges to.
+    """
+    index = array("l", [-1]) * n
+    low = array("l", [0]) * n
+    on_stack = bytearray(n)
+    stack, components = [], []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, offsets[root])]
+
+        while len(work) > 0:
+            node, position = work[-1]
+
+            # Visit next neighbour of the node on top of the work stack
+            if position < offsets[node + 1]:
+                work[-1] = (node, position + 1)
+                neighbour = neighbours[position]
+                if index[neighbour] == -1:
+                    index[neighbour] = low[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack[neighbour] = 1
+                    work.append((neighbour, offsets[neighbour]))
+                elif on_stack[neighbour]:
+                    low[node] = min(low[node], index[neighbour])
+                continue
+
+            # Pop finished node, emitting its component if it is the root
+            work.pop()
+            if len(work) > 0:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
 
 
 def is_encased(
     line: str | list[str], pivot: str, left: str, right: str | None = None
 ) -> list[bool]:
+    """Find whether each occurrence of a pivot lies between delimiters.
+
+    The line is scanned once. Identical delimiters, such as quotes, toggle
+    being encased while distinct ones, such as brackets, nest. Delimiters and
+    pivots escaped by a backslash within delimiters are skipped.
+
+    Parameters
+    ----------
+    line : str | list[str]
+        Line, or lines joined into one.
+    pivot : str
+        Substring whose occurrences are checked.
+    left : str
+        Opening delimiter.
+    right : str | None
+        Closing delimiter, the same as `left` if ``None``.
+
+    Returns
+    -------
+    list[bool]
+        Whether each occurrence of `pivot`, from left to right, is encased.
+    """
     # Set right to left if not declared
     if right is None:
         right = left
@@ -75,88 +503,55 @@ def is_encased(
     if pivot not in line:
         raise ValueError(f"`{pivot}` not found in line `{line}`.")
 
-    # Create open/close status and pivot tracker
-    met = [[False, False] for i in range(len(line.split(pivot)) - 1)]
-    n_pivot = 0
+    # Match escapes first, then the longest of overlapping substrings
+    substrings = sorted({pivot, left, right}, key=len, reverse=True)
+    pattern = re.compile(r"\\[\s\S]|" + "|".join(map(re.escape, substrings)))
 
     # Read line from left to right
-    i = 0
-    while i < len(line):
-        if (i + len(pivot) - 1 < len(line)) and (line[i : i + len(pivot)] == pivot):
-            n_pivot += 1
-            if met[left]:
-                pass
+    encased = []
+    depth = 0
+    position = 0
+    while (match := pattern.search(line, position)) is not None:
+        token = match.group()
+        position = match.end()
+        if (token[0] == "\\") and (token not in substrings):
+            # Only skip escaped characters within delimiters
+            if depth == 0:
+                position = match.start() + 1
+        elif token == pivot:
+            encased.append(depth > 0)
+        elif left == right:
+            depth = 1 - depth
+        elif token == left:
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+
+    return encased
 
-        if i + len(left) - 1 < len(line):
-            pass
 
-    # Check multiple lines
-    if isinstance(line, list):
-        pass
-    # Check single line
-    else:
-        #
-        segments = line.split(pivot)
-        i = 0
-        while i < len(segments) - 1:
-            # Not encased if `left` doesn't appear before `pivot`
-            if left not in segments[i]:
-                encased.append(False)
-            else:
-                pass
-            i += 1
+def remove_comments(lines: list[str]) -> list[str]:
+    """Remove comments from lines of source code.
 
+    Lines are joined and lexed once, so that `#` within strings of any quote
+    style, including multi-line and f-strings, is left untouched.
 
-def remove_comments(lines: list[str]) -> list[str]:
-    # Iterate over all lines
-    i = 0
-    while i < len(lines):
-        # Remove single line comments
-        if "#" in lines[i]:
-            # Check each instance of "#"
-            j = 0
-            while j < len(lines[i].split("#")) - 1:
-                if lines[j][-1] == '"':
-                    pass
-                j += 1
-
-    # Skip empty lines and comments
-    if (len(line.strip()) == 0) or (line.strip()[0] == "#"):
-        i += 1
-        continue
-    # Skip multi-line strings
-    elif '"""' in line:
-        # If line is variable declaration, store if module-level constant
-        if (
-            ("=" in line.split('"""')[0])
-            and (line.split('"""')[0].split("=")[0].strip().isupper())
-            and (utils.tab_level(line) == 0)
-        ):
-            constant_name = line.split('"""')[0].split("=")[0].strip()
-            constant_str = line.split('"""')[1].strip()
-
-            # If only opening quotation mark is found, find closing mark
-            if len(line.split('"""')) == 2:
-                i += 1
-                line = lines[i]
-                while ('"""' not in line) and (i < len(lines)):
-                    constant_str += "\n" + line.strip()
-                    i += 1
-                    line = lines[i]
-                if len(line.split('"""')[0].strip()) > 0:
-                    constant_str += "\n" + line.strip()
-
-            # Create and store constant
-            module.constants.append(Variable(constant_name, str, constant_str, module))
-
-        # Otherwise skip string
-        else:
-            # If only opening quotation mark is found, find closing mark
-            if len(line.split('"""')) == 2:
-                i += 1
-                line = lines[i]
-                while ('"""' not in line) and (i < len(lines)):
-                    i += 1
-                    line = lines[i]
-            i += 1
-            continue
+    Parameters
+    ----------
+    lines : list[str]
+        Lines of source code, without line endings.
+
+    Returns
+    -------
+    list[str]
+        The same lines without comments, nor the whitespace preceding them.
+    """
+    text = "\n".join(lines)
+    pieces = []
+    position = 0
+    for match in blocks.TOKEN.finditer(text):
+        if match.lastgroup == "comment":
+            pieces.append(text[position : match.start()].rstrip(" \t\f"))
+            position = match.end()
+    pieces.append(text[position:])
+    return "".join(pieces).split("\n")
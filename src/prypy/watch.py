@@ -0,0 +1,345 @@
+"""Watch a repository and keep its model up to date.
+"""
+
+
+# Imports
+
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Iterator
+from pathlib import Path
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from prypy import models
+
+if TYPE_CHECKING:
+    from prypy.discovery import IgnoreRules
+
+
+# Constants
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+# Classes
+
+
+class PollingWatcher:
+    """Detect changed modules by comparing periodic stat snapshots.
+
+    Parameters
+    ----------
+    root : Path
+        Directory to be watched recursively.
+    interval : float
+        Seconds between two snapshots.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never polled.
+
+    Methods
+    -------
+    poll(timeout)
+        Wait up to `timeout` seconds and return the changed paths.
+    close()
+        Release watcher resources.
+    """
+
+    def __init__(
+        self, root: Path, interval: float = 1.0, ignore: IgnoreRules | None = None
+    ):
+        self.root = root
+        self.interval = interval
+        self.ignore = ignore
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for directory, filenames in walk(self.root, self.ignore):
+            for filename in filenames:
+                if filename.endswith(".py"):
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Compare created, deleted and modified modules to last snapshot
+            snapshot = self.take_snapshot()
+            changed = {Path(path) for path in snapshot.keys() ^ self.snapshot.keys()}
+            for path, stat in snapshot.items():
+                if self.snapshot.get(path, stat) != stat:
+                    changed.add(Path(path))
+            self.snapshot = snapshot
+            if (len(changed) > 0) or (
+                (deadline is not None) and (time.monotonic() >= deadline)
+            ):
+                return changed
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Detect changed modules and packages with Linux inotify.
+
+    Parameters
+    ----------
+    root : Path
+        Directory to be watched recursively.
+    latency : float
+        Seconds to keep collecting events after the first one, so that bursts
+        such as checkouts are handled as a single batch.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never watched.
+
+    Methods
+    -------
+    poll(timeout)
+        Wait up to `timeout` seconds and return the changed paths.
+    close()
+        Release watcher resources.
+    """
+
+    def __init__(
+        self, root: Path, latency: float = 0.05, ignore: IgnoreRules | None = None
+    ):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("C library not found.")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available.")
+
+        self.root = root
+        self.latency = latency
+        self.ignore = ignore
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialize inotify.")
+        self.directories = {}
+        self.add_tree(root)
+
+    def add_tree(self, root: Path) -> None:
+        if (self.ignore is not None) and self.ignore.excludes(root, True):
+            return
+        for directory, _ in walk(root, self.ignore):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_MASK)
+            if wd >= 0:
+                self.directories[wd] = Path(directory)
+
+    def read_events(self) -> set[Path]:
+        changed = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = buffer[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                # Report the whole tree if events were dropped
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+                    continue
+                if (wd not in self.directories) or (mask & IN_DELETE_SELF):
+                    continue
+
+                # Keep changed directories and modules, watching new directories
+                path = self.directories[wd] / os.fsdecode(name)
+                if (self.ignore is not None) and self.ignore.excludes(
+                    path, bool(mask & IN_ISDIR)
+                ):
+                    continue
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self.add_tree(path)
+                    changed.add(path)
+                elif path.suffix == ".py":
+                    changed.add(path)
+
+    def poll(self, timeout: float | None = None) -> set[Path]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return set()
+        changed = self.read_events()
+        time.sleep(self.latency)
+        return changed | self.read_events()
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Session:
+    """Long-running analysis session patching a repository as files change.
+
+    Parameters
+    ----------
+    repository : models.Repository
+        Repository model built once and then kept up to date.
+    engine : str
+        Parsing engine passed to `Module.from_path`.
+    watcher : PollingWatcher | InotifyWatcher | None
+        Watcher of the source package, created with `get_watcher` if not passed.
+    listeners : list[Callable]
+        Callbacks receiving the removed and added modules of each update, used
+        to patch data derived from the model.
+
+    Methods
+    -------
+    refresh(timeout)
+        Wait for changes, apply them and notify listeners.
+    run()
+        Refresh forever.
+    """
+
+    def __init__(
+        self,
+        repository: models.Repository,
+        engine: str = "ast",
+        watcher: PollingWatcher | InotifyWatcher | None = None,
+        listeners: (
+            list[Callable[[list[models.Module], list[models.Module]], None]] | None
+        ) = None,
+    ):
+        self.repository = repository
+        self.engine = engine
+        self.watcher = watcher or get_watcher(
+            repository.source.path, ignore=repository.ignore
+        )
+        self.listeners = [] if listeners is None else listeners
+
+    def __enter__(self) -> Session:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def refresh(
+        self, timeout: float | None = None
+    ) -> tuple[list[models.Module], list[models.Module]]:
+        removed, added = [], []
+        loaded = set()
+
+        # Apply changes parents first, skipping modules already reloaded
+        for path in sorted(self.watcher.poll(timeout)):
+            if path in loaded:
+                continue
+            # Keep the previous model of modules saved mid-edit, undecodable or
+            # removed again before being read
+            try:
+                path_removed, path_added = self.repository.update(path, self.engine)
+            except (SyntaxError, ValueError, OSError):
+                continue
+            removed.extend(path_removed)
+            added.extend(path_added)
+            loaded.update(module.path for module in path_added)
+
+        # Notify listeners of derived data
+        if (len(removed) > 0) or (len(added) > 0):
+            for listener in self.listeners:
+                listener(removed, added)
+        return removed, added
+
+    def run(self) -> None:
+        while True:
+            self.refresh()
+
+    def close(self) -> None:
+        self.watcher.close()
+
+
+# Functions
+
+
+def get_watcher(
+    root: Path, interval: float = 1.0, ignore: IgnoreRules | None = None
+) -> PollingWatcher | InotifyWatcher:
+    """Create an inotify watcher, falling back to polling where unavailable.
+
+    Parameters
+    ----------
+    root : Path
+        Directory to be watched recursively.
+    interval : float
+        Seconds between two snapshots of the polling fallback.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories, which are never watched.
+
+    Returns
+    -------
+    PollingWatcher | InotifyWatcher
+        Watcher of `root`.
+    """
+    try:
+        return InotifyWatcher(root, ignore=ignore)
+    except (OSError, AttributeError):
+        return PollingWatcher(root, interval, ignore)
+
+
+def walk(
+    root: Path, ignore: IgnoreRules | None = None
+) -> Iterator[tuple[str, list[str]]]:
+    """Walk a directory tree, never entering ignored directories.
+
+    Parameters
+    ----------
+    root : Path
+        Directory to be walked.
+    ignore : IgnoreRules | None
+        Rules excluding files and directories.
+
+    Yields
+    ------
+    tuple[str, list[str]]
+        Path of each directory, then the names of the files it holds.
+    """
+    for directory, dirnames, filenames in os.walk(root):
+        if ignore is not None:
+            prefix = ignore.prefix(directory)
+            dirnames[:] = [
+                name for name in dirnames if not ignore.ignores(prefix + name, True)
+            ]
+            filenames = [
+                name for name in filenames if not ignore.ignores(prefix + name, False)
+            ]
+        yield directory, filenames
@@ -7,11 +7,55 @@
 
 from pathlib import Path
 
+import pytest
+
 from prypy import cli, main, models, reader, utils
 
 
-# Setup
+# Constants
+
+
+SAMPLE_MODULE = '''"""Sample module.
+"""
+
+import os
+from pathlib import Path
+
+GREETING: str = "hello"
+COUNT = 3
 
 
+class Shape:
+    sides: int = 0
+
+    def __init__(self, name: str, size: float = 1.0) -> None:
+        self.name = name
+        self.size: float = size
+
+    def area(self) -> float:
+        return self.size * self.size
+
+
+async def fetch(url, *args, timeout=10, **kwargs):
+    return url
+'''
+
+
+# Setup
 
 
+@pytest.fixture
+def sample_repo(tmp_path: Path) -> Path:
+    """Create a `sample-repo/src/sample_repo` repository with a subpackage."""
+    package = tmp_path / "sample-repo" / "src" / "sample_repo"
+    subpackage = package / "shapes"
+    subpackage.mkdir(parents=True)
+    (package / "__init__.py").write_text('"""Sample package.\n"""\n')
+    (package / "core.py").write_text(SAMPLE_MODULE)
+    (subpackage / "__init__.py").write_text("")
+    (subpackage / "square.py").write_text(
+        "SIDES = 4\n\n\ndef area(side):\n    return side**2\n"
+    )
+    (package / "data").mkdir()
+    (package / "data" / "notes.txt").write_text("not a package\n")
+    return tmp_path / "sample-repo"
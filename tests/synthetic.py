@@ -0,0 +1,152 @@
+"""Generate synthetic repositories for benchmarks.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+
+# Functions
+
+
+def module_source(
+    index: int, classes: int, functions: int, docstring_lines: int, nesting: int
+) -> str:
+    """Return the source of a synthetic module.
+
+    Parameters
+    ----------
+    index : int
+        Number of the module, used to vary names and imports.
+    classes : int
+        Number of classes, each with methods and attributes.
+    functions : int
+        Number of module-level functions and methods of each class.
+    docstring_lines : int
+        Number of lines of each docstring.
+    nesting : int
+        Depth of the nested blocks in each function body.
+
+    Returns
+    -------
+    str
+        Source code indented with four spaces.
+    """
+    docstring = "\n".join(
+        f"    Line {i} of a long docstring, with 'quotes' and # no comment."
+        for i in range(docstring_lines)
+    )
+    lines = [
+        f'"""Synthetic module {index}.\n\n{docstring}\n"""',
+        "",
+        "import os",
+        "from pathlib import Path",
+        "",
+        f"LIMIT: int = {index}",
+        f'NAME = "module_{index}"',
+        "",
+    ]
+
+    # Nest blocks alternating loops and conditions, then return
+    body = []
+    for depth in range(nesting):
+        indent = "    " * (depth + 1)
+        if depth % 2 == 0:
+            body.append(f"{indent}for i{depth} in range(value):")
+        else:
+            body.append(f"{indent}if i{depth - 1} > LIMIT:")
+        body.append(f"{indent}    value = helper_0(value) + len(os.sep)")
+    body.append(f"{'    ' * (nesting + 1)}return value")
+    body.append("    return None")
+
+    for i in range(functions):
+        lines.extend(
+            [
+                "",
+                f"def helper_{i}(value: int, *args, scale: float = 1.0, **kwargs) -> int:",
+                f'    """Helper {i}.\n\n{docstring}\n    """',
+                *body,
+            ]
+        )
+
+    for i in range(classes):
+        lines.extend(["", "", f"class Model{i}:", f"    kind: str = 'model_{i}'"])
+        lines.extend(
+            [
+                "",
+                "    def __init__(self, path: Path, size: int = 0) -> None:",
+                "        self.path = path",
+                "        self.size: int = size",
+            ]
+        )
+        for j in range(functions):
+            lines.extend(
+                [
+                    "",
+                    f"    def method_{j}(self, value: int) -> int:",
+                    "        return self.size + helper_0(value)",
+                ]
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def generate(
+    root: Path,
+    name: str = "synthetic-repo",
+    packages: int = 2,
+    depth: int = 2,
+    modules: int = 5,
+    classes: int = 3,
+    functions: int = 5,
+    docstring_lines: int = 20,
+    nesting: int = 8,
+) -> Path:
+    """Write a synthetic repository with the `[repo-name]/src/[repo_name]` layout.
+
+    Every other module is indented with tabs instead of spaces.
+
+    Parameters
+    ----------
+    root : Path
+        Directory the repository is created in.
+    name : str
+        Name of the repository.
+    packages : int
+        Number of subpackages of each package.
+    depth : int
+        Number of levels of subpackages below the source package.
+    modules : int
+        Number of modules of each package, besides `__init__`.
+    classes : int
+        Number of classes of each module.
+    functions : int
+        Number of functions of each module, and methods of each class.
+    docstring_lines : int
+        Number of lines of each docstring.
+    nesting : int
+        Depth of the nested blocks in each function body.
+
+    Returns
+    -------
+    Path
+        Path to the repository.
+    """
+    repository = root / name
+    pending = [(repository / "src" / name.replace("-", "_"), 0)]
+    count = 0
+    while len(pending) > 0:
+        path, level = pending.pop()
+        path.mkdir(parents=True)
+        (path / "__init__.py").write_text(f'"""Package {path.name}.\n"""\n')
+        for i in range(modules):
+            source = module_source(count, classes, functions, docstring_lines, nesting)
+            if count % 2 == 1:
+                source = source.replace("    ", "\t")
+            (path / f"module_{i}.py").write_text(source)
+            count += 1
+        if level < depth:
+            pending.extend((path / f"package_{i}", level + 1) for i in range(packages))
+    return repository
@@ -0,0 +1,124 @@
+"""Benchmarks of the parsing pipeline against recorded baselines.
+"""
+
+
+# Imports
+
+
+import gc
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+import synthetic
+from prypy import models, render
+
+
+# Constants
+
+
+# Run benchmarks only with PRYPY_BENCHMARK=1, as their results depend on the
+# machine, failing once the best time or peak memory exceeds the baseline by
+# the tolerance factors, or record new baselines with PRYPY_BENCHMARK_SAVE=1
+BASELINES = Path(__file__).with_name("benchmarks.json")
+TIME_TOLERANCE = float(os.environ.get("PRYPY_BENCHMARK_TIME", "3.0"))
+MEMORY_TOLERANCE = float(os.environ.get("PRYPY_BENCHMARK_MEMORY", "1.5"))
+SAVE = os.environ.get("PRYPY_BENCHMARK_SAVE") == "1"
+ENABLED = SAVE or (os.environ.get("PRYPY_BENCHMARK") == "1")
+REPEAT = 5
+
+
+# Setup
+
+
+pytestmark = pytest.mark.skipif(
+    not ENABLED, reason="Set PRYPY_BENCHMARK=1 to run benchmarks."
+)
+
+
+@pytest.fixture(scope="module")
+def synthetic_repo(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return synthetic.generate(tmp_path_factory.mktemp("benchmarks"), depth=1)
+
+
+@pytest.fixture(scope="module")
+def baselines() -> dict[str, dict[str, float]]:
+    with open(BASELINES, mode="r") as file:
+        baselines = json.load(file)
+    yield baselines
+    if SAVE:
+        with open(BASELINES, mode="w") as file:
+            json.dump(baselines, file, indent=4, sort_keys=True)
+            file.write("\n")
+
+
+def measure(function: Callable[[], Any]) -> tuple[float, int]:
+    """Return the best time of several calls, and the peak memory of one."""
+    seconds = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Trace memory in a separate call, as tracing slows allocations down, and
+    # keep garbage collection from moving the peak
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    return seconds, peak
+
+
+def check(
+    baselines: dict[str, dict[str, float]], name: str, function: Callable[[], Any]
+):
+    seconds, peak = measure(function)
+    if SAVE:
+        baselines[name] = {"seconds": round(seconds, 6), "peak_bytes": peak}
+        return
+
+    baseline = baselines[name]
+    assert seconds <= baseline["seconds"] * TIME_TOLERANCE, (
+        f"{name} took {seconds:.4f}s, "
+        f"{seconds / baseline['seconds']:.1f}x its baseline."
+    )
+    assert peak <= baseline["peak_bytes"] * MEMORY_TOLERANCE, (
+        f"{name} peaked at {peak} bytes, "
+        f"{peak / baseline['peak_bytes']:.1f}x its baseline."
+    )
+
+
+# Tests
+
+
+def test_module_from_path(synthetic_repo: Path, baselines: dict):
+    path = synthetic_repo / "src" / "synthetic_repo" / "module_1.py"
+    check(baselines, "module_from_path", lambda: models.Module.from_path(path, None))
+
+
+def test_package_from_path(synthetic_repo: Path, baselines: dict):
+    path = synthetic_repo / "src" / "synthetic_repo"
+    check(baselines, "package_from_path", lambda: models.Package.from_path(path, None))
+
+
+def test_repository_from_path(synthetic_repo: Path, baselines: dict):
+    check(
+        baselines,
+        "repository_from_path",
+        lambda: models.Repository.from_path(synthetic_repo),
+    )
+
+
+def test_render(synthetic_repo: Path, baselines: dict):
+    repository = models.Repository.from_path(synthetic_repo)
+    check(baselines, "render", lambda: render.render(repository, symbols=True))
@@ -0,0 +1,77 @@
+"""Tests for the blocks module.
+"""
+
+
+# Imports
+
+
+from prypy import blocks
+from prypy.source import Source
+
+
+# Constants
+
+
+MODULE = '''"""Module docstring.
+"""
+import os
+
+
+class Shape:
+\tsides = (
+        4  # comment with "quote
+    )
+
+\tdef area(self):
+\t\ttext = """
+not a block:
+"""
+\t\treturn 1 + \\
+    2
+\t# trailing comment
+
+def f(x): return x
+'''
+
+
+# Tests
+
+
+def test_block_widths():
+    index = blocks.BlockIndex(Source(MODULE))
+
+    assert [index.width(i) for i in range(7)] == [0, -2, 0, -1, -1, 0, 8]
+    assert [index.width(i) for i in range(7, 10)] == [-2, -2, -1]
+    assert [index.width(i) for i in range(10, 14)] == [8, 16, -2, -2]
+    assert [index.width(i) for i in range(14, 19)] == [16, -2, -1, -1, 0]
+    assert blocks.indent_width("\t  ", tab_size=4) == 6
+
+
+def test_block_spans():
+    index = blocks.BlockIndex.from_lines(MODULE.splitlines())
+
+    assert list(index.statements()) == [0, 2, 5, 18]
+    assert index.end(5) == 15
+    assert list(index.statements(5)) == [6, 10]
+    assert index.end(6) == 8
+    assert list(index.statements(10)) == [11, 14]
+    assert list(index.statements(18)) == []
+
+
+def test_masked_view():
+    index = blocks.BlockIndex(Source(MODULE))
+
+    assert len(index.masked) == len(MODULE)
+    assert index.masked.count("\n") == MODULE.count("\n")
+    comment = '  # comment with "quote'
+    assert index.code(6) == f"\tsides = (\n        4{' ' * len(comment)}\n    )\n"
+    assert index.code(11) == f'\t\ttext = """\n{" " * 12}\n"""\n'
+    assert index.code(14) == "\t\treturn 1 +  \n    2\n"
+    assert blocks.mask("f'{x}#' # c", brackets=True) == "f'    '    "
+    assert blocks.mask("g(a, 'b')[0]", brackets=True) == "g(      )[ ]"
+    assert blocks.split("a = {1: 2}; b = ';'", ";") == ["a = {1: 2}", " b = ';'"]
+    assert blocks.split_assignment("x: int = y = f(z=1)  # c") == (
+        ["x", "y"],
+        "int",
+        "f(z=1)",
+    )
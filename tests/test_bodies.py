@@ -0,0 +1,106 @@
+"""Tests for the bodies module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from prypy import bodies, cache, index, models, scan, utils
+
+
+# Setup
+
+
+def symbol_names(repository: models.Repository) -> list[str]:
+    return [
+        utils.qualified_name(symbol)
+        for module in repository.source.iter_modules()
+        for symbol in module.iter_symbols()
+    ]
+
+
+@pytest.fixture
+def synthetic_repo(tmp_path: Path) -> Path:
+    return synthetic.generate(tmp_path, depth=1, modules=4, docstring_lines=2)
+
+
+# Tests
+
+
+def test_repository_from_path_budget(synthetic_repo: Path):
+    expected = models.Repository.from_path(synthetic_repo)
+    repository = models.Repository.from_path(synthetic_repo, budget=100_000)
+    assert str(repository) == str(expected)
+    assert symbol_names(repository) == symbol_names(expected)
+
+
+def test_body_cache_budget(synthetic_repo: Path, monkeypatch: pytest.MonkeyPatch):
+    parsed = []
+    parse_module = scan.parse_module
+    monkeypatch.setattr(
+        scan,
+        "parse_module",
+        lambda path, *args: parsed.append(path) or parse_module(path, *args),
+    )
+    source = models.Repository.find_source(synthetic_repo)
+    repository = models.Repository(synthetic_repo.name, synthetic_repo)
+
+    # Hold the bodies of about two modules
+    sizes = bodies.BodyCache(10**9)
+    sizes.skeleton(source, repository).modules[1].classes
+    body_cache = bodies.BodyCache(sizes.size * 5 // 2)
+    repository.source = body_cache.skeleton(source, repository)
+    modules = list(repository.source.iter_modules())
+    assert len(body_cache) == 0
+
+    first, second, third = modules[1:4]
+    assert [c.parent for c in first.classes] == [first] * len(first.classes)
+    second.functions
+    first.constants
+    third.classes
+    assert (first in body_cache) and (second not in body_cache)
+    assert len(body_cache) == 2
+    assert body_cache.size <= body_cache.budget
+
+    # Reload evicted bodies on access
+    names = symbol_names(repository)
+    assert len(parsed) == len(modules) + 3
+    assert names == symbol_names(models.Repository.from_path(synthetic_repo))
+    assert body_cache.size <= body_cache.budget
+
+
+def test_body_cache_reload(
+    synthetic_repo: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    parsed = []
+    parse_stamped = scan.parse_stamped
+    monkeypatch.setattr(
+        scan,
+        "parse_stamped",
+        lambda path, *args: parsed.append(path) or parse_stamped(path, *args),
+    )
+    with cache.ModuleCache(tmp_path / "cache") as module_cache:
+        repository = models.Repository.from_path(
+            synthetic_repo, cache=module_cache, budget=1
+        )
+        names = symbol_names(repository)
+        assert symbol_names(repository) == names
+    assert len(parsed) == len(list(repository.source.iter_modules()))
+
+
+def test_symbol_index_holds_no_bodies(synthetic_repo: Path):
+    repository = models.Repository.from_path(synthetic_repo, budget=1)
+    symbols = index.SymbolIndex.from_repository(repository)
+
+    # Hold modules only, finding symbols in reloaded bodies
+    assert all(
+        isinstance(module, (models.Module, models.Package))
+        for module in symbols.symbols.values()
+    )
+    names = symbol_names(repository)
+    assert [utils.qualified_name(symbols.get(name)) for name in names] == names
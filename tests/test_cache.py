@@ -0,0 +1,56 @@
+"""Tests for the cache module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+from prypy import cache, models, scan
+
+
+# Tests
+
+
+def test_module_cache_reuses_unchanged_modules(sample_repo: Path, tmp_path: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+
+    with cache.ModuleCache(tmp_path / "cache") as module_cache:
+        assert module_cache.get(path, "ast") is None
+        module, stamp = scan.parse_stamped(path)
+        module_cache.put(path, "ast", module, stamp)
+
+        cached = module_cache.get(path, "ast")
+        assert cached.classes[0].name == "Shape"
+        assert cached.classes[0].parent is cached
+        assert module_cache.get(path, "lines") is None
+
+        # Touching the file keeps the entry, editing it invalidates it
+        path.touch()
+        assert module_cache.get(path, "ast") is not None
+        path.write_text("VALUE = 1\n")
+        assert module_cache.get(path, "ast") is None
+
+
+def test_module_cache_keeps_stamp_of_parsed_bytes(sample_repo: Path, tmp_path: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+
+    # Editing the file after it was read must not validate the stale module
+    with cache.ModuleCache(tmp_path / "cache") as module_cache:
+        module, stamp = scan.parse_stamped(path)
+        path.write_text("VALUE = 1\n")
+        module_cache.put(path, "ast", module, stamp)
+        assert module_cache.get(path, "ast") is None
+
+
+def test_module_cache_prunes_entries(sample_repo: Path, tmp_path: Path):
+    package = sample_repo / "src" / "sample_repo"
+
+    with cache.ModuleCache(tmp_path / "cache", max_entries=1) as module_cache:
+        repository = models.Repository.from_path(sample_repo, cache=module_cache)
+        assert len(repository.source.modules) == 2
+        (package / "core.py").unlink()
+        module_cache.prune()
+        count = module_cache.connection.execute("SELECT COUNT(*) FROM modules")
+        assert count.fetchone()[0] == 1
@@ -0,0 +1,125 @@
+"""Tests for the callgraph module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import callgraph, models, utils
+
+
+# Constants
+
+
+HELPERS = """
+from .shapes.square import area as square_area
+
+
+def double(x):
+    return 2 * x
+
+
+def report(side):
+    return double(square_area(side))
+"""
+
+APP = """
+import sample_repo.helpers
+from . import helpers
+from .core import Shape
+
+
+class App:
+    def run(self):
+        shape = Shape("box")
+        self.render(shape.area())
+        return helpers.report(2)
+
+    def render(self, value):
+        print(value)
+
+
+def main():
+    return sample_repo.helpers.double(App().run())
+"""
+
+
+# Tests
+
+
+def test_call_graph_resolves_calls_across_modules(sample_repo: Path):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "helpers.py").write_text(HELPERS)
+    (package / "app.py").write_text(APP)
+    repository = models.Repository.from_path(sample_repo)
+
+    graph = callgraph.CallGraph.from_repository(repository)
+
+    def names(functions):
+        return sorted(f.name for f in functions)
+
+    assert names(graph.callees("sample_repo.app.App.run")) == [
+        "__init__",
+        "render",
+        "report",
+    ]
+    assert names(graph.callers("sample_repo.helpers.double")) == ["main", "report"]
+    assert names(graph.transitive_callees("sample_repo.app.App.run")) == [
+        "__init__",
+        "area",
+        "double",
+        "render",
+        "report",
+    ]
+    assert graph.reaches("sample_repo.app.App.run", "sample_repo.shapes.square.area")
+    assert not graph.reaches("sample_repo.helpers.double", "sample_repo.app.main")
+    with pytest.raises(ValueError):
+        graph.callers("sample_repo.app.missing")
+
+
+def test_call_graph_update_resolves_affected_calls(sample_repo: Path, monkeypatch):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "helpers.py").write_text(HELPERS)
+    (package / "app.py").write_text(APP)
+    repository = models.Repository.from_path(sample_repo)
+    graph = callgraph.CallGraph.from_repository(repository)
+    resolved = []
+    resolve_calls = callgraph.CallGraph.resolve_calls
+
+    def record(self: callgraph.CallGraph, caller: int) -> list[int]:
+        resolved.append(self.functions[caller].name)
+        return resolve_calls(self, caller)
+
+    def assert_rebuilt():
+        rebuilt = callgraph.CallGraph.from_repository(repository)
+        assert len(graph) == len(rebuilt)
+        for name in rebuilt.ids:
+            for query in ("callers", "callees"):
+                assert sorted(
+                    map(utils.qualified_name, getattr(graph, query)(name))
+                ) == (sorted(map(utils.qualified_name, getattr(rebuilt, query)(name))))
+
+    monkeypatch.setattr(callgraph.CallGraph, "resolve_calls", record)
+
+    # Resolve calls of the re-parsed module and of its callers only
+    (package / "helpers.py").write_text(HELPERS.replace("double(", "twice("))
+    graph.update(*repository.update(package / "helpers.py"))
+    assert sorted(resolved) == ["main", "report", "run", "twice"]
+    assert graph.callers("sample_repo.helpers.twice")[0].name == "report"
+    assert_rebuilt()
+
+    # Reuse the IDs of deleted functions
+    size = len(graph.functions)
+    (package / "app.py").unlink()
+    graph.update(*repository.update(package / "app.py"))
+    assert_rebuilt()
+    (package / "tool.py").write_text(
+        "from .helpers import twice\n\n\ndef f():\n    twice()\n"
+    )
+    graph.update(*repository.update(package / "tool.py"))
+    assert len(graph.functions) == size
+    assert_rebuilt()
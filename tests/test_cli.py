@@ -0,0 +1,105 @@
+"""Tests for the cli module.
+"""
+
+
+# Imports
+
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from prypy import cli
+
+
+# Tests
+
+
+def test_import_is_lazy():
+    code = "import sys, prypy; print('prypy.models' in sys.modules, prypy.models)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.startswith("False <module 'prypy.models'")
+
+
+def test_scan(sample_repo: Path, capsys: pytest.CaptureFixture):
+    assert cli.main(["scan", str(sample_repo), "--symbols"]) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert records[0] == {
+        "kind": "module",
+        "name": "sample_repo",
+        "path": str(sample_repo / "src" / "sample_repo" / "__init__.py"),
+    }
+    fetch = next(r for r in records if r["name"] == "sample_repo.core.fetch")
+    assert fetch["inputs"] == ["url", "args", "timeout", "kwargs"]
+    assert fetch["asynchronous"]
+    assert records[-1]["name"] == "sample_repo.shapes.square.area"
+
+
+def test_tree_and_query(sample_repo: Path, capsys: pytest.CaptureFixture):
+    assert cli.main(["tree", str(sample_repo), "--symbols"]) == 0
+    assert "area()" in capsys.readouterr().out
+
+    arguments = ["query", str(sample_repo), "sample_repo.core.S", "--limit", "2"]
+    assert cli.main(arguments) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "sample_repo.core.Shape",
+        "sample_repo.core.Shape.__init__",
+    ]
+
+
+def test_stats(sample_repo: Path, tmp_path: Path, capsys: pytest.CaptureFixture):
+    arguments = ["stats", str(sample_repo), str(tmp_path), "--format", "jsonl"]
+    assert cli.main(arguments) == 1
+    captured = capsys.readouterr()
+
+    stats = json.loads(captured.out)
+    assert stats["modules"] == 4
+    assert stats["failed"] == 1
+    assert str(tmp_path) in captured.err
+
+
+def test_scan_reports_unparsable_modules(
+    sample_repo: Path, capsys: pytest.CaptureFixture
+):
+    broken = sample_repo / "src" / "sample_repo" / "broken.py"
+    broken.write_text("def broken(:\n")
+
+    assert cli.main(["scan", str(sample_repo)]) == 1
+    captured = capsys.readouterr()
+    names = [json.loads(line)["name"] for line in captured.out.splitlines()]
+    assert "sample_repo.core" in names
+    assert "sample_repo.broken" not in names
+    assert str(broken) in captured.err
+
+    assert cli.main(["tree", str(sample_repo)]) == 1
+    assert str(broken) in capsys.readouterr().err
+
+
+def test_query_reports_unknown_names(sample_repo: Path, capsys: pytest.CaptureFixture):
+    arguments = ["query", str(sample_repo), "sample_repo.missing", "--mode", "callers"]
+    assert cli.main(arguments) == 1
+    assert "sample_repo.missing is not a known function" in capsys.readouterr().err
+
+    arguments = [
+        "query",
+        str(sample_repo),
+        "sample_repo.missing",
+        "--mode",
+        "importers",
+    ]
+    assert cli.main(arguments) == 1
+    assert "sample_repo.missing is not a known module" in capsys.readouterr().err
+
+
+def test_cache_is_only_offered_to_single_trees(sample_repo: Path):
+    with pytest.raises(SystemExit):
+        cli.main(["stats", str(sample_repo), "--cache"])
+    with pytest.raises(SystemExit):
+        cli.main(["diff", str(sample_repo), "HEAD", "--cache"])
@@ -0,0 +1,101 @@
+"""Tests for the diff module.
+"""
+
+
+# Imports
+
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from prypy import cli, diff, models
+
+
+# Setup
+
+
+def git(path: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=path,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def git_repo(sample_repo: Path) -> Path:
+    """Commit the sample repository, then commit changes to some modules."""
+    git(sample_repo, "init", "-q")
+    git(sample_repo, "add", ".")
+    git(sample_repo, "commit", "-q", "-m", "first")
+
+    package = sample_repo / "src" / "sample_repo"
+    core = (package / "core.py").read_text()
+    core = core.replace("COUNT = 3\n", "")
+    core = core.replace("timeout=10", "timeout=30")
+    (package / "core.py").write_text(core + "\n\nclass Circle:\n    radius = 1\n")
+    (package / "extra").mkdir()
+    (package / "extra" / "__init__.py").write_text("")
+    (package / "extra" / "tools.py").write_text("def tool():\n    pass\n")
+    git(sample_repo, "add", ".")
+    git(sample_repo, "commit", "-q", "-m", "second")
+    return sample_repo
+
+
+# Tests
+
+
+def test_diff(git_repo: Path, monkeypatch: pytest.MonkeyPatch):
+    parsed = []
+    from_data = models.Module.from_data
+    monkeypatch.setattr(
+        models.Module,
+        "from_data",
+        lambda data, path, *args: parsed.append(path.name)
+        or from_data(data, path, *args),
+    )
+
+    delta = diff.diff(git_repo, "HEAD~1", "HEAD")
+
+    assert sorted(parsed) == ["__init__.py", "core.py", "core.py", "tools.py"]
+    assert list(delta.added) == [
+        "sample_repo.core.Circle",
+        "sample_repo.core.Circle.radius",
+        "sample_repo.extra.tools.tool",
+    ]
+    assert list(delta.removed) == ["sample_repo.core.COUNT"]
+    assert list(delta.changed) == ["sample_repo.core.fetch"]
+    old, new = delta.changed["sample_repo.core.fetch"]
+    assert (old.input[2].value, new.input[2].value) == ("10", "30")
+    assert len(delta) == 5
+
+
+def test_diff_reports_unparsable_modules(git_repo: Path):
+    package = git_repo / "src" / "sample_repo"
+    (package / "extra" / "tools.py").write_text("def tool(:\n")
+    core = (package / "core.py").read_text().replace("timeout=30", "timeout=60")
+    core = core.replace("        return self", "        # Square\n        return self")
+    (package / "core.py").write_text(core)
+    git(git_repo, "commit", "-q", "-am", "third")
+
+    # Skip the unparsable module, and ignore functions which only grew longer
+    delta = diff.diff(git_repo, "HEAD~1", "HEAD")
+    assert list(delta.errors) == [package / "extra" / "tools.py"]
+    assert isinstance(delta.errors[package / "extra" / "tools.py"], SyntaxError)
+    assert (list(delta.added), list(delta.removed)) == ([], [])
+    assert list(delta.changed) == ["sample_repo.core.fetch"]
+
+
+def test_diff_command(git_repo: Path, capsys: pytest.CaptureFixture):
+    assert cli.main(["diff", str(git_repo), "HEAD~1"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "+ sample_repo.core.Circle",
+        "+ sample_repo.core.Circle.radius",
+        "+ sample_repo.extra.tools.tool",
+        "- sample_repo.core.COUNT",
+        "~ sample_repo.core.fetch",
+    ]
+    assert cli.main(["diff", str(git_repo), "missing"]) == 1
@@ -0,0 +1,83 @@
+"""Tests for the discovery module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import discovery, models
+
+
+# Tests
+
+
+@pytest.mark.parametrize(
+    "path, is_dir, ignored",
+    [
+        ("node_modules", True, True),
+        ("pkg/node_modules", True, True),
+        ("pkg/build.py", False, False),
+        ("pkg/generated_pb2.py", False, True),
+        ("pkg/keep_pb2.py", False, False),
+        ("docs", True, True),
+        ("pkg/docs", True, False),
+        ("pkg/a/b/fixtures", True, True),
+        ("logs", False, False),
+        ("pkg/tmp_b.py", False, True),
+        ("pkg/tmp_a.py", False, False),
+        ("pkg/mark!.txt", False, True),
+        ("pkg/marka.txt", False, True),
+        ("pkg/markb.txt", False, False),
+    ],
+)
+def test_ignore_rules(path: str, is_dir: bool, ignored: bool):
+    patterns = [
+        "# Comment",
+        "node_modules/",
+        "*_pb2.py",
+        "!keep_pb2.py",
+        "/docs",
+        "pkg/**/fixtures",
+        "logs/",
+        "tmp_[!a].py",
+        "mark[a!].txt",
+    ]
+    rules = discovery.IgnoreRules(Path("."), patterns)
+
+    assert rules.ignores(path, is_dir) == ignored
+
+
+def test_ignore_rules_exclude_contents(tmp_path: Path):
+    rules = discovery.IgnoreRules(tmp_path, ["src/pkg/gen/", "*.tmp"])
+
+    assert rules.excludes(tmp_path / "src" / "pkg" / "gen", True)
+    assert rules.excludes(tmp_path / "src" / "pkg" / "gen" / "sub" / "a.py", False)
+    assert rules.excludes(tmp_path / "src" / "pkg" / "a.tmp", False)
+    assert not rules.excludes(tmp_path / "src" / "pkg" / "a.py", False)
+    assert not rules.excludes(tmp_path, True)
+    assert rules.prefix(tmp_path / "src") == "src/"
+
+
+def test_repository_skips_ignored_packages(sample_repo: Path):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "vendored").mkdir()
+    (package / "vendored" / "__init__.py").write_text("")
+    (package / "node_modules").mkdir()
+    (package / "node_modules" / "__init__.py").write_text("")
+    (sample_repo / ".gitignore").write_text("src/sample_repo/vendored/\n")
+
+    repository = models.Repository.from_path(sample_repo)
+
+    assert [p.name for p in repository.source.subpackages] == ["shapes"]
+
+
+@pytest.mark.parametrize("name", ["build", "dist", "env", "venv"])
+def test_default_rules_keep_nested_packages(tmp_path: Path, name: str):
+    rules = discovery.IgnoreRules.from_gitignore(tmp_path)
+
+    assert rules.ignores(name, True)
+    assert not rules.ignores(f"src/pkg/{name}", True)
@@ -0,0 +1,98 @@
+"""Tests for the importgraph module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+from prypy import importgraph, models, utils
+
+
+# Tests
+
+
+def test_import_graph_cycles_and_layers(sample_repo: Path):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "a.py").write_text("from . import b\nimport sample_repo.core\n")
+    (package / "b.py").write_text("from .a import *\nimport os\n")
+    (package / "shapes" / "__init__.py").write_text("from .square import area\n")
+    (package / "shapes" / "square.py").write_text("from ..core import Shape\n")
+    repository = models.Repository.from_path(sample_repo)
+
+    graph = importgraph.ImportGraph.from_repository(repository)
+
+    def names(modules):
+        return [utils.qualified_name(module) for module in modules]
+
+    assert names(repository.source.modules[1].imports) == [
+        "sample_repo.b",
+        "sample_repo.core",
+    ]
+    assert names(graph.importers("sample_repo.core")) == [
+        "sample_repo.a",
+        "sample_repo.shapes.square",
+    ]
+    assert names(graph.transitive_importers("sample_repo.shapes.square")) == [
+        "sample_repo.shapes"
+    ]
+    assert [names(cycle) for cycle in graph.cycles()] == [
+        ["sample_repo.a", "sample_repo.b"]
+    ]
+
+    order = names(graph.topological_order())
+    assert order.index("sample_repo.core") < order.index("sample_repo.a")
+    assert order.index("sample_repo.shapes.square") < order.index("sample_repo.shapes")
+    assert [names(layer) for layer in graph.layers()] == [
+        ["sample_repo", "sample_repo.core"],
+        ["sample_repo.a", "sample_repo.b", "sample_repo.shapes.square"],
+        ["sample_repo.shapes"],
+    ]
+
+
+def test_import_graph_update_resolves_affected_imports(sample_repo: Path, monkeypatch):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "a.py").write_text("from . import b\nimport sample_repo.core\n")
+    (package / "b.py").write_text("import os\n")
+    repository = models.Repository.from_path(sample_repo)
+    graph = importgraph.ImportGraph.from_repository(repository)
+    resolved = []
+    resolve_imports = importgraph.ImportGraph.resolve_imports
+
+    def record(self: importgraph.ImportGraph, importer: int) -> list[int]:
+        resolved.append(utils.qualified_name(self.modules[importer]))
+        return resolve_imports(self, importer)
+
+    def assert_rebuilt():
+        rebuilt = importgraph.ImportGraph.from_repository(repository)
+        assert len(graph) == len(rebuilt)
+        for name in rebuilt.ids:
+            for query in ("importers", "dependencies"):
+                assert sorted(
+                    map(utils.qualified_name, getattr(graph, query)(name))
+                ) == (sorted(map(utils.qualified_name, getattr(rebuilt, query)(name))))
+        assert [
+            sorted(map(utils.qualified_name, layer)) for layer in graph.layers()
+        ] == [sorted(map(utils.qualified_name, layer)) for layer in rebuilt.layers()]
+
+    monkeypatch.setattr(importgraph.ImportGraph, "resolve_imports", record)
+
+    # Resolve imports of the re-parsed module and of its importers only
+    (package / "b.py").write_text("from .a import *\n")
+    graph.update(*repository.update(package / "b.py"))
+    assert sorted(resolved) == ["sample_repo.a", "sample_repo.b"]
+    assert [len(cycle) for cycle in graph.cycles()] == [2]
+    assert_rebuilt()
+
+    # Reuse the IDs of deleted modules, and resolve imports of new ones
+    size = len(graph.modules)
+    (package / "b.py").unlink()
+    graph.update(*repository.update(package / "b.py"))
+    assert graph.cycles() == []
+    assert_rebuilt()
+    (package / "c.py").write_text("from .a import b\n")
+    graph.update(*repository.update(package / "c.py"))
+    assert len(graph.modules) == size
+    assert [m.name for m in graph.dependencies("sample_repo.c")] == ["a"]
+    assert_rebuilt()
@@ -0,0 +1,50 @@
+"""Tests for the index module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+from prypy import index, models, utils
+
+
+# Tests
+
+
+def test_symbol_index_lookups(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+
+    symbols = index.SymbolIndex.from_repository(repository)
+
+    def names(items):
+        return [utils.qualified_name(item) for item in items]
+
+    assert symbols.get("sample_repo") is repository.source
+    assert symbols.get("sample_repo.core.Shape.area").name == "area"
+    assert names(symbols.prefix("sample_repo.core.Shape.")) == [
+        "sample_repo.core.Shape.__init__",
+        "sample_repo.core.Shape.area",
+        "sample_repo.core.Shape.name",
+        "sample_repo.core.Shape.sides",
+        "sample_repo.core.Shape.size",
+    ]
+    assert names(symbols.fuzzy("shpe", limit=1)) == ["sample_repo.core.Shape"]
+    assert names(symbols.fuzzy("aera", limit=2)) == [
+        "sample_repo.core.Shape.area",
+        "sample_repo.shapes.square.area",
+    ]
+
+
+def test_symbol_index_update(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+    symbols = index.SymbolIndex.from_repository(repository)
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+
+    path.write_text("def render():\n    pass\n")
+    symbols.update(*repository.update(path))
+
+    assert "sample_repo.core.Shape" not in symbols
+    assert symbols.prefix("sample_repo.core.")[0].name == "render"
+    assert utils.qualified_name(symbols.fuzzy("rendr")[0]) == "sample_repo.core.render"
@@ -0,0 +1,122 @@
+"""Tests for the metrics module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import metrics, models, utils
+from prypy.source import Source
+
+
+# Constants
+
+
+BRANCHY_MODULE = '''"""Branchy module.
+"""
+
+# Comment
+LIMIT = 1
+
+
+@cache
+def check(a, b=1, *args, c, **kwargs):
+    """Check values.
+
+    More details.
+    """
+    if a and b:
+        for x in a:
+            pass
+    elif b:
+        pass
+    else:
+        if c:
+            pass
+    return [y for y in a if y]
+
+
+class Checker:
+    def run(self):
+        def inner():
+            return 1
+
+        return inner
+'''
+
+
+# Tests
+
+
+def test_measure():
+    table = metrics.measure(Source(BRANCHY_MODULE), "branchy")
+
+    assert table.names == [
+        "branchy",
+        "branchy.check",
+        "branchy.Checker",
+        "branchy.Checker.run",
+        "branchy.Checker.run.inner",
+    ]
+    assert list(table.parents) == [-1, 0, 0, 2, 3]
+    assert list(table["code"]) == [1, 11, 1, 2, 2]
+    assert list(table["complexity"]) == [0, 8, 0, 1, 1]
+    assert list(table["nesting"]) == [0, 2, 0, 0, 0]
+    assert list(table["parameters"]) == [0, 5, 0, 1, 0]
+    assert list(table["documented"]) == [1, 1, 0, 0, 0]
+
+    totals = table.rollup()
+    assert totals.record(0) == {
+        "name": "branchy",
+        "kind": "module",
+        "code": 17,
+        "complexity": 10,
+        "nesting": 2,
+        "parameters": 6,
+        "documented": 2,
+        "modules": 1,
+        "classes": 1,
+        "functions": 3,
+    }
+    assert totals.record(2)["code"] == 5
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_repositories(sample_repo: Path, workers: int):
+    repositories, table = metrics.read_repositories(
+        [sample_repo, sample_repo], workers=workers, executor="thread"
+    )
+    totals = table.rollup()
+
+    # Model modules from the same syntax trees
+    expected = models.Repository.from_path(sample_repo)
+    assert [utils.qualified_name(m) for m in repositories[0].source.iter_modules()] == [
+        utils.qualified_name(m) for m in expected.source.iter_modules()
+    ]
+    core = repositories[1].source.modules[1]
+    assert [c.name for c in core.classes] == ["Shape"]
+    assert table.names[table.rows("module")[1]] == utils.qualified_name(core)
+    assert table.ends()[0] == len(table) // 2
+
+    repositories = totals.rows("repository")
+    assert len(repositories) == 2
+    assert totals.record(repositories[0]) == totals.record(repositories[1])
+    assert totals.record(repositories[0]) == {
+        "name": "sample-repo",
+        "kind": "repository",
+        "code": 16,
+        "complexity": 4,
+        "nesting": 0,
+        "parameters": 9,
+        "documented": 2,
+        "modules": 4,
+        "classes": 1,
+        "functions": 4,
+    }
+    packages = {totals.names[i]: totals.record(i) for i in totals.rows("package")}
+    assert packages["sample_repo.shapes"]["code"] == 3
+    assert packages["sample_repo.shapes"]["functions"] == 1
@@ -0,0 +1,229 @@
+"""Tests for the models module.
+"""
+
+
+# Imports
+
+
+import pickle
+from pathlib import Path
+
+import pytest
+
+from prypy import models
+
+
+# Constants
+
+
+NESTED_MODULE = """import functools as tools, os.path
+from . import core as base  # comment
+
+
+@tools.lru_cache(maxsize=None)
+def outer(a, b=(1, 2), *, c: int = 3):
+    total = a + \\
+        len(b)
+
+    def inner(x):
+        return x
+
+    class Local:
+        skipped = 1
+    if total: result = inner(total)
+    return result
+
+
+@dataclass
+class Outer:
+    handler = lambda self, value=None: value
+    for name in ("a", "b"):
+        pass
+
+    class Inner:
+        depth: int = 1
+
+    async def run(self):
+        if self: self.done = True
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+for item in range(3):
+    pass
+else:
+    looped = True
+"""
+
+
+def signature(function: models.Function) -> tuple:
+    return (
+        function.name,
+        [(v.name, v.type, v.value) for v in function.input],
+        [v.type for v in function.output],
+        function.decorators,
+        function.asynchronous,
+        function.lines,
+        sorted(function.calls),
+        [signature(f) for f in function.functions],
+    )
+
+
+def outline(class_obj: models.Class) -> tuple:
+    return (
+        class_obj.name,
+        [(v.name, v.type, v.value) for v in class_obj.class_attributes],
+        [(v.name, v.type) for v in class_obj.instance_attributes],
+        class_obj.decorators,
+        [signature(f) for f in class_obj.functions],
+        [outline(c) for c in class_obj.classes],
+    )
+
+
+# Tests
+
+
+def test_module_from_path_ast(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+    module = models.Module.from_path(path, None)
+
+    assert module.name == "core"
+    assert [c.name for c in module.constants] == ["COUNT", "GREETING"]
+    assert module.constants[1].type == "str"
+    assert module.constants[1].value == "'hello'"
+
+    shape = module.classes[0]
+    assert shape.name == "Shape"
+    assert [a.name for a in shape.class_attributes] == ["sides"]
+    assert [a.name for a in shape.instance_attributes] == ["name", "size"]
+    assert shape.instance_attributes[1].type == "float"
+    assert [f.name for f in shape.functions] == ["__init__", "area"]
+
+    init = shape.functions[0]
+    assert [v.name for v in init.input] == ["self", "name", "size"]
+    assert init.input[2].value == "1.0"
+    assert init.output[0].type == "None"
+    assert init.parent is shape
+
+    fetch = module.functions[0]
+    assert [v.name for v in fetch.input] == ["url", "args", "timeout", "kwargs"]
+    assert fetch.lines == 2
+
+
+@pytest.mark.parametrize("source", ["sample", "nested"])
+def test_module_from_path_lines(sample_repo: Path, source: str):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+    if source == "nested":
+        path.write_text(NESTED_MODULE)
+    tree = models.Module.from_path(path, None)
+    lines = models.Module.from_path(path, None, engine="lines")
+
+    assert [(v.name, v.type) for v in lines.constants] == [
+        (v.name, v.type) for v in tree.constants
+    ]
+    assert lines.import_names == tree.import_names
+    assert lines.aliases == tree.aliases
+    assert [outline(c) for c in lines.classes] == [outline(c) for c in tree.classes]
+    assert [signature(f) for f in lines.functions] == [
+        signature(f) for f in tree.functions
+    ]
+
+
+def test_module_nested_definitions(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+    path.write_text(NESTED_MODULE)
+    module = models.Module.from_path(path, None, engine="lines")
+
+    outer = module.functions[0]
+    assert outer.decorators == ["tools.lru_cache(maxsize=None)"]
+    assert [f.name for f in outer.functions] == ["inner"]
+    assert outer.functions[0].parent is outer
+    assert "inner" in outer.calls
+
+    cls = module.classes[0]
+    assert cls.decorators == ["dataclass"]
+    assert [a.name for a in cls.class_attributes] == ["handler"]
+    assert [c.name for c in cls.classes] == ["Inner"]
+    assert cls.classes[0].parent is cls
+    assert cls.functions[0].asynchronous
+    assert [a.name for a in cls.instance_attributes] == ["done"]
+    assert [v.name for v in module.constants] == ["numpy"]
+    assert [s.name for s in module.iter_symbols()] == [
+        "core",
+        "numpy",
+        "Outer",
+        "handler",
+        "done",
+        "run",
+        "Inner",
+        "depth",
+        "outer",
+        "inner",
+    ]
+
+
+def test_module_from_path_unknown_engine(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+    with pytest.raises(NotImplementedError):
+        models.Module.from_path(path, None, engine="regex")
+
+
+def test_repository_from_path(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+
+    assert repository.source.name == "sample_repo"
+    assert repository.source.parent is repository
+    assert [m.name for m in repository.source.modules] == ["__init__", "core"]
+    assert [p.name for p in repository.source.subpackages] == ["shapes"]
+    assert "└─── square" in str(repository)
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_repository_from_path_parallel(sample_repo: Path, executor: str):
+    sequential = models.Repository.from_path(sample_repo)
+    parallel = models.Repository.from_path(sample_repo, workers=2, executor=executor)
+
+    assert str(parallel) == str(sequential)
+    core = parallel.source.modules[1]
+    assert core.parent is parallel.source
+    assert core.classes[0].parent is core
+
+
+@pytest.mark.parametrize("engine", ["ast", "lines"])
+def test_model_nodes_use_slots(sample_repo: Path, engine: str):
+    repository = models.Repository.from_path(sample_repo, engine=engine)
+    core = repository.source.modules[1]
+    nodes = [repository.source, *core.iter_symbols(), *core.classes[0].functions]
+
+    for node in nodes:
+        assert not hasattr(node, "__dict__")
+        with pytest.raises(AttributeError):
+            node.unknown = None
+
+
+@pytest.mark.parametrize("engine", ["ast", "lines"])
+def test_model_names_are_interned(sample_repo: Path, engine: str):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "other.py").write_text("def area(side: float) -> float:\n    pass\n")
+    repository = models.Repository.from_path(sample_repo, engine=engine)
+    core, other = repository.source.modules[1:3]
+    square = repository.source.subpackages[0].modules[1]
+
+    area = core.classes[0].functions[1]
+    assert area.name is square.functions[0].name is other.functions[0].name
+    assert area.output[0].type is other.functions[0].input[0].type
+
+
+def test_model_nodes_pickle(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo" / "core.py"
+    module = models.Module.from_path(path, None)
+    copy = pickle.loads(pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL))
+
+    assert [outline(c) for c in copy.classes] == [outline(c) for c in module.classes]
+    assert [signature(f) for f in copy.functions] == [
+        signature(f) for f in module.functions
+    ]
+    assert copy.classes[0].parent is copy
@@ -0,0 +1,85 @@
+"""Tests for the profiling module.
+"""
+
+
+# Imports
+
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+from prypy import models, profiling
+
+
+# Tests
+
+
+def test_profile_phases(sample_repo: Path):
+    spans = []
+    with profiling.Profiler([spans.append]) as profiler:
+        models.Repository.from_path(sample_repo)
+    assert profiling.active() is None
+
+    phases = profiler.phases()
+    assert {"walk", "module", "read", "parse", "extract"} <= phases.keys()
+    assert phases["module"]["count"] == 4
+    assert spans == profiler.spans
+
+    # Inner phases and counters are attributed to the module being parsed
+    core = str(sample_repo / "src" / "sample_repo" / "core.py")
+    assert {span.name for span in profiler.spans if span.path == core} == {
+        "module",
+        "read",
+        "parse",
+        "extract",
+    }
+    assert profiler.counters[("classes", core)] == 1
+    assert profiler.totals()["functions"] == 2
+    assert core in dict(profiler.slowest("module"))
+
+
+def test_profile_counts_across_threads():
+    # Switch threads as often as possible to interleave the increments
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with profiling.Profiler() as profiler:
+            threads = [
+                threading.Thread(
+                    target=lambda: [profiling.count("calls") for _ in range(10000)]
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert profiler.totals()["calls"] == 80000
+
+
+def test_profile_worker_processes(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo"
+    with profiling.Profiler() as profiler:
+        models.Package.from_path(path, None, workers=2)
+
+    assert profiler.phases()["module"]["count"] == 4
+    assert profiler.totals()["lines"] > 0
+
+
+def test_profile_export(sample_repo: Path, tmp_path: Path):
+    with profiling.Profiler() as profiler:
+        models.Repository.from_path(sample_repo)
+    profiler.save_json(tmp_path / "profile.json")
+    profiler.save_chrome_trace(tmp_path / "trace.json")
+
+    profile = json.loads((tmp_path / "profile.json").read_text())
+    assert len(profile["spans"]) == len(profiler.spans)
+    assert profile["phases"]["module"]["count"] == 4
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert {event["ph"] for event in events} == {"X", "C"}
+    assert sum(event["ph"] == "X" for event in events) == len(profiler.spans)
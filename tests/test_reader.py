@@ -0,0 +1,80 @@
+"""Tests for the reader module.
+"""
+
+
+# Imports
+
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from prypy import models, reader, scan
+
+
+# Tests
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_repositories(sample_repo: Path, tmp_path: Path, workers: int):
+    # Copy the sample repository under another name, vendoring a module twice
+    other = tmp_path / "other-repo"
+    shutil.copytree(sample_repo / "src" / "sample_repo", other / "src" / "other_repo")
+    shutil.copy(other / "src" / "other_repo" / "core.py", other / "src" / "vendored.py")
+    shutil.copy(
+        other / "src" / "other_repo" / "core.py",
+        other / "src" / "other_repo" / "shapes" / "base.py",
+    )
+    broken = tmp_path / "broken-repo"
+    broken.mkdir()
+
+    batch = reader.read_repositories(
+        [sample_repo, broken, other], workers=workers, executor="thread"
+    )
+
+    assert [r.name for r in batch.repositories] == ["sample-repo", "other-repo"]
+    assert list(batch.errors) == [broken]
+    assert str(batch.repositories[0]) == str(models.Repository.from_path(sample_repo))
+    assert str(batch.repositories[1]) == str(models.Repository.from_path(other))
+    assert batch.stats["modules"] == 9
+    assert batch.stats["parsed"] == 4
+    assert batch.stats["duplicates"] == 5
+    assert batch.stats["failed"] == 1
+
+    # Copies of a module are independent of each other
+    core = batch.repositories[1].source.modules[1]
+    base = batch.repositories[1].source.subpackages[0].modules[1]
+    assert base.name == "base"
+    assert base.parent is batch.repositories[1].source.subpackages[0]
+    assert base.classes[0].parent is base
+    assert core.classes[0] is not base.classes[0]
+
+
+def test_read_repositories_reads_once(sample_repo: Path, monkeypatch):
+    (sample_repo / "src" / "sample_repo" / "bad.py").write_text("def (:\n")
+    reads = []
+    read_stamped = scan.read_stamped
+
+    def read(path: Path) -> tuple[bytes, tuple[int, int, str]]:
+        reads.append(path)
+        return read_stamped(path)
+
+    def reread(*args):
+        raise AssertionError("module read again")
+
+    monkeypatch.setattr(scan, "read_stamped", read)
+    monkeypatch.setattr(models.Module, "from_path", reread)
+
+    batch = reader.read_repositories([sample_repo], workers=1)
+
+    assert len(reads) == len(set(reads)) == 5
+    assert list(batch.errors) == [sample_repo]
+    assert batch.stats["parsed"] == 4
+
+
+def test_read_repository_raises(sample_repo: Path, tmp_path: Path):
+    assert reader.read_repository(sample_repo).source.name == "sample_repo"
+    (sample_repo / "src" / "sample_repo" / "bad.py").write_text("def (:\n")
+    with pytest.raises(SyntaxError):
+        reader.read_repository(sample_repo)
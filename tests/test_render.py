@@ -0,0 +1,56 @@
+"""Tests for the render module.
+"""
+
+
+# Imports
+
+
+import io
+from pathlib import Path
+
+from prypy import models, render
+
+
+# Tests
+
+
+def test_render_tree(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+
+    assert render.render(repository.source) == (
+        "sample_repo\n"
+        "├─── shapes\n"
+        "│    ├─── __init__\n"
+        "│    └─── square\n"
+        "├─── __init__\n"
+        "└─── core\n"
+    )
+    assert str(repository.source) == render.render(repository.source)
+    assert render.render(repository.source, depth=0) == "sample_repo\n"
+
+
+def test_render_symbols_to_file(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+    file = io.StringIO()
+
+    assert render.render(repository, file, symbols=True) is None
+    lines = file.getvalue().splitlines()
+    assert lines[1] == "══════════ sample-repo ══════════"
+    assert lines[-5:] == [
+        "└─── core",
+        "     ├─── Shape",
+        "     │    ├─── __init__()",
+        "     │    └─── area()",
+        "     └─── fetch()",
+    ]
+
+
+def test_render_deep_hierarchy():
+    root = package = models.Package("p0", [], [], None)
+    for i in range(1, 2000):
+        package.subpackages.append(models.Package(f"p{i}", [], [], package))
+        package = package.subpackages[0]
+
+    lines = render.render(root, depth=3).splitlines()
+    assert lines == ["p0", "└─── p1", "     └─── p2", "          └─── p3"]
+    assert len(str(root).splitlines()) == 2000
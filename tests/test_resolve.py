@@ -0,0 +1,98 @@
+"""Tests for the resolve module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import models, resolve
+
+
+# Constants
+
+
+SETTINGS_MODULE = """from . import core
+from .core import COUNT, Shape
+
+TOTAL = COUNT
+DEFAULT = Shape("square")
+RATIO = core.COUNT
+NAMES = [name for name in "ab"]
+EMPTY = not TOTAL
+LIMIT = int("4")
+
+
+def build() -> "Shape":
+    return Shape("built")
+
+
+def label() -> "list[str]":
+    return []
+
+
+BUILT = build()
+LABELS = label()
+"""
+
+
+# Setup
+
+
+@pytest.fixture
+def repository(sample_repo: Path) -> models.Repository:
+    package = sample_repo / "src" / "sample_repo"
+    (package / "settings.py").write_text(SETTINGS_MODULE)
+    with open(package / "__init__.py", mode="a") as file:
+        file.write("from .core import Shape as Form\n")
+    return models.Repository.from_path(sample_repo)
+
+
+# Tests
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("sample_repo.core.GREETING", "str"),
+        ("sample_repo.core.COUNT", "int"),
+        ("sample_repo.core.Shape", "type[sample_repo.core.Shape]"),
+        ("sample_repo.core.Shape.sides", "int"),
+        ("sample_repo.core.Shape.name", "str"),
+        ("sample_repo.core.Shape.__init__.self", "sample_repo.core.Shape"),
+        ("sample_repo.core.fetch.timeout", "int"),
+        ("sample_repo.core.fetch.url", None),
+        ("sample_repo.settings.TOTAL", "int"),
+        ("sample_repo.settings.DEFAULT", "sample_repo.core.Shape"),
+        ("sample_repo.settings.RATIO", "int"),
+        ("sample_repo.settings.NAMES", "list"),
+        ("sample_repo.settings.EMPTY", "bool"),
+        ("sample_repo.settings.LIMIT", "int"),
+        ("sample_repo.settings.MISSING", None),
+        ("sample_repo.settings.BUILT", "sample_repo.core.Shape"),
+        ("sample_repo.settings.LABELS", "list[str]"),
+        ("sample_repo.Form", "type[sample_repo.core.Shape]"),
+        ("sample_repo.Form.sides", "int"),
+    ],
+)
+def test_resolve(repository: models.Repository, name: str, expected: str | None):
+    resolver = resolve.Resolver.from_repository(repository)
+    assert resolver.resolve(name) == expected
+
+
+def test_resolver_update(repository: models.Repository):
+    resolver = resolve.Resolver.from_repository(repository)
+    assert resolver.resolve("sample_repo.settings.TOTAL") == "int"
+    assert resolver.resolve("sample_repo.shapes.square.SIDES") == "int"
+    assert "sample_repo.core.COUNT" in resolver.types
+
+    # Drop results read from the changed module only
+    path = repository.source.path / "core.py"
+    path.write_text(path.read_text().replace("COUNT = 3", "COUNT = '3'"))
+    resolver.update(*repository.update(path))
+    assert "sample_repo.settings.TOTAL" not in resolver.types
+    assert "sample_repo.shapes.square.SIDES" in resolver.types
+    assert resolver.resolve("sample_repo.settings.TOTAL") == "str"
@@ -0,0 +1,106 @@
+"""Tests for the scan module.
+"""
+
+
+# Imports
+
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+import synthetic
+from prypy import discovery, models, scan, source, utils
+
+
+# Tests
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_iter_modules_matches_tree(sample_repo: Path, workers: int):
+    path = sample_repo / "src" / "sample_repo"
+    package = models.Package.from_path(path, None)
+
+    modules = list(scan.iter_modules(path, workers=workers, executor="thread"))
+
+    assert [utils.qualified_name(m) for m in modules] == [
+        utils.qualified_name(m) for m in package.iter_modules()
+    ]
+    assert modules[0].parent.modules == []
+
+
+def test_iter_symbols(sample_repo: Path):
+    path = sample_repo / "src" / "sample_repo"
+
+    names = [utils.qualified_name(s) for s in scan.iter_symbols(path)]
+
+    assert names[:3] == ["sample_repo", "sample_repo.core", "sample_repo.core.COUNT"]
+    assert "sample_repo.core.Shape.area" in names
+    assert names[-1] == "sample_repo.shapes.square.area"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_package_matches_tree(sample_repo: Path, workers: int):
+    path = sample_repo / "src" / "sample_repo"
+    package = models.Package.from_path(path, None)
+
+    scanned = scan.scan_package(path, None, workers=workers, executor="thread")
+
+    assert str(scanned) == str(package)
+    assert [utils.qualified_name(m) for m in scanned.iter_modules()] == [
+        utils.qualified_name(m) for m in package.iter_modules()
+    ]
+    assert scanned.subpackages[0].modules[1].parent is scanned.subpackages[0]
+    assert scanned.modules[1].classes[0].functions[0].input[1].name == "name"
+
+
+def test_scan_package_overlaps_latency(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path = synthetic.generate(tmp_path, depth=1, classes=1, functions=1)
+    list_directory = discovery.list_directory
+    from_path = source.Source.from_path
+    read_data = scan.read_data
+
+    # Delay every listing and read as a network file system would
+    def delay(function: Callable) -> Callable:
+        def delayed(*args):
+            time.sleep(0.02)
+            return function(*args)
+
+        return delayed
+
+    monkeypatch.setattr(discovery, "list_directory", delay(list_directory))
+    monkeypatch.setattr(source.Source, "from_path", delay(from_path))
+    monkeypatch.setattr(scan, "read_data", delay(read_data))
+
+    start = time.perf_counter()
+    sequential = models.Repository.from_path(path)
+    sequential_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    overlapped = models.Repository.from_path(path, concurrency=16)
+    overlapped_seconds = time.perf_counter() - start
+
+    assert str(overlapped) == str(sequential)
+    assert overlapped_seconds < sequential_seconds
+
+
+def test_scan_package_bounds_pending_modules(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    path = synthetic.generate(tmp_path, depth=1, modules=20)
+    parse_data = scan.parse_data
+    tasks = []
+
+    # Count tasks alive on the event loop each time a module is parsed on it
+    def counted_parse(*args):
+        tasks.append(len(asyncio.all_tasks()))
+        return parse_data(*args)
+
+    monkeypatch.setattr(scan, "parse_data", counted_parse)
+    scanned = models.Repository.from_path(path, concurrency=2)
+
+    packages = len(list(scanned.source.iter_packages()))
+    assert len(tasks) == len(list(scanned.source.iter_modules())) > 20
+    assert max(tasks) <= 2 + packages + 1
@@ -0,0 +1,89 @@
+"""Tests for the snapshot module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import importgraph, models, snapshot, utils
+
+
+# Tests
+
+
+def test_snapshot_round_trip(sample_repo: Path, tmp_path: Path):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "app.py").write_text("from .core import Shape\nimport os as system\n")
+    repository = models.Repository.from_path(sample_repo)
+    importgraph.ImportGraph.from_repository(repository)
+
+    repository.save(tmp_path / "repo.snapshot")
+    loaded = models.Repository.load(tmp_path / "repo.snapshot")
+
+    assert str(loaded) == str(repository)
+    assert loaded.path == sample_repo
+    assert loaded.source.modules[2].path == package / "core.py"
+    app, core = loaded.source.modules[1:3]
+    assert app.loader is not None
+    assert app.imports == [core]
+    assert app.aliases == {"Shape": ".core.Shape", "system": "os"}
+    assert app.loader is None
+
+    shape = core.classes[0]
+    assert utils.qualified_name(shape.functions[0]) == "sample_repo.core.Shape.__init__"
+    assert [v.name for v in shape.functions[0].input] == ["self", "name", "size"]
+    assert shape.functions[0].input[2].value == "1.0"
+    assert core.constants[1].type == "str"
+    assert core.functions[0].calls == []
+
+
+def test_snapshot_nested_definitions(sample_repo: Path, tmp_path: Path):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "core.py").write_text(
+        "@decorate\nclass Outer:\n    class Inner:\n        pass\n\n"
+        "    async def run(self):\n        def step():\n            pass\n"
+    )
+    repository = models.Repository.from_path(sample_repo)
+    repository.save(tmp_path / "repo.snapshot")
+    loaded = models.Repository.load(tmp_path / "repo.snapshot")
+
+    outer = loaded.source.modules[1].classes[0]
+    assert outer.decorators == ["decorate"]
+    assert [c.name for c in outer.classes] == ["Inner"]
+    assert outer.classes[0].parent is outer
+    run = outer.functions[0]
+    assert run.asynchronous
+    assert [f.name for f in run.functions] == ["step"]
+    assert run.functions[0].parent is run
+
+
+def test_snapshot_creates_modules_per_package(
+    sample_repo: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    package = sample_repo / "src" / "sample_repo"
+    (package / "app.py").write_text("from .shapes.square import area\n")
+    repository = models.Repository.from_path(sample_repo)
+    importgraph.ImportGraph.from_repository(repository)
+    repository.save(tmp_path / "repo.snapshot")
+
+    with snapshot.Snapshot(tmp_path / "repo.snapshot") as opened:
+        loaded = opened.repository()
+        shapes = loaded.source.subpackages[0]
+        assert shapes.loader is not None
+        app = loaded.source.modules[1]
+        assert shapes.loader is not None
+        assert app.imports == [shapes.modules[1]]
+        assert shapes.loader is None
+    with pytest.raises(ValueError):
+        loaded.source.modules[2].classes
+
+    # Reject snapshots saved by another Python version
+    monkeypatch.setattr(snapshot, "PYTHON", snapshot.PYTHON + 1)
+    repository.save(tmp_path / "other.snapshot")
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="saved by Python"):
+        snapshot.Snapshot(tmp_path / "other.snapshot")
@@ -0,0 +1,38 @@
+"""Tests for the source module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import models, source
+
+
+# Tests
+
+
+@pytest.mark.parametrize("threshold", [source.MMAP_THRESHOLD, 0])
+def test_source_from_path_decodes_cookie(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, threshold: int
+):
+    monkeypatch.setattr(source, "MMAP_THRESHOLD", threshold)
+    path = tmp_path / "legacy.py"
+    path.write_bytes(b"# -*- coding: latin-1 -*-\r\nNAME = '\xe9'\rX = 1\n")
+
+    module_source = source.Source.from_path(path)
+
+    assert len(module_source) == 3
+    assert module_source[1] == "NAME = 'é'"
+    assert module_source[-1] == "X = 1"
+    assert module_source[1:] == ["NAME = 'é'", "X = 1"]
+    assert models.Module.from_path(path, None).constants[0].value == "'é'"
+
+
+def test_source_without_trailing_newline():
+    module_source = source.Source("a = 1\n\nb = 2")
+
+    assert list(module_source) == ["a = 1", "", "b = 2"]
@@ -7,10 +7,33 @@
 
 from pathlib import Path
 
+from prypy import utils
 
 
 # Tests
 
 
 def test_encased():
-    pass
\ No newline at end of file
+    line = 'text = "a # b \\" # c" + f(x, (y # z))  # comment'
+    assert utils.is_encased(line, "#", '"') == [True, True, False, False]
+    assert utils.is_encased(line, "#", "(", ")") == [False, False, True, False]
+    assert utils.is_encased(["a = '''\n", "# x\n", "'''"], "#", "'''") == [True]
+
+
+def test_remove_comments():
+    lines = [
+        "x = '#' + \"#\"  # comment",
+        "# whole line",
+        'y = f"{x}#"',
+        '"""',
+        "# in docstring",
+        '"""  # after',
+    ]
+    assert utils.remove_comments(lines) == [
+        "x = '#' + \"#\"",
+        "",
+        'y = f"{x}#"',
+        '"""',
+        "# in docstring",
+        '"""',
+    ]
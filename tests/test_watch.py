@@ -0,0 +1,113 @@
+"""Tests for the watch module.
+"""
+
+
+# Imports
+
+
+from pathlib import Path
+
+import pytest
+
+from prypy import callgraph, importgraph, models, watch
+
+
+# Tests
+
+
+@pytest.mark.parametrize("watcher_type", [watch.PollingWatcher, watch.InotifyWatcher])
+def test_session_patches_changed_modules(sample_repo: Path, watcher_type: type):
+    repository = models.Repository.from_path(sample_repo)
+    package = repository.source.path
+    try:
+        watcher = watcher_type(package)
+    except OSError:
+        pytest.skip("inotify is not available")
+    if watcher_type is watch.PollingWatcher:
+        watcher.interval = 0.01
+    updates = []
+
+    with watch.Session(repository, watcher=watcher) as session:
+        session.listeners.append(lambda removed, added: updates.append(added))
+
+        # Modify a module
+        (package / "core.py").write_text("def run():\n    pass\n")
+        removed, added = session.refresh(timeout=2)
+        assert [m.name for m in removed] == ["core"]
+        assert [f.name for f in added[0].functions] == ["run"]
+        assert repository.source.modules[1] is added[0]
+        assert updates == [added]
+
+        # Add a subpackage
+        (package / "extra").mkdir()
+        (package / "extra" / "__init__.py").write_text("")
+        (package / "extra" / "tool.py").write_text("X = 1\n")
+        session.refresh(timeout=2)
+        session.refresh(timeout=0.2)
+        extra = repository.package_for(package / "extra")
+        assert [m.name for m in extra.modules] == ["__init__", "tool"]
+        assert [p.name for p in repository.source.subpackages] == ["extra", "shapes"]
+
+        # Delete a module
+        (package / "shapes" / "square.py").unlink()
+        removed, _ = session.refresh(timeout=2)
+        assert [m.name for m in removed] == ["square"]
+        assert repository.source.subpackages[1].modules[0].name == "__init__"
+
+
+def test_session_updates_graphs(sample_repo: Path):
+    repository = models.Repository.from_path(sample_repo)
+    package = repository.source.path
+    watcher = watch.PollingWatcher(package, interval=0.01)
+    calls = callgraph.CallGraph.from_repository(repository)
+    imports = importgraph.ImportGraph.from_repository(repository)
+
+    with watch.Session(
+        repository, watcher=watcher, listeners=[calls.update, imports.update]
+    ) as session:
+        # Call and import a module added after the graphs were built
+        (package / "tool.py").write_text("def helper():\n    pass\n")
+        (package / "core.py").write_text(
+            "from .tool import helper\n\n\ndef run():\n    helper()\n"
+        )
+        session.refresh(timeout=2)
+        session.refresh(timeout=0.2)
+        assert [f.name for f in calls.callers("sample_repo.tool.helper")] == ["run"]
+        assert [m.name for m in imports.importers("sample_repo.tool")] == ["core"]
+        assert [m.name for m in repository.source.modules[1].imports] == ["tool"]
+
+        # Keep the previous model of modules which cannot be decoded
+        (package / "tool.py").write_bytes(b"X = '\xff'\n")
+        session.refresh(timeout=2)
+        assert len(calls.callers("sample_repo.tool.helper")) == 1
+
+
+@pytest.mark.parametrize("watcher_type", [watch.PollingWatcher, watch.InotifyWatcher])
+def test_session_skips_ignored_packages(sample_repo: Path, watcher_type: type):
+    package = sample_repo / "src" / "sample_repo"
+    (sample_repo / ".gitignore").write_text("src/sample_repo/gen/\n")
+    (package / "gen").mkdir()
+    (package / "gen" / "__init__.py").write_text("")
+    repository = models.Repository.from_path(sample_repo)
+    try:
+        watcher = watcher_type(package, ignore=repository.ignore)
+    except OSError:
+        pytest.skip("inotify is not available")
+    if watcher_type is watch.PollingWatcher:
+        watcher.interval = 0.01
+        assert not any("gen" in Path(path).parts for path in watcher.snapshot)
+    else:
+        assert package / "gen" not in watcher.directories.values()
+
+    with watch.Session(repository, watcher=watcher) as session:
+        # Ignore modules and packages created within ignored directories
+        (package / "gen" / "made.py").write_text("X = 1\n")
+        (package / "gen" / "sub").mkdir()
+        (package / "gen" / "sub" / "__init__.py").write_text("")
+        assert session.refresh(timeout=0.2) == ([], [])
+
+    # Keep ignored packages out when the whole source package is reloaded
+    repository.update(repository.source.path)
+    assert [p.name for p in repository.source.subpackages] == ["shapes"]
+    assert repository.update(package / "gen") == ([], [])
+    assert repository.update(package / "gen" / "made.py") == ([], [])